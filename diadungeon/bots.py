@@ -0,0 +1,242 @@
+#! /usr/bin/env python
+# Headless bot players and a parallel batch runner for balancing diadungeon.
+# Works under Python 2 and Python 3. Requires NumPy.
+#
+# Each game is one bot playing one level with one monster configuration
+# until it dies or MAX_TICKS pass. Stairs are ignored so every game stays on
+# the level it is scored for. Games are spread over a process pool and
+# their outcomes summed up per level, configuration and bot:
+#
+#   python bots.py --games 500 --level 1 --level 2 \
+#       --config cyclops=450,dragon=150 --config cyclops=300,dragon=100
+#
+# A configuration sets the longest pause between moves of each kind of
+# monster, see monsters.KINDS. Kinds left out keep their usual pause.
+
+import argparse
+import collections
+import multiprocessing
+import random
+import sys
+import time
+
+from game import Game
+from monsters import KINDS, STEP_X, STEP_Y, STEP_LINK
+from replay import load_numbered
+
+MAX_TICKS = 3000  # A minute of game time
+BOT_MOVE_TICKS = 5  # Bots move every 5 ticks, 100 ms, about a human's pace
+TURN_ODDS = 0.2  # Chance of the wandering bot turning where it need not
+
+
+def wander_bot(rng):
+    """A scripted bot that walks straight until it must turn, and sometimes
+    turns anyway. Knows nothing of monsters or treasure."""
+    heading = [rng.randint(0, 3)]
+
+    def move(game):
+        links = game.level.links(game.player_x, game.player_y)
+        open_ways = [d for d in range(4) if links & int(STEP_LINK[d])]
+        if not open_ways:
+            return None
+        if heading[0] not in open_ways or rng.random() < TURN_ODDS:
+            heading[0] = rng.choice(open_ways)
+        return heading[0]
+    return move
+
+
+def danger(game):
+    """Return the units a monster is on or can step onto next."""
+    monsters = game.monsters
+    n = monsters.count
+    units = set()
+    for x, y in zip(monsters.x[:n].tolist(), monsters.y[:n].tolist()):
+        units.add((x, y))
+        links = game.level.links(x, y)
+        for d in range(4):
+            if links & int(STEP_LINK[d]):
+                units.add((x + int(STEP_X[d]), y + int(STEP_Y[d])))
+    return units
+
+
+def search_bot(rng):
+    """A bot that walks the shortest path to the nearest treasure, found by
+    breadth first search around units next to monsters. With nowhere safe
+    to go it steps away from danger, or waits."""
+    fallback = wander_bot(rng)
+
+    def move(game):
+        avoid = danger(game)
+        start = (game.player_x, game.player_y)
+        first = {start: None}
+        queue = collections.deque([start])
+        # Treasure in another region can never be reached, so do not search
+        # the whole region for it.
+        region = getattr(game.level, "region", None)
+        if region is not None:
+            home = region(start[0], start[1])
+            if not any(region(x, y) == home for x, y in game.treasures):
+                queue.clear()
+        while queue:
+            unit = queue.popleft()
+            if unit in game.treasures:
+                return first[unit]
+            links = game.level.links(unit[0], unit[1])
+            for d in range(4):
+                if not links & int(STEP_LINK[d]):
+                    continue
+                step = (unit[0] + int(STEP_X[d]), unit[1] + int(STEP_Y[d]))
+                if step in first or step in avoid:
+                    continue
+                first[step] = d if unit == start else first[unit]
+                queue.append(step)
+        if start in avoid:
+            return fallback(game)
+        return None  # No treasure within reach, wait where it is safe
+    return move
+
+
+BOTS = collections.OrderedDict([
+    ("wander", wander_bot),
+    ("search", search_bot)
+])
+
+
+def parse_config(text):
+    """Parse a configuration such as "cyclops=450,dragon=150".
+
+    Returns: The longest pause of each kind, in KINDS order."""
+    pauses = [kind[2] for kind in KINDS]
+    names = [kind[0] for kind in KINDS]
+    for part in text.split(","):
+        name, _, value = part.partition("=")
+        if name not in names:
+            raise argparse.ArgumentTypeError(
+                "Unknown monster '{}', expected one of {}.".format(
+                    name, ", ".join(names)))
+        pauses[names.index(name)] = int(value)
+    return tuple(pauses)
+
+
+def config_name(pauses):
+    return ",".join("{}={}".format(kind[0], pause)
+                    for kind, pause in zip(KINDS, pauses))
+
+
+def play(job):
+    """Play one game headless. Runs in a pool worker.
+
+    Args:
+        job (tuple): level number, monster pauses, bot name and seed
+
+    Returns: (job key, survived, gold, ticks played) as a tuple."""
+    number, pauses, bot, seed = job
+    game = Game(load_numbered(number), seed, number, max_pause=pauses)
+    move = BOTS[bot](random.Random(seed))
+    while game.alive and game.tick < MAX_TICKS:
+        moves = ()
+        if game.tick % BOT_MOVE_TICKS == 0:
+            direction = move(game)
+            if direction is not None:
+                moves = (direction,)
+        game.step(moves)
+    return (number, pauses, bot), game.alive, game.score, game.tick
+
+
+class Tally(object):
+    """Outcomes of all the games of one level, configuration and bot."""
+
+    def __init__(self):
+        self.games = 0
+        self.survived = 0
+        self.gold = 0
+        self.death_ticks = []
+
+    def add(self, survived, gold, ticks):
+        self.games += 1
+        self.gold += gold
+        if survived:
+            self.survived += 1
+        else:
+            self.death_ticks.append(ticks)
+
+    def row(self):
+        deaths = sorted(self.death_ticks)
+        if deaths:
+            median = "{:.0f}".format(deaths[len(deaths) // 2])
+            mean = "{:.0f}".format(float(sum(deaths)) / len(deaths))
+        else:
+            median = mean = "-"
+        return ("{:7d} {:9.1f}% {:9.1f} {:>12} {:>10}".format(
+            self.games, 100.0 * self.survived / self.games,
+            float(self.gold) / self.games, median, mean))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play diadungeon headless with bots across a process "
+                    "pool and report how the games went.")
+    parser.add_argument("--games", type=int, default=200,
+                        help="games per level, configuration and bot")
+    parser.add_argument("--level", type=int, action="append",
+                        dest="levels", metavar="NUMBER",
+                        help="level to play, may be repeated. Default 1.")
+    parser.add_argument("--config", type=parse_config, action="append",
+                        dest="configs", metavar="KIND=PAUSE,...",
+                        help="monster pauses to try, may be repeated. "
+                             "Default the pauses in monsters.KINDS.")
+    parser.add_argument("--bot", choices=list(BOTS), action="append",
+                        dest="bots", help="bot to play with, may be "
+                                          "repeated. Default all of them.")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes, default one per CPU")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first game, the rest follow on")
+    args = parser.parse_args()
+    levels = args.levels or [1]
+    configs = args.configs or [tuple(kind[2] for kind in KINDS)]
+    bots = args.bots or list(BOTS)
+
+    for number in levels:
+        if load_numbered(number) is None:
+            parser.error("There is no level {}.".format(number))
+
+    jobs = [(number, pauses, bot, args.seed + i)
+            for number in levels
+            for pauses in configs
+            for bot in bots
+            for i in range(args.games)]
+    tallies = collections.OrderedDict(((number, pauses, bot), Tally())
+                                      for number in levels
+                                      for pauses in configs
+                                      for bot in bots)
+
+    start = time.time()
+    pool = multiprocessing.Pool(args.processes)
+    try:
+        chunk = max(1, len(jobs) // (8 * multiprocessing.cpu_count()))
+        for key, survived, gold, ticks in pool.imap_unordered(play, jobs,
+                                                              chunk):
+            tallies[key].add(survived, gold, ticks)
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = max(time.time() - start, 1e-9)
+
+    print("{:<6} {:<26} {:<7} {:>7} {:>10} {:>9} {:>12} {:>10}".format(
+        "level", "config", "bot", "games", "survived", "gold",
+        "median death", "mean death"))
+    for (number, pauses, bot), tally in tallies.items():
+        print("{:<6} {:<26} {:<7} {}".format(number, config_name(pauses),
+                                             bot, tally.row()))
+    print("{} games in {:.1f} s, {:.1f} games/s. Deaths are in ticks of "
+          "game time, a game lasts at most {} ticks.".format(
+              len(jobs), elapsed, len(jobs) / elapsed, MAX_TICKS))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+##
+#
@@ -1,14 +1,25 @@
 #! /usr/bin/env python
 # This program is intended to use Python 2 and modules installed under Python 2
+# NumPy is required, see monsters.py
 
 
-import math
+import argparse
 import random
 import signal
 import sys
 import time
 
 import turtle
+import Tkinter as tk
+
+from game import TICK_MS
+from inputqueue import InputQueue
+from levelcompiler import WALL, STAIRS
+from monsters import KINDS, UP, DN, LT, RT
+from preload import LevelPreloader
+from profiler import FrameProfiler
+from replay import Recorder, load_numbered, open_game
+from scheduler import now_ms
 
 DEBUG = True
 
@@ -53,13 +64,52 @@ WINDOW_STARTX = 0
 WINDOW_STARTY = 0
 
 UNIT_SIZE = 32  # Individual grid units are 24 x 24 pixels each
-UNITS = 25  # Number of grid units in any row or column of the square grid
+UNITS = 25  # Number of grid units in any row or column of the square viewport
 HALF_GRID_UNITS_WHOLE = int(UNITS / 2)  # int() drops remainder
 SPLIT = (HALF_GRID_UNITS_WHOLE * UNIT_SIZE)
 if DEBUG:
     print "HALF_GRID_UNITS_WHOLE: {}".format(HALF_GRID_UNITS_WHOLE)
     print "SPLIT: {}".format(SPLIT)
 
+# Levels can be any size. The camera shows a UNITS x UNITS window of the
+# level and recenters on the player when it gets this close to a view edge.
+CAMERA_MARGIN = 4
+# If drawing falls this many simulation ticks behind, the game slows down
+# rather than trying to catch up all at once.
+MAX_CATCH_UP = 10
+OVERLAY_MS = 500  # How often the profiling overlay is refreshed
+
+# Sprites are pooled and reused, never created per spawn, so the number of
+# canvas items stays bounded however long the game goes on. There is never
+# a reason to show more sprites than there are units in view. A handful are
+# created up front so the first monsters and treasures in view do not have
+# to wait for new turtles.
+SPRITE_LIMIT = UNITS * UNITS
+PREWARM_SPRITES = 64
+
+# The first view of the next level is drawn ahead of time, this many tiles
+# per frame, so going down the stairs costs no drawing at all.
+PRERENDER_TILES = 32
+
+# "diadungeon.py endless" plays a generated dungeon that goes on without
+# end instead of the hand-written levels. See mazegen.py. A game can be
+# recorded and replayed headless later with replay.py.
+parser = argparse.ArgumentParser(description="Dia Dungeon Mazer")
+parser.add_argument("mode", nargs="?", choices=["endless"],
+                    help="play a generated dungeon without end")
+parser.add_argument("--seed", type=int,
+                    help="seed of the game, random if not given")
+parser.add_argument("--record", metavar="FILE",
+                    help="record the game to FILE for replay.py")
+parser.add_argument("--profile", action="store_true",
+                    help="show frame time percentiles on screen, 'p' "
+                         "toggles them")
+parser.add_argument("--trace", metavar="FILE",
+                    help="write the time of every frame phase to FILE, as "
+                         "CSV if it ends in .csv, else as JSON lines")
+args = parser.parse_args()
+endless = args.mode == "endless"
+
 window = turtle.Screen()
 window.colormode(255)
 window.bgcolor(10, 71, 4)
@@ -93,338 +143,500 @@ sprites = [
 for sprite in sprites:
     turtle.register_shape(sprite)
 
+# Static maze tiles are not turtles or stamps at all. The ones in view are
+# copied into a single background image, see bake_maze().
+tile_images = {
+    WALL: tk.PhotoImage(file="cave_wall32x32.gif"),
+    STAIRS: tk.PhotoImage(file="stairs_dn_right32x32.gif")
+}
+
+# Sprites whose position or shape changed since the last frame was drawn.
+# Only these get redrawn by render_frame().
+dirty = set()
+
+# Sprites in view, of treasures by level unit and of monsters by index.
+treasure_sprites = {}
+monster_sprites = {}
+
+PLAYER_SHAPES = ("player_left32x32.gif", "player_right32x32.gif")
+TREASURE_SHAPE = "treasure_chest32x32.gif"
+# Left and right facing shapes of each kind of monster, as in KINDS.
+MONSTER_SHAPES = {
+    "cyclops": ("cyclops_left32x32.gif", "cyclops_right32x32.gif"),
+    "dragon": ("dragon_left32x32.gif", "dragon_right32x32.gif")
+}
+KIND_SHAPES = [MONSTER_SHAPES[kind[0]] for kind in KINDS]
+
+
+def view_origin(level, x, y):
+    """Return the level unit at the top left of a view centered on unit
+    (x, y), kept inside the level where it can be."""
+    return (min(max(0, x - HALF_GRID_UNITS_WHOLE),
+                max(0, level.width - UNITS)),
+            min(max(0, y - HALF_GRID_UNITS_WHOLE),
+                max(0, level.height - UNITS)))
+
+
+class Camera(object):
+    """The viewport onto the level. It shows UNITS x UNITS grid units with
+    its top left corner at level unit (x, y). Sprites are drawn relative to
+    it and nothing outside of it is drawn at all."""
 
-class Pen(turtle.Turtle):
     def __init__(self):
-        # turtle.Turtle.__init__(self)  # Equivalent to following line
-        super(Pen, self).__init__()
-        self.shape("square")
-        self.color("white")
-        self.penup()
-        self.speed(0)
-
-
-class Player(turtle.Turtle):
-    def __init__(self):
-        # turtle.Turtle.__init__(self)  # Equivalent to following line
-        super(Player, self).__init__()
-        self.shape("player_right32x32.gif")
-        self.color("blue")
-        self.penup()
-        self.speed(0)
-        self.score = 0
-
-    def up(self):
-        newx = self.xcor()
-        newy = self.ycor() + UNIT_SIZE
-        if (newx, newy) not in walls:
-            self.goto(newx, newy)
-
-    def dn(self):
-        newx = self.xcor()
-        newy = self.ycor() - UNIT_SIZE
-        if (newx, newy) not in walls:
-            self.goto(newx, newy)
-
-    def lt(self):
-        newx = self.xcor() - UNIT_SIZE
-        newy = self.ycor()
-        self.shape("player_left32x32.gif")
-        if (newx, newy) not in walls:
-            self.goto(newx, newy)
-
-    def rt(self):
-        newx = self.xcor() + UNIT_SIZE
-        newy = self.ycor()
-        self.shape("player_right32x32.gif")
-        if (newx, newy) not in walls:
-            self.goto(newx, newy)
-
-    def collision(self, other):
-        a = self.xcor() - other.xcor()
-        b = self.ycor() - other.ycor()
-        d = math.sqrt((a ** 2) + (b ** 2))
-        if d < 5:
-            return True
-        else:
+        self.x = 0
+        self.y = 0
+
+    def in_view(self, x, y, margin=0):
+        return (self.x - margin <= x < self.x + UNITS + margin and
+                self.y - margin <= y < self.y + UNITS + margin)
+
+    def to_screen(self, x, y):
+        return ((0 - SPLIT) + ((x - self.x) * UNIT_SIZE),
+                SPLIT - ((y - self.y) * UNIT_SIZE))
+
+    def follow(self, x, y):
+        """Recenter on level unit (x, y) once it comes within CAMERA_MARGIN
+        units of a view edge. Jumping rather than scrolling one unit per
+        step means the background only gets re-baked every few moves.
+        Returns True if the camera moved."""
+        if self.in_view(x, y, 0 - CAMERA_MARGIN):
             return False
+        newx, newy = view_origin(game.level, x, y)
+        if newx == self.x and newy == self.y:
+            return False  # Already as far as it goes at this edge of the level
+        self.x = newx
+        self.y = newy
+        return True
+
 
+class Sprite(turtle.Turtle):
+    """A turtle that draws one thing of the game while it is in view. The
+    game itself lives in game.py, sprites only show it."""
 
-class Monster(turtle.Turtle):
-    def __init__(self, x, y, mon_type,
-                 mon_shape_left, mon_shape_right, mon_max_pause):
-        # turtle.Turtle.__init__(self)  # Equivalent to following line
-        super(Monster, self).__init__()
-        self.type = mon_type
-        self.shape_left = mon_shape_left
-        self.shape_right = mon_shape_right
-        self.max_pause = mon_max_pause
-        self.shape(self.shape_right)
-        self.color("red")
+    def __init__(self):
+        super(Sprite, self).__init__(visible=False)
         self.penup()
         self.speed(0)
-        self.booty = 50
-        self.goto(x, y)
-        self.direction = random.choice(["up", "dn", "lt", "rt"])
-
-    def move(self):
-        if self.direction == "up":
-            deltax = 0
-            deltay = UNIT_SIZE
-        elif self.direction == "dn":
-            deltax = 0
-            deltay = 0 - UNIT_SIZE
-        elif self.direction == "lt":
-            deltax = 0 - UNIT_SIZE
-            deltay = 0
-            self.shape(self.shape_left)
-        elif self.direction == "rt":
-            deltax = UNIT_SIZE
-            deltay = 0
-            self.shape(self.shape_right)
-        else:  # For completeness of logic here even though it looks like
-                # a direction will always be set and this else block may
-                # never be hit. Maybe in the future monsters can stand
-                # still, meaning they have no direction and in that case
-                # we might want this else block. Even then we might not
-                # explicitly need it for the code to work but it is more
-                # correct to have it in place.
-            deltax = 0
-            deltay = 0
-
-        if self.nearby(player):
-            if player.xcor() < self.xcor():
-                self.direction = "lt"
-            elif player.xcor() > self.xcor():
-                self.direction = "rt"
-            elif player.ycor() < self.ycor():
-                self.direction = "dn"
-            elif player.ycor() > self.ycor():
-                self.direction = "up"
-            # NOTE: The above is biased such that horizantal following always
-            # occurs before vertical following
-
-        newx = self.xcor() + deltax
-        newy = self.ycor() + deltay
-
-        if (newx, newy) not in walls:
-            self.goto(newx, newy)
-        else:
-            self.direction = random.choice(["up", "dn", "lt", "rt"])
-
-        turtle.ontimer(self.move, t=random.randint(100, self.max_pause))
+        self.drawn = None
+
+    def show(self, shape_name, x, y):
+        """Show this sprite with a shape at level unit (x, y). It is only
+        flagged for redraw if that changes what is on the canvas."""
+        drawn = (shape_name, camera.to_screen(x, y))
+        if drawn != self.drawn:
+            self.shape(shape_name)
+            self.goto(drawn[1])
+            self.showturtle()
+            self.drawn = drawn
+            dirty.add(self)
+
+    def hide(self):
+        if self.drawn is not None:
+            self.hideturtle()
+            self.drawn = None
+            dirty.add(self)  # The hidden state still has to reach the canvas
+
+
+class SpritePool(object):
+    """Every Sprite for monsters and treasures, whether in use or spare.
+
+    Turtles are costly canvas items that are never freed, so hidden ones
+    are kept and handed out again instead of creating new ones for each
+    thing that comes into view or each level that is loaded."""
+
+    def __init__(self, limit):
+        """Args:
+            limit (int): the most sprites ever created"""
+        self.limit = limit
+        self.created = 0
+        self.spare = []
+
+    def prewarm(self, count):
+        """Create sprites up front, up to 'count' spare ones in total."""
+        while len(self.spare) < count and self.created < self.limit:
+            self.spare.append(Sprite())
+            self.created += 1
+
+    def take(self):
+        """Return a spare sprite, creating one if there is none, or None
+        if the limit has been reached."""
+        if self.spare:
+            return self.spare.pop()
+        if self.created < self.limit:
+            self.created += 1
+            return Sprite()
+        return None
+
+    def release(self, sprite):
+        """Hide a sprite and keep it for reuse."""
+        sprite.hide()
+        self.spare.append(sprite)
+
+    def release_all(self, sprites):
+        """Release every sprite in a dict of sprites and clear it."""
+        for sprite in sprites.values():
+            self.release(sprite)
+        sprites.clear()
+
+
+def create_maze_layer():
+    """Create the one background image the static maze is drawn into,
+    sized to the camera view and placed beneath all sprites. The old
+    approach stamped one canvas item per tile, all of which Tk then had to
+    manage on every update. The image must be kept referenced or Tk will
+    blank it when it is garbage collected.
+
+    Returns: The image and its canvas item, as a tuple."""
+    layer = create_layer_image()
+    # Turtle (0, 0) is canvas (0, 0) and canvas y grows downwards. View unit
+    # (0, 0) is centered on turtle (-SPLIT, SPLIT), so the top left corner
+    # of the layer sits half a unit up and left of that on the canvas.
+    corner = (0 - SPLIT) - (UNIT_SIZE / 2)
+    cv = window.getcanvas()
+    item = cv.create_image(corner, corner, image=layer, anchor="nw")
+    cv.tag_lower(item)
+    return layer, item
+
+
+def create_layer_image():
+    return tk.PhotoImage(width=UNITS * UNIT_SIZE, height=UNITS * UNIT_SIZE)
+
+
+def bake_maze():
+    """Copy the wall and stairs tiles inside the camera view into the
+    background layer. The cost depends only on the view size, never on the
+    size of the level."""
+    maze = game.level
+    maze_layer.blank()
+    for y in range(max(0, camera.y), min(maze.height, camera.y + UNITS)):
+        for x in range(max(0, camera.x), min(maze.width, camera.x + UNITS)):
+            unit = maze.tile(x, y)
+            if unit in tile_images:
+                maze_layer.tk.call(maze_layer, "copy", tile_images[unit],
+                                   "-to", (x - camera.x) * UNIT_SIZE,
+                                   (y - camera.y) * UNIT_SIZE)
+
+
+def prepare_view(level):
+    """Work out the first view of a level: the camera position centered on
+    the player start and the tiles to copy into the background layer for
+    it. Runs in the preloading thread, so it must not touch Tk.
+
+    Returns: A ((x, y), copies) tuple, copies being a list of (tile code,
+        x pixel, y pixel) tuples."""
+    start = [spawn for spawn in level.spawns if spawn[2] == ord("P")][0]
+    ox, oy = view_origin(level, start[0], start[1])
+    copies = []
+    for y in range(oy, min(level.height, oy + UNITS)):
+        for x in range(ox, min(level.width, ox + UNITS)):
+            unit = level.tile(x, y)
+            if unit in tile_images:
+                copies.append((unit, (x - ox) * UNIT_SIZE,
+                               (y - oy) * UNIT_SIZE))
+    return (ox, oy), copies
+
+
+class Prerender(object):
+    """Draws the first view of the preloaded level into the spare
+    background layer, PRERENDER_TILES per frame, while the current level is
+    still being played."""
 
-    def nearby(self, other):
-        a = self.xcor() - other.xcor()
-        b = self.ycor() - other.ycor()
-        distance = math.sqrt((a ** 2) + (b ** 2))
-
-        if distance < 75:
-            return True
+    def __init__(self):
+        self.number = None
+        self.origin = None
+        self.copies = []
+        self.done = 0
+
+    def begin(self, number, prepared):
+        self.number = number
+        self.origin, self.copies = prepared
+        self.done = 0
+        back_layer.blank()
+
+    def step(self):
+        end = min(len(self.copies), self.done + PRERENDER_TILES)
+        for unit, px, py in self.copies[self.done:end]:
+            back_layer.tk.call(back_layer, "copy", tile_images[unit],
+                               "-to", px, py)
+        self.done = end
+
+    def finished(self, number):
+        return self.number == number and self.done == len(self.copies)
+
+
+def fatal(e):
+    print "FATAL ERROR: {}".format(e)
+    exit(1)
+
+
+def preload_next():
+    """Keep the level after the one being played loading and drawing in
+    the background. Called once per frame."""
+    if endless or preloader.number is None:
+        return
+    if prerender.number != preloader.number and preloader.ready():
+        error = preloader.error()
+        if error is not None:
+            fatal(error)  # Reported now rather than at the stairs
+        level, prepared = preloader.take(preloader.number)
+        if level is None:
+            prerender.number = preloader.number  # No more levels
+            return
+        prerender.begin(preloader.number, prepared)
+    prerender.step()
+
+
+def enter_level():
+    """Show the level the game is on from scratch, such as after going down
+    the stairs. When the level was preloaded and its first view drawn in
+    advance, this only swaps the background layers."""
+    global maze_layer, back_layer
+    pool.release_all(treasure_sprites)
+    pool.release_all(monster_sprites)
+    shown_level[0] = game.number
+
+    if endless:
+        camera.x, camera.y = view_origin(game.level, game.player_x,
+                                         game.player_y)
+        bake_maze()
+        return
+    level, prepared = preloader.take(game.number)
+    camera.x, camera.y = prepared[0]
+    if prerender.finished(game.number):
+        maze_layer, back_layer = back_layer, maze_layer
+        window.getcanvas().itemconfig(maze_item, image=maze_layer)
+    else:
+        bake_maze()
+    preloader.start(game.number + 1)
+
+
+def show_treasure(unit):
+    """Bring the sprite of the treasure at a level unit, if any, in line
+    with the game."""
+    sprite = treasure_sprites.get(unit)
+    if unit in game.treasures and camera.in_view(unit[0], unit[1]):
+        if sprite is None:
+            sprite = pool.take()
+            if sprite is None:
+                return  # Out of sprites, it will show once one is free
+            treasure_sprites[unit] = sprite
+        sprite.show(TREASURE_SHAPE, unit[0], unit[1])
+    elif sprite is not None:
+        del treasure_sprites[unit]
+        pool.release(sprite)
+
+
+def show_monsters():
+    """Bring monster sprites in line with the game. Only monsters in view
+    get a sprite, and only those that moved or turned get redrawn."""
+    monsters = game.monsters
+    visible = monsters.within(camera.x, camera.y,
+                              camera.x + UNITS, camera.y + UNITS).tolist()
+    keep = set(visible)
+    for i in list(monster_sprites):
+        if i not in keep:
+            pool.release(monster_sprites.pop(i))
+    for i in visible:
+        sprite = monster_sprites.get(i)
+        if sprite is None:
+            sprite = pool.take()
+            if sprite is None:
+                break  # Out of sprites, the rest will show once one is free
+            monster_sprites[i] = sprite
+        left, right = KIND_SHAPES[monsters.kind[i]]
+        if monsters.facing_right[i]:
+            shape_name = right
         else:
-            return False
-
-    def dispose(self):
-        self.goto(2000, 2000)
-        self.hideturtle()
-
-
-class Treasure(turtle.Turtle):
-    def __init__(self, x, y):
-        super(Treasure, self).__init__()
-        self.shape("treasure_chest32x32.gif")
-        self.color("gold")
+            shape_name = left
+        sprite.show(shape_name, int(monsters.x[i]), int(monsters.y[i]))
+
+
+def show_game():
+    """Bring everything on the canvas in line with the game. Only the units
+    inside the camera view are ever visited."""
+    rescan = False
+    if game.number != shown_level[0]:
+        enter_level()
+        rescan = True
+    if camera.follow(game.player_x, game.player_y):
+        bake_maze()
+        rescan = True
+    if rescan:
+        for unit in list(treasure_sprites):
+            show_treasure(unit)  # Repositions it or releases it
+        for y in range(camera.y, camera.y + UNITS):
+            for x in range(camera.x, camera.x + UNITS):
+                if (x, y) in game.treasures:
+                    show_treasure((x, y))
+    for unit in game.changed:
+        show_treasure(unit)
+    del game.changed[:]
+
+    player_sprite.show(PLAYER_SHAPES[game.player_right],
+                       game.player_x, game.player_y)
+    show_monsters()
+
+
+# Redrawing only the dirty sprites needs three undocumented parts of turtle:
+# TurtleScreen._tracing, RawTurtle._drawturtle() and TurtleScreen._update(),
+# which TurtleScreen.update() is itself built from. They were checked against
+# the turtle of Python 2.7.18 and of Python 3.11.7. They are used here
+# and nowhere else, and any turtle without them gets the public update(),
+# which is slower but draws the same.
+FAST_REPAINT = (hasattr(window, "_tracing") and
+                hasattr(window, "_update") and
+                hasattr(turtle.Turtle, "_drawturtle"))
+
+
+def render_frame():
+    """Redraw only the sprites flagged dirty since the last frame. Tk then
+    paints them on the next present(). window.update() would instead
+    redraw every turtle ever created on every frame, hidden ones included."""
+    if FAST_REPAINT:
+        # A turtle only paints itself while tracing is on, so switch it on
+        # just for the redraw, the same way TurtleScreen.update() does.
+        window._tracing = True
+        try:
+            for sprite in dirty:
+                sprite._drawturtle()
+        finally:
+            window._tracing = 0
+    dirty.clear()
+
+
+def present():
+    """Have Tk show everything drawn since the last frame."""
+    if FAST_REPAINT:
+        window._update()
+    else:
+        window.update()  # Redraws every turtle, dirty or not
+
+
+class StatsOverlay(turtle.Turtle):
+    """Rolling frame time percentiles written over the bottom left corner
+    of the view. See profiler.py."""
+
+    def __init__(self, shown):
+        super(StatsOverlay, self).__init__(visible=False)
         self.penup()
-        self.speed(0)
-        self.value = 100
-        self.goto(x, y)
-
-    def dispose(self):
-        self.goto(2000, 2000)
-        self.hideturtle()
-
-
-treasures = []
-
-levels = [""]
-
-level_1_25 = [
-    "XXXXXXXXXXXXXXXXXXXXXXXXX",
-    "XP                      X",
-    "X  XXXXX XXX XXXX XXXXX X",
-    "X XXX    XXX XXXX XT  X X",
-    "X X   XXXX      X X     X",
-    "X       CXXX XX X X  CX X",
-    "XXXXXXXXXXXX XX X XXXXX X",
-    "X    XX    X X  X X   X X",
-    "X X      X   X  X     X X",
-    "X X      X   X  X X   X X",
-    "X    XX    X XXXX XXXXXXX",
-    "XXXXXXXXXX X   XX       X",
-    "X          X   XXXXXXXX X",
-    "X XXXXXX XXXX XXXX X    X",
-    "X XXXX     XX XD   X XX X",
-    "X   XX     XX XXXX   XX X",
-    "X  CXX T   XX XC    XXXXX",
-    "XXX XX     XX XXXXX     X",
-    "X   XXXXXXXXX XX XXXX X X",
-    "X XXX             XXX XXX",
-    "X XXXX XX X X X XXXXD   X",
-    "X    X XX       XX   XX X",
-    "XXXX X  X X X X XX XXX  X",
-    "XC   XX X    C  XX   X =X",
-    "XXXXXXXXXXXXXXXXXXXXXXXXX"
-]
-
-# Just for testing
-level_1_24 = [
-    "XXXXXXXXXXXXXXXXXXXXXXXX",
-    "XP                     X",
-    "X XXXXX XXX XXXX XXXXX X",
-    "X XX    XXX XXXX XT  X X",
-    "X X  XXXX      X X     X",
-    "X       XXX XX X X   X X",
-    "XXXXXXXXXXX XX X XXXXX X",
-    "X   XX    X X  X X   X X",
-    "X X     X   X  X X   X X",
-    "X   XX    X XXXX XXXXXXX",
-    "XXXXXXXXX X   XX       X",
-    "X         X   XXXXXXXX X",
-    "X XXXXX XXXX XXXX X    X",
-    "X XXX     XX X    X XX X",
-    "X  XX     XX XXXX   XX X",
-    "X  XX T   XX X     XXXXX",
-    "XX XX     XX XXXXX     X",
-    "X  XXXXXXXXX XX XXXX X X",
-    "X XX             XXX XXX",
-    "X XXX XX X X X XXXX    X",
-    "X   X XX       XX   XX X",
-    "XXX X  X X X X XX XXX  X",
-    "X   XX X       XX   X =X",
-    "XXXXXXXXXXXXXXXXXXXXXXXX"
-]
-
-levels.append(level_1_25)
-
-
-def validate_maze(level):
-    rows = len(level)
-    if not rows == UNITS:
-        print "FATAL ERROR: Maze/level data row count does not match global " \
-            "configuration for UNITS. The level contains {} rows but it " \
-            "should contain exactly {} rows.".format(rows, UNITS)
-        exit(1)
-    for y in range(rows):
-        row = level[y]
-        row_units = len(row)
-        if not row_units == UNITS:
-            print "FATAL ERROR: Maze/level data row UNITS in row " \
-                "{} (0 indexed) does not match global configuration " \
-                "for UNITS. Row contains {} units but it should contain " \
-                "exactly {} units.".format(y, row_units, UNITS)
-            exit(1)
-        for x in range(row_units):
-            unit = level[y][x]
-            if not unit in "X =TCDP":
-                print "WARNING: Unrecognized unit type in maze/level data " \
-                    "at (0 indexed) position {} and row {}".format(x, y)
-
-
-def setup_maze(level, walls):
-    rows = len(level)
-    for y in range(rows):
-        row = level[y]
-        row_units = len(row)
-        for x in range(row_units):
-            unit = level[y][x]
-            screen_x = (0 - SPLIT) + (x * UNIT_SIZE)
-            screen_y = SPLIT - (y * UNIT_SIZE)
-
-            if unit == "=":
-                pen.goto(screen_x, screen_y)
-                pen.shape("stairs_dn_right32x32.gif")
-                pen.stamp()
-
-            if unit == "X":
-                pen.goto(screen_x, screen_y)
-                pen.shape("cave_wall32x32.gif")
-                pen.stamp()
-                walls.append((screen_x, screen_y))
-
-
-def setup_beings(level):
-    rows = len(level)
-    for y in range(rows):
-        row = level[y]
-        row_units = len(row)
-        for x in range(row_units):
-            unit = level[y][x]
-            screen_x = (0 - SPLIT) + (x * UNIT_SIZE)
-            screen_y = SPLIT - (y * UNIT_SIZE)
-
-            if unit == "T":
-                treasures.append(Treasure(screen_x, screen_y))
-
-            if unit == "C":
-                monsters.append(Monster(screen_x, screen_y, "cyclops",
-                                        "cyclops_left32x32.gif",
-                                        "cyclops_right32x32.gif",
-                                        450))
-
-            if unit == "D":
-                monsters.append(Monster(screen_x, screen_y, "dragon",
-                                        "dragon_left32x32.gif",
-                                        "dragon_right32x32.gif",
-                                        150))
-
-            if unit == "P":
-                player.goto(screen_x, screen_y)
-
-
-pen = Pen()
-player = Player()
-
-walls = []
-
-monsters = []
-
-validate_maze(levels[1])
-setup_maze(levels[1], walls)
-setup_beings(levels[1])
+        self.color("white")
+        self.goto((0 - SPLIT) - (UNIT_SIZE / 2) + 4,
+                  (0 - SPLIT) - (UNIT_SIZE / 2) + 4)
+        self.shown = shown
+        self.written_ms = 0
+
+    def toggle(self):
+        self.shown = not self.shown
+        self.written_ms = 0
+        self.clear()
+
+    def refresh(self, now):
+        if not self.shown or now - self.written_ms < OVERLAY_MS:
+            return
+        self.written_ms = now
+        self.clear()
+        self.write("\n".join(profiler.report() + [inputs.report()]),
+                   font=("Courier", 12, "normal"))
+
+
+if args.seed is not None:
+    seed = args.seed
+else:
+    seed = random.randint(0, (2 ** 31) - 1)
+print "Game seed: {}".format(seed)
+
+# Everything that decides the game happens in game.py, this file only draws
+# it and feeds it key presses.
+# The game loads levels through the preloader, which has the next one ready
+# by the time the player finds the stairs.
+preloader = LevelPreloader(load_numbered, prepare_view)
+try:
+    game = open_game(seed, 1, endless, preloader.load)
+except ValueError as e:
+    fatal(e)
+if args.record:
+    recorder = Recorder(args.record, seed, 1, endless)
+else:
+    recorder = None
+
+# Each frame is timed in these phases. "tk" is Tk painting the canvas and
+# handling window events, key presses included.
+profiler = FrameProfiler(("input", "sim", "collision", "render", "tk"),
+                         trace=args.trace)
+overlay = StatsOverlay(args.profile)
+
+camera = Camera()
+player_sprite = Sprite()
+pool = SpritePool(SPRITE_LIMIT)
+pool.prewarm(PREWARM_SPRITES)
+maze_layer, maze_item = create_maze_layer()
+back_layer = create_layer_image()  # Where the next level is drawn ahead
+prerender = Prerender()
+shown_level = [None]  # Number of the level on screen
+show_game()
+
+# Key presses are only queued here. The main loop hands them to the game at
+# the start of each simulation tick, as many as one tick allows. See
+# inputqueue.py.
+inputs = InputQueue()
 
 turtle.listen()
-turtle.onkey(player.lt, "Left")
-turtle.onkey(player.rt, "Right")
-turtle.onkey(player.up, "Up")
-turtle.onkey(player.dn, "Down")
+turtle.onkey(lambda: inputs.push(LT), "Left")
+turtle.onkey(lambda: inputs.push(RT), "Right")
+turtle.onkey(lambda: inputs.push(UP), "Up")
+turtle.onkey(lambda: inputs.push(DN), "Down")
 
-turtle.onkey(player.lt, "a")
-turtle.onkey(player.rt, "d")
-turtle.onkey(player.up, "w")
-turtle.onkey(player.dn, "s")
+turtle.onkey(lambda: inputs.push(LT), "a")
+turtle.onkey(lambda: inputs.push(RT), "d")
+turtle.onkey(lambda: inputs.push(UP), "w")
+turtle.onkey(lambda: inputs.push(DN), "s")
 
-window.tracer(0)
+turtle.onkey(overlay.toggle, "p")
 
-for monster in monsters:
-    turtle.ontimer(monster.move, t=250)
+window.tracer(0)
 
+score = 0
 loop = True
 try:
+    next_tick_ms = now_ms()
     while (loop is True):
-        for treasure in treasures:
-            if player.collision(treasure):
-                player.score += treasure.value
-                print("Player gold pieces: {}".format(player.score))
-                treasure.dispose()
-                treasures.remove(treasure)
-
-        for monster in monsters:
-            if player.collision(monster):
-                print "You died a horrible death " \
-                    "at the hands of a {}!".format(monster.type)
-                loop = False
-
-        window.update()
+        profiler.start_frame()
+        # The game runs in fixed ticks of game time however fast frames are
+        # drawn, which keeps it exactly repeatable. See game.py.
+        now = now_ms()
+        ticks = 0
+        while next_tick_ms <= now and ticks < MAX_CATCH_UP:
+            moves = inputs.take()
+            if recorder is not None:
+                for move in moves:
+                    recorder.record(game.tick, move)
+            profiler.mark("input")
+            game.advance(moves)
+            profiler.mark("sim")
+            game.collide()
+            profiler.mark("collision")
+            next_tick_ms += TICK_MS
+            ticks += 1
+        if ticks == MAX_CATCH_UP:
+            next_tick_ms = now
+
+        if game.score != score:
+            score = game.score
+            print("Player gold pieces: {}".format(score))
+
+        if not game.alive:
+            print "You died a horrible death " \
+                "at the hands of a {}!".format(game.killer)
+            loop = False
+
+        show_game()
+        render_frame()
+        preload_next()
+        overlay.refresh(now)
+        profiler.mark("render")
+        present()
+        profiler.mark("tk")
+        profiler.end_frame()
 except Exception as e:
     e_string = str(e)
     if DEBUG:
@@ -433,6 +645,12 @@ except Exception as e:
         print "EXITING."
         time.sleep(1)
         sys.exit(0)
+finally:
+    if recorder is not None:
+        recorder.close(game)
+    profiler.close()
+    if args.profile:
+        print inputs.report()
 
 # TODO: Can't do window.bye() here for the case of a mouse-click-closed
 # macos window. this worked fine for ending the game from code, but throws
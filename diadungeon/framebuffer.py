@@ -0,0 +1,316 @@
+#! /usr/bin/env python
+# Off-screen renderer for diadungeon. Works under Python 2 and Python 3.
+# Requires NumPy, but neither Tk nor a display.
+#
+# The same GIF sprites the Tk window uses are decoded once, by the small GIF
+# reader below, and blitted into a NumPy RGB framebuffer. The static maze in
+# view is assembled into a background in one array operation whenever the
+# camera moves, so a frame is a copy of the background plus a few sprites.
+#
+# Run as a script it renders a recording made with "diadungeon.py --record",
+# as a sequence of PPM images or as one raw RGB stream:
+#
+#   python framebuffer.py session.ddr --out frames/
+#   python framebuffer.py session.ddr --raw - | ffmpeg -f rawvideo \
+#       -pix_fmt rgb24 -s 800x800 -r 25 -i - session.mp4
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+import numpy
+
+from game import TICK_MS
+from levelcompiler import FLOOR, WALL, STAIRS
+from monsters import KINDS
+from replay import read_log, replay
+
+UNIT_SIZE = 32
+UNITS = 25  # Units across the square view, as in the Tk window
+CAMERA_MARGIN = 4  # The camera follows the player as in the Tk window
+BACKGROUND = (10, 71, 4)  # Floor color, the Tk window background
+
+SPRITE_DIR = os.path.dirname(os.path.abspath(__file__))
+TILE_SHAPES = {WALL: "cave_wall32x32.gif", STAIRS: "stairs_dn_right32x32.gif"}
+PLAYER_SHAPES = ("player_left32x32.gif", "player_right32x32.gif")
+TREASURE_SHAPE = "treasure_chest32x32.gif"
+MONSTER_SHAPES = {
+    "cyclops": ("cyclops_left32x32.gif", "cyclops_right32x32.gif"),
+    "dragon": ("dragon_left32x32.gif", "dragon_right32x32.gif")
+}
+KIND_SHAPES = [MONSTER_SHAPES[kind[0]] for kind in KINDS]
+
+
+def lzw_decode(data, min_code_size):
+    """Decode the LZW compressed pixel data of a GIF image.
+
+    Returns: The color indexes, as a bytearray."""
+    clear = 1 << min_code_size
+    end = clear + 1
+    base = [bytearray([i]) for i in range(clear)] + [bytearray(), bytearray()]
+    table = list(base)
+    code_size = min_code_size + 1
+    out = bytearray()
+    prev = None
+    bits = 0
+    bit_count = 0
+    for byte in data:
+        bits |= byte << bit_count
+        bit_count += 8
+        while bit_count >= code_size:
+            code = bits & ((1 << code_size) - 1)
+            bits >>= code_size
+            bit_count -= code_size
+            if code == clear:
+                table = list(base)
+                code_size = min_code_size + 1
+                prev = None
+                continue
+            if code == end:
+                return out
+            if code < len(table):
+                entry = table[code]
+                if prev is not None:
+                    table.append(prev + entry[:1])
+            elif code == len(table) and prev is not None:
+                entry = prev + prev[:1]
+                table.append(entry)
+            else:
+                raise ValueError("Corrupt GIF image data.")
+            out += entry
+            prev = entry
+            if len(table) == (1 << code_size) and code_size < 12:
+                code_size += 1
+    return out
+
+
+def read_gif(path):
+    """Read the first image of a GIF file.
+
+    Returns: An (rgb, mask) tuple. rgb is a height x width x 3 uint8 array,
+        mask a height x width bool array, False where the image is
+        transparent."""
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        raise ValueError("{} is not a GIF file.".format(path))
+    width, height, flags = struct.unpack_from("<HHB", data, 6)
+    pos = 13
+    palette = None
+    if flags & 0x80:
+        size = 3 * (2 << (flags & 7))
+        palette = data[pos:pos + size]
+        pos += size
+
+    transparent = None
+    while pos < len(data):
+        block = data[pos]
+        if block == 0x21:  # Extension, only graphic control is of interest
+            if data[pos + 1] == 0xF9 and data[pos + 3] & 1:
+                transparent = data[pos + 6]
+            pos += 2
+            while data[pos]:
+                pos += data[pos] + 1
+            pos += 1
+        elif block == 0x2C:  # Image descriptor
+            left, top, w, h, image_flags = struct.unpack_from("<HHHHB",
+                                                              data, pos + 1)
+            pos += 10
+            if image_flags & 0x80:
+                size = 3 * (2 << (image_flags & 7))
+                palette = data[pos:pos + size]
+                pos += size
+            min_code_size = data[pos]
+            pos += 1
+            compressed = bytearray()
+            while data[pos]:
+                compressed += data[pos + 1:pos + 1 + data[pos]]
+                pos += data[pos] + 1
+            break
+        else:
+            raise ValueError("{} contains no image.".format(path))
+    else:
+        raise ValueError("{} contains no image.".format(path))
+    if palette is None:
+        raise ValueError("{} has no color table.".format(path))
+
+    pixels = lzw_decode(compressed, min_code_size)[:w * h]
+    pixels += bytearray(w * h - len(pixels))
+    index = numpy.frombuffer(bytes(pixels), numpy.uint8).reshape(h, w)
+    if image_flags & 0x40:  # Interlaced rows are stored in four passes
+        rows = (list(range(0, h, 8)) + list(range(4, h, 8)) +
+                list(range(2, h, 4)) + list(range(1, h, 2)))
+        ordered = numpy.empty_like(index)
+        ordered[rows] = index
+        index = ordered
+    colors = numpy.frombuffer(bytes(palette), numpy.uint8).reshape(-1, 3)
+
+    rgb = numpy.zeros((height, width, 3), numpy.uint8)
+    mask = numpy.zeros((height, width), numpy.bool_)
+    rgb[top:top + h, left:left + w] = colors[numpy.minimum(index,
+                                                           len(colors) - 1)]
+    mask[top:top + h, left:left + w] = index != transparent
+    return rgb, mask
+
+
+class FrameRenderer(object):
+    """Draws a Game into a NumPy RGB framebuffer, the way the Tk window
+    shows it.
+
+    frame   the framebuffer, a UNITS * UNIT_SIZE square, height x width x 3
+            uint8 array, redrawn by render()"""
+
+    def __init__(self, sprite_dir=SPRITE_DIR):
+        self.sprites = {}
+        names = (list(TILE_SHAPES.values()) + list(PLAYER_SHAPES) +
+                 [TREASURE_SHAPE])
+        for shapes in KIND_SHAPES:
+            names.extend(shapes)
+        for name in names:
+            self.sprites[name] = read_gif(os.path.join(sprite_dir, name))
+
+        # Tiles of the static maze by tile code, floor and walls alike, to
+        # build the background from in one gather.
+        floor = numpy.empty((UNIT_SIZE, UNIT_SIZE, 3), numpy.uint8)
+        floor[:] = BACKGROUND
+        self._tiles = numpy.array([floor] * (max(FLOOR, WALL, STAIRS) + 1))
+        for code, name in TILE_SHAPES.items():
+            rgb, mask = self.sprites[name]
+            self._tiles[code][mask] = rgb[mask]
+
+        size = UNITS * UNIT_SIZE
+        self.frame = numpy.zeros((size, size, 3), numpy.uint8)
+        self._background = None
+        self._level = None
+        self.x = 0
+        self.y = 0
+
+    def follow(self, game):
+        """Move the camera as the Tk window does: recentered on the player
+        once it comes within CAMERA_MARGIN units of an edge of the view.
+        Returns True if the view changed."""
+        level = game.level
+        x = game.player_x
+        y = game.player_y
+        if (self._level is level and
+                self.x + CAMERA_MARGIN <= x < self.x + UNITS - CAMERA_MARGIN
+                and
+                self.y + CAMERA_MARGIN <= y < self.y + UNITS - CAMERA_MARGIN):
+            return False
+        half = UNITS // 2
+        newx = min(max(0, x - half), max(0, level.width - UNITS))
+        newy = min(max(0, y - half), max(0, level.height - UNITS))
+        if self._level is level and newx == self.x and newy == self.y:
+            return False  # Already as far as it goes at this edge
+        self.x = newx
+        self.y = newy
+        self._level = level
+        return True
+
+    def _bake(self, level):
+        codes = numpy.array([[level.tile(x, y)
+                              for x in range(self.x, self.x + UNITS)]
+                             for y in range(self.y, self.y + UNITS)],
+                            numpy.intp)
+        # UNITS x UNITS x UNIT_SIZE x UNIT_SIZE x 3, laid out as rows of
+        # tiles and then rows of pixels.
+        tiles = self._tiles[codes]
+        self._background = tiles.transpose(0, 2, 1, 3, 4).reshape(
+            self.frame.shape)
+
+    def _blit(self, name, x, y):
+        rgb, mask = self.sprites[name]
+        px = (x - self.x) * UNIT_SIZE
+        py = (y - self.y) * UNIT_SIZE
+        numpy.copyto(self.frame[py:py + UNIT_SIZE, px:px + UNIT_SIZE], rgb,
+                     where=mask[:, :, None])
+
+    def render(self, game):
+        """Draw the game as it stands into frame, and return frame."""
+        if self.follow(game) or self._background is None:
+            self._bake(game.level)
+        self.frame[:] = self._background
+
+        right = self.x + UNITS
+        bottom = self.y + UNITS
+        for x, y in game.treasures:
+            if self.x <= x < right and self.y <= y < bottom:
+                self._blit(TREASURE_SHAPE, x, y)
+        monsters = game.monsters
+        for i in monsters.within(self.x, self.y, right, bottom).tolist():
+            shapes = KIND_SHAPES[monsters.kind[i]]
+            self._blit(shapes[bool(monsters.facing_right[i])],
+                       int(monsters.x[i]), int(monsters.y[i]))
+        self._blit(PLAYER_SHAPES[game.player_right], game.player_x,
+                   game.player_y)
+        return self.frame
+
+
+def write_ppm(path, frame):
+    """Write a framebuffer as a binary PPM image."""
+    with open(path, "wb") as f:
+        f.write("P6\n{} {}\n255\n".format(frame.shape[1],
+                                          frame.shape[0]).encode("ascii"))
+        f.write(frame.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render a recorded diadungeon game off-screen, as PPM "
+                    "images or a raw RGB video stream.")
+    parser.add_argument("recording")
+    parser.add_argument("--out", metavar="DIR",
+                        help="write frame_000000.ppm and on into DIR")
+    parser.add_argument("--raw", metavar="FILE",
+                        help="write all frames back to back as raw 24 bit "
+                             "RGB into FILE, - for standard output")
+    parser.add_argument("--every", type=int, default=2,
+                        help="render every this many ticks, default 2 for "
+                             "{} frames per second".format(
+                                 1000 // (2 * TICK_MS)))
+    args = parser.parse_args()
+
+    header, moves = read_log(args.recording)
+    renderer = FrameRenderer()
+    if args.out and not os.path.isdir(args.out):
+        os.makedirs(args.out)
+    raw = None
+    if args.raw == "-":
+        raw = getattr(sys.stdout, "buffer", sys.stdout)
+    elif args.raw:
+        raw = open(args.raw, "wb")
+    frames = [0]
+
+    def on_tick(game):
+        if game.tick % args.every:
+            return
+        frame = renderer.render(game)
+        if args.out:
+            write_ppm(os.path.join(args.out,
+                                   "frame_{:06d}.ppm".format(frames[0])),
+                      frame)
+        if raw is not None:
+            raw.write(frame.tobytes())
+        frames[0] += 1
+
+    start = time.time()
+    game = replay(header, moves, on_tick)
+    elapsed = max(time.time() - start, 1e-9)
+    if raw is not None and raw is not getattr(sys.stdout, "buffer",
+                                              sys.stdout):
+        raw.close()
+    sys.stderr.write("{} frames of {:.1f} s of play in {:.1f} s, {:.0f} "
+                     "frames/s, {:.1f}x real time.\n".format(
+                         frames[0], game.now / 1000.0, elapsed,
+                         frames[0] / elapsed,
+                         game.now / 1000.0 / elapsed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+##
+#
@@ -0,0 +1,232 @@
+#! /usr/bin/env python
+# The diadungeon simulation, with no drawing and no Tk. Works under Python 2
+# and Python 3. Requires NumPy.
+#
+# Everything that decides how a game plays out lives here. It runs in fixed
+# ticks of TICK_MS of game time, never wall clock time, and all randomness is
+# drawn from one generator seeded per game. The same level, seed and player
+# moves at the same ticks therefore always play out exactly the same, which
+# is what lets replay.py re-run a recorded game headless at full speed and
+# check that it ends bit for bit the same way.
+
+import hashlib
+import struct
+
+import numpy
+
+from levelcompiler import STAIRS
+from monsters import MonsterStore, KIND_OF, MIN_PAUSE, STEP_X, STEP_Y, \
+    STEP_LINK, LT, RT
+from scheduler import Scheduler
+
+TICK_MS = 20  # Game time per simulation tick, in milliseconds
+TREASURE_VALUE = 100
+
+# Monsters further than this many units from the player can never be in
+# view, which is UNITS = 25 across, so they are simulated more slowly. See
+# MonsterStore.tick().
+NEAR_UNITS = 32
+
+
+class Game(object):
+    """One game of diadungeon on one level.
+
+    The front end feeds player moves into step() once per tick and draws
+    whatever it finds in the attributes below. Nothing in here depends on
+    how, or whether, the game is drawn.
+
+    player_x, player_y   the player's level unit
+    player_right         True if the player faces right
+    score                gold collected
+    alive                False once a monster has caught the player
+    killer               name of the kind of monster that did it
+    number               number of the level being played, see loader
+    treasures            treasure value by level unit
+    changed              units whose treasure appeared or was collected,
+                         for the front end to catch up on and clear
+    monsters             the MonsterStore
+    tick, now            ticks played and game time in milliseconds"""
+
+    def __init__(self, level, seed, number=0, loader=None, max_pause=None):
+        """Args:
+            level: a levelcompiler.CompiledLevel or a mazegen.ChunkedMaze
+            seed (int): seeds every random choice made in the game
+            number (int): the number of 'level'
+            loader (callable): optional, called with a level number to get
+                that CompiledLevel, or None if there is no such level. With
+                a loader, stairs lead down to the level numbered one more
+                than the current one.
+            max_pause (list): optional longest pause between moves of each
+                kind of monster, see MonsterStore"""
+        self.level = level
+        self.seed = seed
+        self.number = number
+        self._loader = loader
+        self.rng = numpy.random.RandomState(seed)
+        self.monsters = MonsterStore(self.rng, max_pause=max_pause)
+        self.timers = Scheduler()
+        self.tick = 0
+        self.now = 0
+        self.player_x = None
+        self.player_y = None
+        self.player_right = True
+        self.score = 0
+        self.alive = True
+        self.killer = None
+        self.treasures = {}
+        self.changed = []
+
+        # A generated dungeon hands out spawns chunk by chunk as the player
+        # gets near, a compiled level has them all up front.
+        self._prefetch = getattr(level, "prefetch", None)
+        if self._prefetch is not None:
+            self.prefetch(0, 0)
+        else:
+            self.spawn(level.spawns)
+        self.timers.schedule(self.now, self._move_monsters)
+
+    def spawn(self, spawns):
+        for x, y, kind in spawns:
+            if chr(kind) == "P":
+                self.player_x = x
+                self.player_y = y
+
+        # Monsters that can never reach the player are put to sleep. Only
+        # compiled levels know their regions, a generated dungeon is all
+        # one region.
+        region = getattr(self.level, "region", None)
+        if region is not None:
+            home = region(self.player_x, self.player_y)
+
+        for x, y, kind in spawns:
+            unit = chr(kind)
+
+            if unit == "T":
+                self.treasures[(x, y)] = (self.treasures.get((x, y), 0) +
+                                          TREASURE_VALUE)
+                self.changed.append((x, y))
+
+            if unit in KIND_OF:
+                self.monsters.add(x, y, KIND_OF[unit], self.now,
+                                  region is not None and region(x, y) != home)
+
+    def prefetch(self, x, y):
+        """Load the chunks of a generated dungeon around unit (x, y), see
+        ChunkedMaze.prefetch(). Monsters and treasures in chunks that get
+        dropped are dropped with them, and chunks that get loaded spawn
+        theirs, apart from the player, who only starts once."""
+        spawns, dropped = self._prefetch(x, y)
+        for left, top, right, bottom in dropped:
+            self.monsters.remove_within(left, top, right, bottom)
+            for unit in [unit for unit in self.treasures
+                         if left <= unit[0] < right and
+                         top <= unit[1] < bottom]:
+                del self.treasures[unit]
+                self.changed.append(unit)
+        if self.player_x is not None:
+            spawns = [spawn for spawn in spawns if chr(spawn[2]) != "P"]
+        self.spawn(spawns)
+
+    def step(self, moves=()):
+        """Play one tick. The player moves first, once for each direction
+        in 'moves' (monsters.UP, DN, LT or RT), then any monsters that are
+        due move, then the player is checked for being caught. Does nothing
+        once the player is dead."""
+        self.advance(moves)
+        self.collide()
+
+    def advance(self, moves=()):
+        """The first part of step(), everything but the final collide().
+        Only split out so the two can be timed apart."""
+        if not self.alive:
+            return
+        for direction in moves:
+            self.move_player(direction)
+        self.tick += 1
+        self.now = self.tick * TICK_MS
+        self.timers.run_due(self.now)
+
+    def move_player(self, direction):
+        if direction == LT:
+            self.player_right = False
+        elif direction == RT:
+            self.player_right = True
+        if not self.level.links(self.player_x, self.player_y) & \
+                STEP_LINK[direction]:
+            return
+        self.player_x += int(STEP_X[direction])
+        self.player_y += int(STEP_Y[direction])
+        if self._prefetch is not None:
+            self.prefetch(self.player_x, self.player_y)
+
+        unit = (self.player_x, self.player_y)
+        if unit in self.treasures:
+            self.score += self.treasures.pop(unit)
+            self.changed.append(unit)
+        if self._loader is not None and \
+                self.level.tile(self.player_x, self.player_y) == STAIRS:
+            self.descend()
+        self.collide()
+
+    def descend(self):
+        """Go down the stairs to the next level, keeping the score. The
+        monsters and treasures of the current level are left behind.
+        Nothing happens on the last level."""
+        level = self._loader(self.number + 1)
+        if level is None:
+            return
+        self.number += 1
+        self.level = level
+        self.monsters.clear()
+        self.changed.extend(self.treasures)
+        self.treasures.clear()
+        self.spawn(level.spawns)
+
+    def collide(self):
+        """Check whether a monster has caught the player."""
+        if not self.alive:
+            return
+        killer = self.monsters.at(self.player_x, self.player_y)
+        if killer >= 0:
+            self.alive = False
+            self.killer = self.monsters.name(killer)
+
+    def _move_monsters(self):
+        # The one scheduler job that moves every monster. It re-arms itself
+        # for the earliest next move, but never more than MIN_PAUSE away,
+        # so monsters spawned meanwhile are not kept waiting.
+        near = (self.player_x - NEAR_UNITS, self.player_y - NEAR_UNITS,
+                self.player_x + NEAR_UNITS + 1, self.player_y + NEAR_UNITS + 1)
+        self.monsters.tick(self.now, self.level, self.player_x,
+                           self.player_y, near)
+        due = self.monsters.next_due()
+        if due is None:
+            return MIN_PAUSE
+        return min(max(0, due - self.now), MIN_PAUSE)
+
+    def digest(self):
+        """Return a hash of the complete game state. Two games that played
+        out identically have identical digests."""
+        h = hashlib.sha1()
+        h.update(struct.pack("<IIiiI?", self.tick, self.number,
+                             self.player_x, self.player_y, self.score,
+                             self.alive))
+        monsters = self.monsters
+        n = monsters.count
+        for column in (monsters.x, monsters.y, monsters.direction,
+                       monsters.facing_right, monsters.kind,
+                       monsters.next_move):
+            h.update(column[:n].tobytes())
+        for unit in sorted(self.treasures):
+            h.update(struct.pack("<iiI", unit[0], unit[1],
+                                 self.treasures[unit]))
+        return h.digest()
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
@@ -0,0 +1,88 @@
+#! /usr/bin/env python
+# Player input queue for diadungeon. Works under Python 2 and Python 3.
+#
+# Key callbacks only push the move they stand for. The main loop takes the
+# moves for each simulation tick, at most MOVE_BUDGET of them, so a key held
+# down and auto-repeating never moves the player faster than the game allows
+# and never floods a tick with moves. The queue holds at most MAX_QUEUED
+# moves, which bounds how long any key press can wait before it is applied:
+# MAX_QUEUED / MOVE_BUDGET ticks. How long presses actually waited is kept
+# for measuring input latency.
+
+import collections
+
+from profiler import percentile
+from scheduler import now_ms
+
+MOVE_BUDGET = 1  # Moves applied per simulation tick
+MAX_QUEUED = 2  # Moves waiting at most, so presses wait at most 2 ticks
+LATENCY_WINDOW = 300  # Applied moves kept for latency percentiles
+
+
+class InputQueue(object):
+    """Moves waiting to be applied, oldest first, with the time each key
+    was pressed."""
+
+    def __init__(self, budget=MOVE_BUDGET, depth=MAX_QUEUED, clock=now_ms):
+        """Args:
+            budget (int): the most moves take() returns per tick
+            depth (int): the most moves waiting at once
+            clock (callable): returns the time in milliseconds"""
+        self.budget = budget
+        self.depth = depth
+        self.clock = clock
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.pressed = 0
+        self.dropped = 0
+        self._queue = collections.deque()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def push(self, direction):
+        """Queue a move, usually straight from a key callback. When the
+        queue is full a new direction replaces the newest waiting move,
+        so the latest intent wins, and a repeat of it is dropped."""
+        self.pressed += 1
+        event = (direction, self.clock())
+        if len(self._queue) < self.depth:
+            self._queue.append(event)
+        elif self._queue[-1][0] != direction:
+            self._queue[-1] = event
+            self.dropped += 1
+        else:
+            self.dropped += 1
+
+    def take(self):
+        """Return the moves to apply this tick, at most 'budget' of them,
+        oldest first, and record how long each of them waited."""
+        now = self.clock()
+        moves = []
+        while self._queue and len(moves) < self.budget:
+            direction, pressed = self._queue.popleft()
+            self.latencies.append(now - pressed)
+            moves.append(direction)
+        return moves
+
+    def clear(self):
+        self._queue.clear()
+
+    def report(self):
+        """Return a line of text on recent input latency and dropped key
+        presses."""
+        if not self.latencies:
+            return "input latency: no moves yet"
+        ordered = sorted(self.latencies)
+        return ("input latency ms p50 {} p99 {} max {}, {} of {} presses "
+                "coalesced".format(percentile(ordered, 50),
+                                   percentile(ordered, 99), ordered[-1],
+                                   self.dropped, self.pressed))
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
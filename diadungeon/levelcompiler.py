@@ -0,0 +1,396 @@
+#! /usr/bin/env python
+# Level compiler and on-disk cache for diadungeon. Works under Python 2 and
+# Python 3.
+#
+# Levels are written by hand as lists of strings, one character per grid
+# unit. Validating and walking those strings on every start is wasted work,
+# so they are compiled once into a compact binary form and cached on disk
+# under the hash of their text. Loading a cached level is then one read into
+# a buffer plus memory views over it.
+#
+# COMPILED LEVEL FORMAT (all integers little endian)
+#
+#   header    magic "DDL1", version (uint16), reserved (uint16),
+#             width, height, spawn count (uint32 each)
+#   grid      width * height bytes, one tile code per unit, row by row
+#   links     width * height bytes, one bitmask per unit of which of its
+#             four neighbours can be moved into (LINK_UP etc.)
+#   sight     width * height uint32, one bitmask per unit of which of the
+#             units around it can be seen from it, bit k for the unit at
+#             offset SIGHT_OFFSETS[k]
+#   regions   width * height uint32, the region of each unit. Units can
+#             reach each other exactly when they are in the same region.
+#             Walls are in region 0.
+#   spawns    spawn count records of x, y (uint32 each) and the level
+#             character of what spawns there (uint8), in row order
+#
+# Spawn units ("P", "T", "C", "D") are floor in the grid.
+#
+# Sight is worked out once here so that whether one unit can see another
+# nearby is a single lookup while playing. Only units within SIGHT_SQ
+# squared units of each other are covered, which is as far as monsters
+# notice the player. A unit sees another unless walls block every line
+# between their centers. A line that runs exactly along the edge between
+# two units, or through a corner, is only blocked if both sides are walls.
+#
+# Regions are found by flood fill over the links. A level whose treasures
+# or stairs the player cannot reach does not compile. Monsters the player
+# cannot reach are allowed, the game just never moves them.
+
+import hashlib
+import os
+import struct
+import warnings
+
+FORMAT_VERSION = 3
+
+HEADER = struct.Struct("<4sHHIII")
+SPAWN = struct.Struct("<IIB")
+SIGHT = struct.Struct("<I")
+REGION = struct.Struct("<I")
+MAGIC = b"DDL1"
+
+# Tile codes in the grid.
+FLOOR = 0
+WALL = 1
+STAIRS = 2
+
+# Bits in the links bitmask.
+LINK_UP = 1
+LINK_DN = 2
+LINK_LT = 4
+LINK_RT = 8
+
+TILES = {" ": FLOOR, "X": WALL, "=": STAIRS}
+
+# Offsets covered by the sight table, as (dx, dy), in bit order. SIGHT_SQ
+# must be at least monsters.NEARBY_SQ, and leave no more than 32 offsets.
+SIGHT_SQ = 5
+SIGHT_OFFSETS = sorted((dx, dy)
+                       for dy in range(-2, 3) for dx in range(-2, 3)
+                       if 0 < (dx * dx) + (dy * dy) <= SIGHT_SQ)
+SIGHT_BIT = dict((offset, k) for k, offset in enumerate(SIGHT_OFFSETS))
+SPAWNS = "PTCD"
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         ".levelcache")
+
+
+class CompiledLevel(object):
+    """A compiled level over a single buffer, as written by compile_level().
+
+    grid and links_view are memoryviews into that buffer, so nothing is
+    copied when a level is loaded. For consumers that want the buffer
+    itself, such as numpy.frombuffer(), the sections start at grid_offset,
+    links_offset and sight_offset of buf. Single units are read through
+    tile(), links() and sight(), which work the same under Python 2 and
+    Python 3."""
+
+    def __init__(self, buf):
+        magic, version, _, width, height, count = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a version {} compiled level.".format(
+                FORMAT_VERSION))
+        units = width * height
+        if len(buf) != (HEADER.size + ((2 + SIGHT.size + REGION.size) *
+                                       units) +
+                        (count * SPAWN.size)):
+            raise ValueError("Compiled level is truncated or corrupt.")
+
+        self.width = width
+        self.height = height
+        # Indexing a bytearray gives ints under Python 2 and 3 alike,
+        # indexing a memoryview does not, so single lookups use the buffer.
+        self.buf = buf
+        self.grid_offset = HEADER.size
+        self.links_offset = HEADER.size + units
+        view = memoryview(buf)
+        self.grid = view[self.grid_offset:self.links_offset]
+        self.links_view = view[self.links_offset:self.links_offset + units]
+        self.sight_offset = self.links_offset + units
+
+        self.regions_offset = self.sight_offset + (SIGHT.size * units)
+
+        spawns_at = self.regions_offset + (REGION.size * units)
+        self.spawns = [SPAWN.unpack_from(buf, spawns_at + (i * SPAWN.size))
+                       for i in range(count)]
+
+    def tile(self, x, y):
+        """Return the tile code at unit (x, y). Units outside the level
+        are WALL."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.buf[self.grid_offset + (y * self.width) + x]
+        return WALL
+
+    def links(self, x, y):
+        """Return the LINK_* bitmask of neighbours that can be moved into
+        from unit (x, y)."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.buf[self.links_offset + (y * self.width) + x]
+        return 0
+
+    def sight(self, x, y):
+        """Return the bitmask of the units around unit (x, y) that can be
+        seen from it, see SIGHT_OFFSETS."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return SIGHT.unpack_from(
+                self.buf,
+                self.sight_offset + SIGHT.size * ((y * self.width) + x))[0]
+        return 0
+
+    def region(self, x, y):
+        """Return the region of unit (x, y), 0 for walls and units outside
+        the level."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return REGION.unpack_from(
+                self.buf,
+                self.regions_offset + REGION.size * ((y * self.width) + x))[0]
+        return 0
+
+    def sees(self, x, y, tx, ty):
+        """Return True if unit (tx, ty) can be seen from unit (x, y). Units
+        further apart than SIGHT_SQ are never seen."""
+        k = SIGHT_BIT.get((tx - x, ty - y))
+        if k is None:
+            return False
+        return bool((self.sight(x, y) >> k) & 1)
+
+
+def level_key(level):
+    """Return the cache key of a level: a hash of its text and the format
+    version, so a format change never loads a stale cache file."""
+    text = "{}\n{}".format(FORMAT_VERSION, "\n".join(level))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def compile_level(level):
+    """Validate a level given as a list of strings and compile it.
+
+    Args:
+        level (list): the rows of the level, all of the same length
+
+    Returns: The compiled level as a bytearray, see the format above.
+
+    Raises ValueError for levels that cannot be played, including levels
+    with treasure or stairs walled off from the player. Unrecognized unit
+    characters only raise a warning and compile as floor."""
+
+    rows = len(level)
+    if rows == 0:
+        raise ValueError("Maze/level data contains no rows.")
+    width = len(level[0])
+    players = 0
+    spawns = []
+    grid = bytearray(width * rows)
+    for y in range(rows):
+        row = level[y]
+        if len(row) != width:
+            raise ValueError("Maze/level data row {} (0 indexed) contains {} "
+                             "units but row 0 contains {} units. All rows of "
+                             "a level must be the same length.".format(
+                                 y, len(row), width))
+        for x in range(width):
+            unit = row[x]
+            if unit in TILES:
+                grid[(y * width) + x] = TILES[unit]
+            elif unit in SPAWNS:
+                spawns.append((x, y, ord(unit)))
+                if unit == "P":
+                    players += 1
+            else:
+                warnings.warn("Unrecognized unit type in maze/level data at "
+                              "(0 indexed) position {} and row {}".format(
+                                  x, y))
+    if players != 1:
+        raise ValueError("Maze/level data must contain exactly one player "
+                         "start 'P' but it contains {}.".format(players))
+    buf = pack_level(width, rows, grid, spawns)
+
+    compiled = CompiledLevel(buf)
+    start = [spawn for spawn in spawns if spawn[2] == ord("P")][0]
+    home = compiled.region(start[0], start[1])
+    unreachable = [(x, y, chr(kind)) for x, y, kind in spawns
+                   if chr(kind) == "T" and compiled.region(x, y) != home]
+    unreachable.extend((x, y, "=") for y in range(rows) for x in range(width)
+                       if grid[(y * width) + x] == STAIRS and
+                       compiled.region(x, y) != home)
+    if unreachable:
+        x, y, unit = unreachable[0]
+        raise ValueError("Maze/level data has {} treasure or stairs units "
+                         "that the player cannot reach, the first a '{}' at "
+                         "(0 indexed) position {} and row {}.".format(
+                             len(unreachable), unit, x, y))
+    return buf
+
+
+def sight_paths(dx, dy):
+    """Return what must be clear for the unit at offset (dx, dy) to be seen,
+    as a list of steps along the line to it. Each step is a tuple of the
+    offsets of the one or two units it passes through, at least one of
+    which must not be a wall."""
+    n = 2 * max(abs(dx), abs(dy))
+    paths = []
+    for i in range(1, n):
+        # Units are centered on whole numbers, so a point on the line lies
+        # on an edge between units where it is a whole number plus a half.
+        px = (2 * dx * i) / float(n)
+        py = (2 * dy * i) / float(n)
+        xs = set([int((px + 1) // 2)] if px % 2 != 1 else
+                 [int(px - 1) // 2, int(px + 1) // 2])
+        ys = set([int((py + 1) // 2)] if py % 2 != 1 else
+                 [int(py - 1) // 2, int(py + 1) // 2])
+        units = [(x, y) for x in xs for y in ys]
+        step = tuple(sorted(unit for unit in units
+                            if unit not in ((0, 0), (dx, dy))))
+        # A point on an edge of one of the two end units is never blocked,
+        # since the end units themselves do not count. A corner is blocked
+        # if the two units across it from each other are walls.
+        if len(step) == len(units) or (len(units) == 4 and step):
+            paths.append(step)
+    return paths
+
+
+SIGHT_PATHS = [sight_paths(dx, dy) for dx, dy in SIGHT_OFFSETS]
+
+
+def pack_sight(width, rows, grid):
+    """Work out the sight bitmask of every unit of a tile grid.
+
+    Returns: The sight section of the compiled level format, as bytes."""
+    masks = [0] * (width * rows)
+    for y in range(rows):
+        for x in range(width):
+            if grid[(y * width) + x] == WALL:
+                continue  # Nothing is ever looked at from inside a wall
+            mask = 0
+            for k, steps in enumerate(SIGHT_PATHS):
+                for step in steps:
+                    for sx, sy in step:
+                        ux = x + sx
+                        uy = y + sy
+                        if (0 <= ux < width and 0 <= uy < rows and
+                                grid[(uy * width) + ux] != WALL):
+                            break  # This step is clear
+                    else:
+                        break  # Every unit of this step is a wall
+                else:
+                    mask |= 1 << k
+            masks[(y * width) + x] = mask
+    return struct.pack("<{}I".format(len(masks)), *masks)
+
+
+def pack_regions(width, rows, grid, links):
+    """Number the connected regions of a level by flood fill over the links
+    of its units.
+
+    Returns: The regions section of the compiled level format, as bytes."""
+    steps = ((LINK_UP, 0 - width), (LINK_DN, width), (LINK_LT, -1),
+             (LINK_RT, 1))
+    regions = [0] * (width * rows)
+    count = 0
+    for first in range(width * rows):
+        if regions[first] or grid[first] == WALL:
+            continue
+        count += 1
+        regions[first] = count
+        stack = [first]
+        while stack:
+            i = stack.pop()
+            for link, step in steps:
+                if links[i] & link and not regions[i + step]:
+                    regions[i + step] = count
+                    stack.append(i + step)
+    return struct.pack("<{}I".format(len(regions)), *regions)
+
+
+def pack_level(width, rows, grid, spawns):
+    """Pack a tile grid and spawn table into the compiled level format,
+    working out the links, sight and regions of every unit on the way.
+    This is the back half of compile_level(), shared with generators that
+    produce grids directly.
+
+    Args:
+        width (int): units per row
+        rows (int): number of rows
+        grid (bytearray): width * rows tile codes, row by row
+        spawns (list): (x, y, level character code) tuples
+
+    Returns: The compiled level as a bytearray."""
+
+    # A unit links to each neighbour that is inside the level and not a
+    # wall. Walls themselves link nowhere.
+    links = bytearray(width * rows)
+    for y in range(rows):
+        for x in range(width):
+            i = (y * width) + x
+            if grid[i] == WALL:
+                continue
+            mask = 0
+            if y > 0 and grid[i - width] != WALL:
+                mask |= LINK_UP
+            if y < rows - 1 and grid[i + width] != WALL:
+                mask |= LINK_DN
+            if x > 0 and grid[i - 1] != WALL:
+                mask |= LINK_LT
+            if x < width - 1 and grid[i + 1] != WALL:
+                mask |= LINK_RT
+            links[i] = mask
+
+    out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, 0, width, rows,
+                                len(spawns)))
+    out += grid
+    out += links
+    out += pack_sight(width, rows, grid)
+    out += pack_regions(width, rows, grid, links)
+    for spawn in spawns:
+        out += SPAWN.pack(*spawn)
+    return out
+
+
+def load_level(level, cache_dir=CACHE_DIR):
+    """Return the CompiledLevel for a level, compiling it only if it is not
+    already cached under cache_dir.
+
+    Args:
+        level (list): the rows of the level
+        cache_dir (string): directory of cached compiled levels, created
+            if needed. None disables the disk cache.
+
+    Returns: A CompiledLevel."""
+
+    if cache_dir is None:
+        return CompiledLevel(compile_level(level))
+
+    path = os.path.join(cache_dir, level_key(level) + ".ddl")
+    try:
+        with open(path, "rb") as f:
+            buf = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(buf)
+        return CompiledLevel(buf)
+    except (IOError, OSError, ValueError, struct.error):
+        pass  # Not cached yet, or unreadable, so compile it afresh
+
+    buf = compile_level(level)
+    try:
+        os.makedirs(cache_dir)
+    except OSError:
+        # Already there, perhaps made just now by another process loading
+        # levels at the same time, such as a bots.py worker.
+        if not os.path.isdir(cache_dir):
+            raise
+    # Write then rename, so a crash can never leave a half written level
+    # under the real name for the next start to load.
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(buf)
+    os.rename(tmp, path)
+    return CompiledLevel(buf)
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
@@ -0,0 +1,108 @@
+#! /usr/bin/env python
+# Hand-written diadungeon levels. Works under Python 2 and Python 3.
+#
+# Each level is a list of strings, one character per grid unit:
+#   X wall   = stairs down   P player start   T treasure
+#   C cyclops   D dragon
+# All rows of a level must be the same length. See levelcompiler.py.
+#
+# The stairs of a level lead down to the next one in 'levels'. Entry 0 is
+# only a placeholder, so levels are numbered from 1.
+
+levels = [""]
+
+level_1_25 = [
+    "XXXXXXXXXXXXXXXXXXXXXXXXX",
+    "XP                      X",
+    "X  XXXXX XXX XXXX XXXXX X",
+    "X XXX    XXX XXXX XT  X X",
+    "X X   XXXX      X X     X",
+    "X       CXXX XX X X  CX X",
+    "XXXXXXXXXXXX XX X XXXXX X",
+    "X    XX    X X  X X   X X",
+    "X X      X   X  X     X X",
+    "X X      X   X  X X   X X",
+    "X    XX    X XXXX XXXXXXX",
+    "XXXXXXXXXX X   XX       X",
+    "X          X   XXXXXXXX X",
+    "X XXXXXX XXXX XXXX X    X",
+    "X XXXX     XX XD   X XX X",
+    "X   XX     XX XXXX   XX X",
+    "X  CXX T   XX XC    XXXXX",
+    "XXX XX     XX XXXXX     X",
+    "X   XXXXXXXXX XX XXXX X X",
+    "X XXX             XXX XXX",
+    "X XXXX XX X X X XXXXD   X",
+    "X    X XX       XX   XX X",
+    "XXXX X  X X X X XX XXX  X",
+    "XC   XX X    C  XX   X =X",
+    "XXXXXXXXXXXXXXXXXXXXXXXXX"
+]
+
+level_2_25 = [
+    "XXXXXXXXXXXXXXXXXXXXXXXXX",
+    "XPX X   X               X",
+    "X X X X X XXXXX X X X X X",
+    "X X     XT    X X    DX X",
+    "X X XXX XXXXX X X XXXXX X",
+    "X X   X    D  X   X   X X",
+    "X XXX X X XXXXXXXXX X X X",
+    "X       X    T  X   X X X",
+    "XXX X X XXXXXXXXX XXX X X",
+    "X   X X          CX X   X",
+    "X XXX XXXXX XXXXXXX X X X",
+    "X   X X       X   X X  CX",
+    "XXX X X XXXXX X X X X X X",
+    "X   X X       X X   X  DX",
+    "X XXX X X X XXX X X XXX X",
+    "X XT CX   X     X     X X",
+    "X X XXX X XXX XXXXXXXXX X",
+    "X  C  X X X   X         X",
+    "X XXX X X XXXXX XXXXXXXXX",
+    "X  T  X X     X         X",
+    "X X XXX XXXXX XXXXXXXXX X",
+    "X X X   X   XC      X   X",
+    "X X X XXX X XXXXX XXX XXX",
+    "X                      =X",
+    "XXXXXXXXXXXXXXXXXXXXXXXXX"
+]
+
+# Just for testing
+level_1_24 = [
+    "XXXXXXXXXXXXXXXXXXXXXXXX",
+    "XP                     X",
+    "X XXXXX XXX XXXX XXXXX X",
+    "X XX    XXX XXXX XT  X X",
+    "X X  XXXX      X X     X",
+    "X       XXX XX X X   X X",
+    "XXXXXXXXXXX XX X XXXXX X",
+    "X   XX    X X  X X   X X",
+    "X X     X   X  X X   X X",
+    "X   XX    X XXXX XXXXXXX",
+    "XXXXXXXXX X   XX       X",
+    "X         X   XXXXXXXX X",
+    "X XXXXX XXXX XXXX X    X",
+    "X XXX     XX X    X XX X",
+    "X  XX     XX XXXX   XX X",
+    "X  XX T   XX X     XXXXX",
+    "XX XX     XX XXXXX     X",
+    "X  XXXXXXXXX XX XXXX X X",
+    "X XX             XXX XXX",
+    "X XXX XX X X X XXXX    X",
+    "X   X XX       XX   XX X",
+    "XXX X  X X X X XX XXX  X",
+    "X   XX X       XX   X =X",
+    "XXXXXXXXXXXXXXXXXXXXXXXX"
+]
+
+levels.append(level_1_25)
+levels.append(level_2_25)
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
@@ -0,0 +1,260 @@
+#! /usr/bin/env python
+# Chunked procedural maze generator for diadungeon. Works under Python 2
+# and Python 3.
+#
+# The dungeon is cut into square chunks of CHUNK x CHUNK units. A chunk is
+# generated only when the player gets near it, straight into the compiled
+# level format of levelcompiler.py, and only the chunks near the player stay
+# resident. Generation is a pure function of the seed and the chunk position,
+# so a chunk that was dropped comes back exactly the same when it is needed
+# again, and the dungeon can be as big as the coordinates allow without any
+# up-front generation time.
+#
+# Inside a chunk the maze is cut on a grid of cells at odd unit positions,
+# with walls on the even ones. Column 0 and row 0 of every chunk are the wall
+# lines it shares with the chunks to its left and above, and each chunk opens
+# doors in those two lines only. The doors of a line depend on the seed and
+# that line alone, so neighbouring chunks never have to be generated together
+# to agree on where they connect.
+
+import collections
+import hashlib
+import random
+
+from levelcompiler import CompiledLevel, pack_level, FLOOR, WALL, \
+    LINK_UP, LINK_DN, LINK_LT, LINK_RT
+
+CHUNK = 32  # Units per side of a chunk. Must be even.
+CELLS = CHUNK // 2  # Maze cells per side of a chunk
+WORLD_CHUNKS = 1 << 16  # Chunks per side of the whole dungeon
+
+DOORS = 2  # Doors in each shared wall line between two chunks
+LOOPS = 0.08  # Chance of knocking out an extra wall to make loops
+# Chances of a cell spawning a treasure, a cyclops or a dragon.
+SPAWN_ODDS = (("T", 0.020), ("C", 0.012), ("D", 0.005))
+SAFE_CELLS = 4  # No monsters this close to the player start, in cells
+
+
+def chunk_random(seed, *key):
+    """Return a random.Random seeded from the dungeon seed and a key, such
+    as a chunk position. The seed goes through a hash so nearby keys do not
+    get correlated streams."""
+    text = ":".join(str(part) for part in (seed,) + key)
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def pick(rng, options, count=1):
+    """Return 'count' different elements of 'options' chosen at random.
+
+    random.Random.choice() and sample() draw differently under Python 2 and
+    Python 3, while random() itself does not. Choosing through random()
+    alone means a seed makes the same dungeon under either, which recorded
+    games rely on, see replay.py."""
+    options = list(options)
+    for i in range(count):
+        j = i + int(rng.random() * (len(options) - i))
+        options[i], options[j] = options[j], options[i]
+    return options[:count]
+
+
+def generate_chunk(seed, cx, cy):
+    """Generate the chunk at chunk position (cx, cy).
+
+    Args:
+        seed (int): the dungeon seed
+        cx (int): chunk column, 0 to WORLD_CHUNKS - 1
+        cy (int): chunk row, 0 to WORLD_CHUNKS - 1
+
+    Returns: A CompiledLevel of CHUNK x CHUNK units. Its spawns are in
+        chunk units, not dungeon units."""
+
+    rng = chunk_random(seed, "chunk", cx, cy)
+    grid = bytearray([WALL]) * (CHUNK * CHUNK)
+
+    def cell_at(i, j):
+        return ((2 * j + 1) * CHUNK) + (2 * i + 1)
+
+    # Carve a spanning tree through the cells with an iterative recursive
+    # backtracker, so every cell in the chunk is reachable from every other.
+    seen = set([(0, 0)])
+    stack = [(0, 0)]
+    grid[cell_at(0, 0)] = FLOOR
+    while stack:
+        i, j = stack[-1]
+        options = [(i + di, j + dj)
+                   for di, dj in ((0, -1), (0, 1), (-1, 0), (1, 0))
+                   if 0 <= i + di < CELLS and 0 <= j + dj < CELLS and
+                   (i + di, j + dj) not in seen]
+        if not options:
+            stack.pop()
+            continue
+        ni, nj = pick(rng, options)[0]
+        grid[cell_at(ni, nj)] = FLOOR
+        grid[(cell_at(i, j) + cell_at(ni, nj)) // 2] = FLOOR  # Wall between
+        seen.add((ni, nj))
+        stack.append((ni, nj))
+
+    # A perfect maze has exactly one path between any two cells, which
+    # makes for dead ends everywhere and monsters that can never be
+    # escaped. Knock out a few interior walls between cells to add loops.
+    for y in range(1, CHUNK):
+        for x in range(1, CHUNK):
+            if (x + y) % 2 == 1 and rng.random() < LOOPS:
+                grid[(y * CHUNK) + x] = FLOOR
+
+    # Doors through the chunk's own left and top wall lines. Nothing lies
+    # beyond the left and top edges of the dungeon, so those stay closed.
+    if cx > 0:
+        doors = chunk_random(seed, "left", cx, cy)
+        for j in pick(doors, range(CELLS), DOORS):
+            grid[(2 * j + 1) * CHUNK] = FLOOR
+    if cy > 0:
+        doors = chunk_random(seed, "top", cx, cy)
+        for i in pick(doors, range(CELLS), DOORS):
+            grid[2 * i + 1] = FLOOR
+
+    spawns = []
+    for j in range(CELLS):
+        for i in range(CELLS):
+            x = 2 * i + 1
+            y = 2 * j + 1
+            if cx == 0 and cy == 0 and i == 0 and j == 0:
+                spawns.append((x, y, ord("P")))
+                continue
+            roll = rng.random()
+            for unit, odds in SPAWN_ODDS:
+                if roll < odds:
+                    if (unit != "T" and cx == 0 and cy == 0 and
+                            i + j < SAFE_CELLS):
+                        break
+                    spawns.append((x, y, ord(unit)))
+                    break
+                roll -= odds
+
+    return CompiledLevel(pack_level(CHUNK, CHUNK, grid, spawns))
+
+
+class ChunkedMaze(object):
+    """An effectively unbounded generated dungeon, read through the same
+    tile() and links() calls as a CompiledLevel.
+
+    Chunks are generated by prefetch() as the player gets near them and at
+    most 'resident' of them are kept, least recently used ones dropped
+    first. Units in chunks that are not resident read as WALL with no
+    links, so nothing wanders into parts of the dungeon that are not
+    loaded.
+
+    Monsters and treasures belong to the chunk they are in and go with
+    it: the game drops them when prefetch() drops their chunk, and a chunk
+    loaded again spawns afresh, exactly as it did the first time. Memory
+    and the work per tick then depend on the resident chunks only, not on
+    how far the player has walked."""
+
+    chunk_size = CHUNK
+
+    def __init__(self, seed, resident=25, radius=1):
+        """Args:
+            seed (int): the dungeon seed, the same seed always gives the
+                same dungeon
+            resident (int): the most chunks kept in memory at once
+            radius (int): prefetch() loads chunks this many chunks around
+                the one the player is in. Must leave room for the view."""
+        if resident < (2 * radius + 1) ** 2:
+            raise ValueError("resident must be able to hold all the chunks "
+                             "within radius of the player.")
+        self.seed = seed
+        self.resident = resident
+        self.radius = radius
+        self.width = CHUNK * WORLD_CHUNKS
+        self.height = CHUNK * WORLD_CHUNKS
+        self._chunks = collections.OrderedDict()
+
+    def _chunk(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._chunks.get((x // CHUNK, y // CHUNK))
+        return None
+
+    def resident_chunk(self, cx, cy):
+        """Return the CompiledLevel of the chunk at chunk position (cx, cy)
+        if it is resident, or None. Does not count as a use of it."""
+        return self._chunks.get((cx, cy))
+
+    def tile(self, x, y):
+        chunk = self._chunk(x, y)
+        if chunk is None:
+            return WALL
+        return chunk.tile(x % CHUNK, y % CHUNK)
+
+    def links(self, x, y):
+        chunk = self._chunk(x, y)
+        if chunk is None:
+            return 0
+        lx = x % CHUNK
+        ly = y % CHUNK
+        if 0 < lx < CHUNK - 1 and 0 < ly < CHUNK - 1:
+            return chunk.links(lx, ly)
+        # Links at a chunk edge were worked out without the neighbouring
+        # chunk, so look across the edge directly.
+        if chunk.tile(lx, ly) == WALL:
+            return 0
+        mask = 0
+        if self.tile(x, y - 1) != WALL:
+            mask |= LINK_UP
+        if self.tile(x, y + 1) != WALL:
+            mask |= LINK_DN
+        if self.tile(x - 1, y) != WALL:
+            mask |= LINK_LT
+        if self.tile(x + 1, y) != WALL:
+            mask |= LINK_RT
+        return mask
+
+    def sight(self, x, y):
+        """Sight is worked out per chunk, so it ends at chunk edges. A
+        monster just inside one chunk does not see the player just inside
+        the next, even through a door."""
+        chunk = self._chunk(x, y)
+        if chunk is None:
+            return 0
+        return chunk.sight(x % CHUNK, y % CHUNK)
+
+    def prefetch(self, x, y):
+        """Make sure the chunks around unit (x, y) are resident, generating
+        any that are not, and drop the least recently used chunks beyond
+        the resident limit.
+
+        Returns: A (spawns, dropped) tuple. spawns are those of the chunks
+            that were loaded, as (x, y, level character code) tuples in
+            dungeon units. dropped are the chunks that were dropped, as
+            (left, top, right, bottom) rectangles of dungeon units, right
+            and bottom not included."""
+
+        new_spawns = []
+        dropped = []
+        pcx = x // CHUNK
+        pcy = y // CHUNK
+        for cy in range(pcy - self.radius, pcy + self.radius + 1):
+            for cx in range(pcx - self.radius, pcx + self.radius + 1):
+                if not (0 <= cx < WORLD_CHUNKS and 0 <= cy < WORLD_CHUNKS):
+                    continue
+                key = (cx, cy)
+                chunk = self._chunks.pop(key, None)
+                if chunk is None:
+                    chunk = generate_chunk(self.seed, cx, cy)
+                    new_spawns.extend((cx * CHUNK + sx, cy * CHUNK + sy, kind)
+                                      for sx, sy, kind in chunk.spawns)
+                self._chunks[key] = chunk  # Now the most recently used
+        while len(self._chunks) > self.resident:
+            (cx, cy), _ = self._chunks.popitem(last=False)
+            dropped.append((cx * CHUNK, cy * CHUNK,
+                            (cx + 1) * CHUNK, (cy + 1) * CHUNK))
+        return new_spawns, dropped
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
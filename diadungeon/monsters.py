@@ -0,0 +1,326 @@
+#! /usr/bin/env python
+# Data oriented monster simulation for diadungeon. Works under Python 2 and
+# Python 3. Requires NumPy.
+#
+# Monsters used to be one turtle.Turtle each, moving themselves one at a
+# time with string compares on their direction and repeated xcor()/ycor()
+# calls. Here every monster is a row across a handful of NumPy arrays, and
+# one tick moves every monster that is due with a few whole-array operations
+# against the level's links, so tens of thousands of monsters stay cheap.
+# Drawing them is left to the game, which only ever draws the few in view.
+
+import numpy
+
+from levelcompiler import LINK_UP, LINK_DN, LINK_LT, LINK_RT, SIGHT_BIT, \
+    WALL
+
+# Direction codes, in the same order as the tables below.
+UP = 0
+DN = 1
+LT = 2
+RT = 3
+STEP_X = numpy.array([0, 0, -1, 1], numpy.int32)
+STEP_Y = numpy.array([-1, 1, 0, 0], numpy.int32)  # Rows are numbered down
+STEP_LINK = numpy.array([LINK_UP, LINK_DN, LINK_LT, LINK_RT], numpy.uint8)
+
+# Monster kinds as (name, level character, longest pause between moves in
+# milliseconds). A monster's kind is its index in this list.
+KINDS = [
+    ("cyclops", "C", 450),
+    ("dragon", "D", 150)
+]
+KIND_OF = dict((kind[1], i) for i, kind in enumerate(KINDS))
+MIN_PAUSE = 100
+FIRST_PAUSE = 250  # Pause before a new monster's first move
+ASLEEP = numpy.iinfo(numpy.int64).max  # Next move of a monster never moving
+
+# A monster notices the player within 75 pixels, that is about 2.3 units,
+# if it can see the player. Unit offsets are whole numbers, so compare
+# squared distances in units. Must not exceed levelcompiler.SIGHT_SQ.
+NEARBY_SQ = 5
+
+# Bit of the sight bitmask for each offset from a monster to the player, by
+# [dy + 2, dx + 2], or 0 for offsets the sight table does not cover. Those
+# are beyond NEARBY_SQ anyway.
+SIGHT_BIT_AT = numpy.zeros((5, 5), numpy.uint32)
+for offset, bit in SIGHT_BIT.items():
+    SIGHT_BIT_AT[offset[1] + 2, offset[0] + 2] = 1 << bit
+
+FAR_PAUSE_FACTOR = 4  # Pause multiplier for monsters far outside the view
+
+
+def _chunked_at(level, xs, ys, offset, dtype, outside):
+    # Many units of a level made of chunks, such as a mazegen.ChunkedMaze,
+    # as one NumPy lookup into each resident chunk they fall in. 'offset'
+    # names the table of the chunks' CompiledLevels to read. Units outside
+    # the level or in chunks that are not resident read as 'outside'.
+    size = level.chunk_size
+    values = numpy.full(xs.shape, outside, dtype)
+    inside = numpy.flatnonzero((xs >= 0) & (xs < level.width) &
+                               (ys >= 0) & (ys < level.height))
+    if not inside.size:
+        return values
+    xs = xs[inside]
+    ys = ys[inside]
+    columns = level.width // size
+    keys = (ys // size).astype(numpy.int64) * columns + (xs // size)
+    # Sorted by chunk, the units of each chunk are one run.
+    order = numpy.argsort(keys, kind="mergesort")
+    keys = keys[order]
+    starts = numpy.flatnonzero(numpy.diff(keys)) + 1
+    for begin, end in zip([0] + starts.tolist(),
+                          starts.tolist() + [keys.size]):
+        key = int(keys[begin])
+        chunk = level.resident_chunk(key % columns, key // columns)
+        if chunk is None:
+            continue
+        table = numpy.frombuffer(chunk.buf, dtype, size * size,
+                                 getattr(chunk, offset))
+        hit = order[begin:end]
+        values[inside[hit]] = table.reshape(size, size)[ys[hit] % size,
+                                                        xs[hit] % size]
+    return values
+
+
+def links_at(level, xs, ys):
+    """Return the LINK_* bitmasks of many units at once, as a uint8 array.
+
+    A CompiledLevel is read as one NumPy view over its links, without
+    copying, and a mazegen.ChunkedMaze as one view per resident chunk.
+    Any other level is read one unit at a time through its links()
+    method."""
+    offset = getattr(level, "links_offset", None)
+    if offset is not None:
+        links = numpy.frombuffer(level.buf, numpy.uint8,
+                                 level.width * level.height, offset)
+        return links.reshape(level.height, level.width)[ys, xs]
+    if getattr(level, "resident_chunk", None) is not None:
+        links = _chunked_at(level, xs, ys, "links_offset", numpy.uint8, 0)
+        # Links at a chunk edge were worked out without the neighbouring
+        # chunk, so look across the edge at the tiles, as ChunkedMaze.links()
+        # does.
+        size = level.chunk_size
+        edge = numpy.flatnonzero((xs % size == 0) | (xs % size == size - 1) |
+                                 (ys % size == 0) | (ys % size == size - 1))
+        if edge.size:
+            x = xs[edge]
+            y = ys[edge]
+
+            def clear(dx, dy):
+                return _chunked_at(level, x + dx, y + dy, "grid_offset",
+                                   numpy.uint8, WALL) != WALL
+
+            mask = numpy.zeros(edge.size, numpy.uint8)
+            for dx, dy, link in ((0, -1, LINK_UP), (0, 1, LINK_DN),
+                                 (-1, 0, LINK_LT), (1, 0, LINK_RT)):
+                mask[clear(dx, dy)] |= link
+            mask[~clear(0, 0)] = 0
+            links[edge] = mask
+        return links
+    return numpy.array([level.links(x, y)
+                        for x, y in zip(xs.tolist(), ys.tolist())],
+                       numpy.uint8)
+
+
+def sight_at(level, xs, ys):
+    """Return the sight bitmasks of many units at once, as a uint32 array.
+    Works like links_at()."""
+    offset = getattr(level, "sight_offset", None)
+    if offset is not None:
+        sight = numpy.frombuffer(level.buf, numpy.dtype("<u4"),
+                                 level.width * level.height, offset)
+        return sight.reshape(level.height, level.width)[ys, xs]
+    if getattr(level, "resident_chunk", None) is not None:
+        return _chunked_at(level, xs, ys, "sight_offset",
+                           numpy.dtype("<u4"), 0).astype(numpy.uint32)
+    return numpy.array([level.sight(x, y)
+                        for x, y in zip(xs.tolist(), ys.tolist())],
+                       numpy.uint32)
+
+
+class MonsterStore(object):
+    """All monsters of a level, one array element per monster.
+
+    x, y           level unit of each monster
+    direction      UP, DN, LT or RT, the way it tries to move next
+    facing_right   which way its sprite faces, left or right
+    kind           index into KINDS
+    next_move      time of its next move in milliseconds
+
+    Only the first 'count' elements of each array are monsters. The arrays
+    grow by doubling as monsters are added."""
+
+    COLUMNS = ("x", "y", "direction", "facing_right", "kind", "next_move")
+
+    def __init__(self, rng=None, capacity=64, max_pause=None):
+        """Args:
+            rng (numpy.random.RandomState): source of all randomness in
+                monster movement. A fresh unseeded one if None.
+            capacity (int): number of monsters to allocate room for
+            max_pause (list): optional longest pause of each kind, in
+                milliseconds, instead of the one in KINDS. For balancing,
+                see bots.py."""
+        self.rng = rng if rng is not None else numpy.random.RandomState()
+        self.count = 0
+        self.x = numpy.zeros(capacity, numpy.int32)
+        self.y = numpy.zeros(capacity, numpy.int32)
+        self.direction = numpy.zeros(capacity, numpy.int8)
+        self.facing_right = numpy.ones(capacity, numpy.bool_)
+        self.kind = numpy.zeros(capacity, numpy.int8)
+        self.next_move = numpy.zeros(capacity, numpy.int64)
+        if max_pause is None:
+            max_pause = [kind[2] for kind in KINDS]
+        self._max_pause = numpy.array(max_pause, numpy.int64)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        size = 2 * len(self.x)
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = numpy.zeros(size, old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, x, y, kind, now, asleep=False):
+        """Add a monster of a kind at level unit (x, y), making its first
+        move FIRST_PAUSE milliseconds after 'now'. A monster added asleep
+        never moves at all, which costs nothing per tick.
+
+        Returns: The index of the new monster."""
+        if self.count == len(self.x):
+            self._grow()
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.direction[i] = self.rng.randint(4)
+        self.facing_right[i] = True
+        self.kind[i] = kind
+        self.next_move[i] = ASLEEP if asleep else now + FIRST_PAUSE
+        self.count += 1
+        return i
+
+    def clear(self):
+        self.count = 0
+
+    def remove_within(self, left, top, right, bottom):
+        """Remove the monsters inside a rectangle of units, as for within().
+        The monsters left keep their order, but not their indices."""
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        keep = numpy.flatnonzero((x < left) | (x >= right) |
+                                 (y < top) | (y >= bottom))
+        if keep.size == n:
+            return
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:keep.size] = column[keep]
+        self.count = keep.size
+
+    def name(self, i):
+        return KINDS[self.kind[i]][0]
+
+    def next_due(self):
+        """Return the time of the earliest next move, or None if there are
+        no monsters."""
+        if self.count == 0:
+            return None
+        return int(self.next_move[:self.count].min())
+
+    def at(self, x, y):
+        """Return the index of a monster on level unit (x, y), or -1."""
+        n = self.count
+        hits = numpy.flatnonzero((self.x[:n] == x) & (self.y[:n] == y))
+        if hits.size:
+            return int(hits[0])
+        return -1
+
+    def within(self, left, top, right, bottom):
+        """Return the indices of monsters inside the rectangle of units
+        from (left, top) up to but not including (right, bottom)."""
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        return numpy.flatnonzero((x >= left) & (x < right) &
+                                 (y >= top) & (y < bottom))
+
+    def tick(self, now, level, player_x, player_y, near=None):
+        """Move every monster whose next move is due at 'now'.
+
+        Each due monster turns to face the way it is heading, tries to
+        step that way and either moves or, if a wall is in the way, picks
+        a new direction at random. A monster near the player that can see
+        it turns to chase it for its next step, horizontally before
+        vertically. Sight is a lookup in the level's sight table. It
+        then waits a random pause for its kind before moving again.
+
+        Args:
+            now (int): the current time in milliseconds
+            level: the CompiledLevel or ChunkedMaze being played
+            player_x (int): the player's level unit
+            player_y (int): the player's level unit
+            near (tuple): optional (left, top, right, bottom) rectangle of
+                units. Monsters outside of it pause FAR_PAUSE_FACTOR
+                times longer, since nobody can see them move.
+
+        Returns: The indices of the monsters that took a turn, moved or
+            not, as a NumPy array."""
+
+        n = self.count
+        due = numpy.flatnonzero(self.next_move[:n] <= now)
+        if due.size == 0:
+            return due
+
+        x = self.x[due]
+        y = self.y[due]
+        heading = self.direction[due].astype(numpy.intp)
+
+        across = heading >= LT
+        self.facing_right[due[across]] = heading[across] == RT
+
+        moves = (links_at(level, x, y) & STEP_LINK[heading]) != 0
+
+        # Chasing is decided from where the monster stood before this
+        # step, and steers the step after it.
+        dx = player_x - x
+        dy = player_y - y
+        chasing = (dx * dx) + (dy * dy) <= NEARBY_SQ
+        close = numpy.flatnonzero(chasing)
+        if close.size:
+            bits = SIGHT_BIT_AT[dy[close] + 2, dx[close] + 2]
+            chasing[close] = (sight_at(level, x[close], y[close]) & bits) != 0
+        chase = numpy.where(dx < 0, LT,
+                            numpy.where(dx > 0, RT,
+                                        numpy.where(dy > 0, DN, UP)))
+        chasing &= (dx != 0) | (dy != 0)
+        direction = numpy.where(chasing, chase, heading)
+
+        x[moves] += STEP_X[heading[moves]]
+        y[moves] += STEP_Y[heading[moves]]
+        blocked = ~moves
+        direction[blocked] = self.rng.randint(4, size=int(blocked.sum()))
+
+        self.x[due] = x
+        self.y[due] = y
+        self.direction[due] = direction
+
+        max_pause = self._max_pause[self.kind[due]]
+        pause = MIN_PAUSE + (self.rng.random_sample(due.size) *
+                             (max_pause - MIN_PAUSE + 1)).astype(numpy.int64)
+        if near is not None:
+            left, top, right, bottom = near
+            far = (x < left) | (x >= right) | (y < top) | (y >= bottom)
+            pause[far] *= FAR_PAUSE_FACTOR
+        self.next_move[due] = now + pause
+        return due
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
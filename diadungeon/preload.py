@@ -0,0 +1,102 @@
+#! /usr/bin/env python
+# Background preloading of the next diadungeon level. Works under Python 2
+# and Python 3.
+#
+# Loading a level means compiling and validating it, or reading it from the
+# level cache, and then working out how to draw its first view. None of that
+# needs Tk, so it runs in a background thread while the current level is
+# being played. When the player reaches the stairs the next level is already
+# there and only has to be swapped in.
+
+import threading
+
+
+class LevelPreloader(object):
+    """Loads one level ahead in a background thread.
+
+    start() begins loading a level by number. take() hands that level over
+    once it is wanted, waiting for the thread only if it has not finished
+    yet. A level that was not preloaded is loaded on the spot, so take() can
+    always be used as a Game loader."""
+
+    def __init__(self, loader, prepare=None):
+        """Args:
+            loader (callable): called with a level number, returns its
+                CompiledLevel or None if there is no such level
+            prepare (callable): optional, called in the background thread
+                with each CompiledLevel that was loaded. Whatever it returns
+                is handed over by take() along with the level. It must not
+                touch Tk."""
+        self.loader = loader
+        self.prepare = prepare
+        self.number = None
+        self._thread = None
+        self._result = None
+        self._error = None
+
+    def _load(self, number):
+        level = self.loader(number)
+        extra = None
+        if level is not None and self.prepare is not None:
+            extra = self.prepare(level)
+        return level, extra
+
+    def _run(self, number):
+        try:
+            self._result = self._load(number)
+        except Exception as e:
+            self._error = e  # Raised again by error() and take()
+
+    def start(self, number):
+        """Start loading level 'number' in the background, replacing any
+        level loaded before."""
+        self.wait()
+        self.number = number
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(number,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def ready(self):
+        """Return True once the level being preloaded has been loaded, or
+        has failed to load."""
+        return self._thread is not None and not self._thread.is_alive()
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def error(self):
+        """Return the exception that loading the preloaded level raised, if
+        it has finished and failed, else None. Lets a bad level be reported
+        while the level before it is still being played."""
+        if self.ready():
+            return self._error
+        return None
+
+    def take(self, number):
+        """Return the (level, prepared) tuple of level 'number', loading it
+        now unless it is the one being preloaded.
+
+        Raises whatever loading the level raised."""
+        if number != self.number:
+            return self._load(number)
+        self.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def load(self, number):
+        """Return the CompiledLevel of level 'number', as take() would. This
+        is the Game loader."""
+        return self.take(number)[0]
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
@@ -0,0 +1,128 @@
+#! /usr/bin/env python
+# Per-frame profiling for the diadungeon main loop. Works under Python 2 and
+# Python 3.
+#
+# Each frame is split into named phases, such as input, simulation,
+# collision and rendering. The main loop calls mark() at the end of each
+# phase and end_frame() at the end of the frame. Only the last few hundred
+# frames are kept per phase, for rolling percentiles that can be shown on
+# screen. Every frame can also be written to a trace file for offline
+# analysis, as CSV or as JSON lines depending on the file name:
+#
+#   frame,input,sim,collision,render,tk,total
+#   0,0.004,0.118,0.002,0.231,1.406,1.761
+#
+#   {"frame": 0, "input": 0.004, "sim": 0.118, ..., "total": 1.761}
+#
+# All times are in milliseconds.
+
+import collections
+import json
+import timeit
+
+clock = timeit.default_timer  # The best wall clock timer on either Python
+
+WINDOW = 300  # Frames kept for the rolling percentiles
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered, point):
+    """Return the nearest rank percentile 'point' (0 to 100) of a sorted,
+    non-empty list."""
+    rank = int(round((point / 100.0) * (len(ordered) - 1)))
+    return ordered[rank]
+
+
+class FrameProfiler(object):
+    """Times the phases of each frame of a main loop.
+
+    A phase may be marked more than once in a frame, for example a
+    simulation step that runs twice to catch up, and its times add up.
+    Time between start_frame() and the first mark(), or between marks, is
+    charged to the phase being marked."""
+
+    def __init__(self, phases, window=WINDOW, trace=None):
+        """Args:
+            phases (list): names of the phases, in the order they run
+            window (int): frames kept for percentiles()
+            trace (string): optional path of a trace file to write every
+                frame to. Written as CSV if it ends in ".csv", else as
+                JSON lines."""
+        self.phases = tuple(phases)
+        self.columns = self.phases + ("total",)
+        self.samples = dict((name, collections.deque(maxlen=window))
+                            for name in self.columns)
+        self.frames = 0
+        self._index = dict((name, i) for i, name in enumerate(self.phases))
+        self._times = [0.0] * len(self.phases)
+        self._start = None
+        self._last = None
+
+        self._trace = None
+        self._csv = False
+        if trace is not None:
+            self._trace = open(trace, "w")
+            self._csv = trace.lower().endswith(".csv")
+            if self._csv:
+                self._trace.write(",".join(("frame",) + self.columns) + "\n")
+
+    def start_frame(self):
+        self._start = self._last = clock()
+
+    def mark(self, phase):
+        """End a phase of the current frame."""
+        now = clock()
+        self._times[self._index[phase]] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        """End the current frame and record the times of its phases."""
+        times = [t * 1000.0 for t in self._times]
+        times.append((clock() - self._start) * 1000.0)
+        for name, ms in zip(self.columns, times):
+            self.samples[name].append(ms)
+        if self._trace is not None:
+            if self._csv:
+                self._trace.write("{},{}\n".format(
+                    self.frames, ",".join("{:.3f}".format(t) for t in times)))
+            else:
+                row = collections.OrderedDict([("frame", self.frames)])
+                for name, ms in zip(self.columns, times):
+                    row[name] = round(ms, 3)
+                self._trace.write(json.dumps(row) + "\n")
+        self.frames += 1
+        self._times = [0.0] * len(self.phases)
+
+    def percentiles(self, phase, points=PERCENTILES):
+        """Return the rolling percentiles of a phase, or of "total", in
+        milliseconds. Empty if no frame has ended yet."""
+        ordered = sorted(self.samples[phase])
+        if not ordered:
+            return []
+        return [percentile(ordered, point) for point in points]
+
+    def report(self, points=PERCENTILES):
+        """Return the rolling percentiles of every phase as lines of text,
+        one per phase."""
+        lines = ["{:<10}".format("ms") +
+                 "".join("{:>8}".format("p{}".format(point))
+                         for point in points)]
+        for name in self.columns:
+            lines.append("{:<10}".format(name) +
+                         "".join("{:8.2f}".format(ms)
+                                 for ms in self.percentiles(name, points)))
+        return lines
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
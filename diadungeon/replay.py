@@ -0,0 +1,165 @@
+#! /usr/bin/env python
+# Recording and headless replay of diadungeon games. Works under Python 2
+# and Python 3. Requires NumPy.
+#
+# A game is fully decided by its level, its seed and the player's moves at
+# each tick, see game.py. A recording is just those, in a compact binary log:
+#
+#   header    magic "DDR1", version (uint16), flags (uint16), seed, level,
+#             ticks played, move count (uint32 each), state digest (20 bytes)
+#   moves     move count records of tick (uint32) and direction (uint8)
+#
+# The level is a number into leveldata.levels, or unused in an endless game
+# (flag ENDLESS), where the seed also generates the dungeon. The digest is
+# Game.digest() at the end of play.
+#
+# Replaying runs the game headless as fast as it will go and checks the
+# final digest, so a recorded session doubles as a benchmark and as a
+# regression check:
+#
+#   python replay.py session.ddr [--repeat N]
+
+import argparse
+import struct
+import sys
+import time
+
+from game import Game
+from leveldata import levels
+from levelcompiler import load_level
+from mazegen import ChunkedMaze
+
+MAGIC = b"DDR1"
+VERSION = 4
+ENDLESS = 1
+
+HEADER = struct.Struct("<4sHHIIII20s")
+MOVE = struct.Struct("<IB")
+
+
+def load_numbered(number):
+    """Return the CompiledLevel of a level in leveldata.levels by number,
+    or None past the last level. This is the Game loader for hand-written
+    levels."""
+    if number < len(levels):
+        return load_level(levels[number])
+    return None
+
+
+def open_game(seed, level, endless, loader=load_numbered):
+    """Return a new Game the way the front end starts one.
+
+    Args:
+        loader (callable): loads levels for the game, see Game. It must give
+            the same levels as load_numbered(), only perhaps sooner."""
+    if endless:
+        return Game(ChunkedMaze(seed), seed)
+    return Game(loader(level), seed, level, loader)
+
+
+class Recorder(object):
+    """Writes the moves of a game to a log as they are made. close() fills
+    in the header once the outcome is known."""
+
+    def __init__(self, path, seed, level, endless):
+        self.seed = seed
+        self.level = level
+        self.flags = ENDLESS if endless else 0
+        self.moves = 0
+        self.file = open(path, "wb")
+        self.file.write(b"\0" * HEADER.size)  # Written for real by close()
+
+    def record(self, tick, direction):
+        """Record a player move applied at the start of a tick."""
+        self.file.write(MOVE.pack(tick, direction))
+        self.moves += 1
+
+    def close(self, game):
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.flags, self.seed,
+                                    self.level, game.tick, self.moves,
+                                    game.digest()))
+        self.file.close()
+
+
+def read_log(path):
+    """Read a recording.
+
+    Returns: A (header, moves) tuple. header is a dict of the header
+        fields, moves a list of (tick, direction) tuples in order."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, flags, seed, level, ticks, count, digest = \
+        HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("{} is not a version {} diadungeon "
+                         "recording.".format(path, VERSION))
+    if len(data) != HEADER.size + (count * MOVE.size):
+        raise ValueError("{} is truncated or corrupt.".format(path))
+    moves = [MOVE.unpack_from(data, HEADER.size + (i * MOVE.size))
+             for i in range(count)]
+    header = {"seed": seed, "level": level, "endless": bool(flags & ENDLESS),
+              "ticks": ticks, "digest": digest}
+    return header, moves
+
+
+def replay(header, moves, on_tick=None):
+    """Play a recording back headless, as fast as possible.
+
+    Args:
+        header (dict): as returned by read_log()
+        moves (list): as returned by read_log()
+        on_tick (callable): optional, called with the Game after every
+            tick, for example to render frames
+
+    Returns: The Game as it stands at the end of the recording."""
+
+    game = open_game(header["seed"], header["level"], header["endless"])
+    ticks = header["ticks"]
+    i = 0
+    count = len(moves)
+    while game.tick < ticks and game.alive:
+        tick_moves = []
+        while i < count and moves[i][0] == game.tick:
+            tick_moves.append(moves[i][1])
+            i += 1
+        game.step(tick_moves)
+        if on_tick is not None:
+            on_tick(game)
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded diadungeon games headless and check "
+                    "they end exactly as recorded.")
+    parser.add_argument("recordings", nargs="+", metavar="RECORDING")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="replay each recording this many times, for "
+                             "timing")
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.recordings:
+        header, moves = read_log(path)
+        start = time.time()
+        for _ in range(args.repeat):
+            game = replay(header, moves)
+        elapsed = max(time.time() - start, 1e-9)
+        ok = game.digest() == header["digest"]
+        failed = failed or not ok
+        print("{}: {} ticks, score {}, {}. {:.0f} ticks/s, {:.0f}x real "
+              "time. {}".format(path, game.tick, game.score,
+                               "alive" if game.alive else
+                               "killed by a " + game.killer,
+                               game.tick * args.repeat / elapsed,
+                               game.now * args.repeat / 1000.0 / elapsed,
+                               "OK" if ok else "MISMATCH"))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+##
+#
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+# Central timer scheduler for diadungeon. Works under Python 2 and Python 3.
+
+import heapq
+import itertools
+import time
+
+
+def now_ms():
+    """Return the current wall clock time in whole milliseconds."""
+    return int(time.time() * 1000)
+
+
+class Scheduler(object):
+    """One heap of pending callbacks, owned and driven by the game loop.
+
+    This replaces the old pattern where every monster re-armed its own
+    turtle.ontimer() chain. Each of those was a separate Tk timer with its
+    own callback overhead. Here the game loop calls run_due() once per tick
+    and every callback that has come due fires in one batch, so thousands
+    of monsters cost one heap and no Tk timers at all.
+
+    A callback takes no arguments. If it returns a number, that is taken
+    as a delay in milliseconds and the callback is re-armed for that long
+    after the current tick. If it returns None it is dropped."""
+
+    def __init__(self):
+        self._heap = []
+        # The counter breaks ties between entries due at the same time so
+        # that heapq never has to compare two callbacks with each other.
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, when, callback):
+        """Arm callback to fire at (or after) time 'when' in milliseconds.
+
+        Args:
+            when (int): due time in milliseconds, see now_ms()
+            callback (callable): called with no arguments when due"""
+
+        heapq.heappush(self._heap, (when, next(self._counter), callback))
+
+    def next_due(self):
+        """Return the due time of the earliest pending callback, or None
+        if nothing is scheduled."""
+        if self._heap:
+            return self._heap[0][0]
+        return None
+
+    def run_due(self, now):
+        """Fire every callback which is due at or before 'now'.
+
+        Callbacks re-armed during this batch are pushed back only after the
+        batch completes, so a callback returning a delay of 0 fires once per
+        tick rather than spinning forever inside a single tick.
+
+        Args:
+            now (int): the current time in milliseconds
+
+        Returns: The number of callbacks fired."""
+
+        heap = self._heap
+        rearm = []
+        fired = 0
+        while heap and heap[0][0] <= now:
+            callback = heapq.heappop(heap)[2]
+            delay = callback()
+            fired += 1
+            if delay is not None:
+                rearm.append((now + delay, callback))
+        for when, callback in rearm:
+            heapq.heappush(heap, (when, next(self._counter), callback))
+        return fired
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit("This file [{}] is meant to be imported, "
+             "not executed directly.".format(__file__))
+
+##
+#
@@ -0,0 +1,169 @@
+#! /usr/bin/env python
+# Tests of the compiled level format and its cache, of record and replay and
+# of the chunked dungeon. Works under Python 2 and Python 3. Requires NumPy.
+#
+#   python -m unittest test_levels
+#
+# Run it under both. The games played by TestReplay must end with the same
+# digests under either, which is what lets a recording made under one be
+# replayed under the other.
+
+import binascii
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from levelcompiler import CompiledLevel, compile_level, load_level, \
+    level_key, FLOOR, WALL, STAIRS, LINK_UP, LINK_DN, LINK_LT, LINK_RT
+from mazegen import ChunkedMaze, CHUNK
+from replay import Recorder, open_game, read_log, replay
+
+LEVEL = [
+    "XXXXXXX",
+    "XP T  X",
+    "X XXX X",
+    "X  C =X",
+    "XXXXXXX",
+]
+
+# Digests of the games TestReplay plays on level 1 and endless. They change
+# whenever the game plays out differently, as does replay.VERSION.
+DIGESTS = {False: "604ab6b165d7ee5bf08b271189654b260f1ff02c",
+           True: "4414495c31658f59a6b077ab837de253edcbeab0"}
+
+
+class TestCompiledLevel(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_format(self):
+        level = CompiledLevel(compile_level(LEVEL))
+        self.assertEqual((level.width, level.height), (7, 5))
+        self.assertEqual(level.tile(0, 0), WALL)
+        self.assertEqual(level.tile(1, 1), FLOOR)  # The player start
+        self.assertEqual(level.tile(5, 3), STAIRS)
+        self.assertEqual(level.tile(-1, 2), WALL)  # Outside the level
+        self.assertEqual(level.links(1, 1), LINK_DN | LINK_RT)
+        self.assertEqual(level.links(1, 3), LINK_UP | LINK_RT)
+        self.assertEqual(level.links(0, 0), 0)
+        self.assertTrue(level.sees(1, 1, 1, 3))
+        self.assertFalse(level.sees(3, 3, 3, 1))  # Through a wall
+        self.assertFalse(level.sees(1, 1, 4, 1))  # Too far
+        self.assertEqual(level.region(0, 0), 0)
+        self.assertEqual(level.region(1, 1), level.region(5, 3))
+        self.assertNotEqual(level.region(1, 1), 0)
+        self.assertEqual(level.spawns, [(1, 1, ord("P")), (3, 1, ord("T")),
+                                        (3, 3, ord("C"))])
+
+    def test_cache_round_trip(self):
+        compiled = load_level(LEVEL, self.cache_dir)
+        path = os.path.join(self.cache_dir, level_key(LEVEL) + ".ddl")
+        self.assertTrue(os.path.exists(path))
+        cached = load_level(LEVEL, self.cache_dir)
+        self.assertEqual(bytes(cached.buf), bytes(compiled.buf))
+        self.assertEqual(cached.spawns, compiled.spawns)
+
+    def test_corrupt_cache_is_recompiled(self):
+        path = os.path.join(self.cache_dir, level_key(LEVEL) + ".ddl")
+        with open(path, "wb") as f:
+            f.write(b"DDL1 and then nothing sensible")
+        level = load_level(LEVEL, self.cache_dir)
+        self.assertEqual(bytes(level.buf), bytes(compile_level(LEVEL)))
+
+    def test_unreachable_stairs(self):
+        walled_off = [
+            "XXXXXXX",
+            "XP  XXX",
+            "X   X=X",
+            "XXXXXXX",
+        ]
+        self.assertRaises(ValueError, compile_level, walled_off)
+
+    def test_unreachable_treasure(self):
+        walled_off = [
+            "XXXXXX",
+            "XP XTX",
+            "XXXXXX",
+        ]
+        self.assertRaises(ValueError, compile_level, walled_off)
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self, endless):
+        path = os.path.join(self.directory, "game.ddr")
+        game = open_game(11, 1, endless)
+        recorder = Recorder(path, 11, 1, endless)
+        rng = random.Random(3)
+        while game.tick < 3000 and game.alive:
+            moves = []
+            if rng.random() < 0.3:
+                moves.append(int(rng.random() * 4))
+            for direction in moves:
+                recorder.record(game.tick, direction)
+            game.step(moves)
+        recorder.close(game)
+        return path, game
+
+    def test_replay_digest(self):
+        for endless in (False, True):
+            path, game = self.record(endless)
+            header, moves = read_log(path)
+            self.assertEqual(header["digest"], game.digest())
+            self.assertEqual(replay(header, moves).digest(), game.digest())
+            self.assertEqual(binascii.hexlify(game.digest()).decode("ascii"),
+                             DIGESTS[endless])
+
+
+class TestChunkedMaze(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        maze = ChunkedMaze(5, resident=9, radius=1)
+        spawns, dropped = maze.prefetch(1, 1)
+        self.assertEqual(dropped, [])
+        self.assertEqual(len(maze._chunks), 4)  # At the corner of the world
+        self.assertTrue(spawns)
+        first = bytes(maze.resident_chunk(0, 0).buf)
+
+        spawns, dropped = maze.prefetch(10 * CHUNK + 1, 10 * CHUNK + 1)
+        self.assertEqual(len(maze._chunks), 9)
+        self.assertEqual(sorted(dropped),
+                         [(0, 0, CHUNK, CHUNK), (0, CHUNK, CHUNK, 2 * CHUNK),
+                          (CHUNK, 0, 2 * CHUNK, CHUNK),
+                          (CHUNK, CHUNK, 2 * CHUNK, 2 * CHUNK)])
+        self.assertTrue(maze.resident_chunk(0, 0) is None)
+        self.assertEqual(maze.tile(1, 1), WALL)  # Not resident
+        self.assertEqual(maze.links(1, 1), 0)
+
+        maze.prefetch(1, 1)
+        self.assertEqual(bytes(maze.resident_chunk(0, 0).buf), first)
+
+    def test_chunk_edges_connect(self):
+        maze = ChunkedMaze(5)
+        maze.prefetch(CHUNK, CHUNK)
+        for x in range(2 * CHUNK):
+            for y in range(2 * CHUNK):
+                links = maze.links(x, y)
+                if links & LINK_RT:
+                    self.assertTrue(maze.links(x + 1, y) & LINK_LT)
+                if links & LINK_DN:
+                    self.assertTrue(maze.links(x, y + 1) & LINK_UP)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
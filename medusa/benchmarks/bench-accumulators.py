@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Updates per second of counters shared by many workers: a dict behind a
+# lock against medusa.ShardedCounters with a row per worker and no lock, in
+# threads, and multiprocessing.Value against shared ShardedCounters in
+# worker processes. Every run checks that no update was lost.
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+WORKERS = 4
+UPDATES = 250000  # Per worker
+SLOTS = 10
+
+
+def locked_dict(counts, lock, worker):
+    for i in range(UPDATES):
+        with lock:
+            counts[i % SLOTS] = counts.get(i % SLOTS, 0) + 1
+
+
+def sharded(counters, worker):
+    mine = counters.shard(worker)
+    for i in range(UPDATES):
+        mine[i % SLOTS] += 1
+
+
+def locked_value(value, worker):
+    for i in range(UPDATES):
+        with value.get_lock():
+            value.value += 1
+
+
+def run(name, start_worker, check):
+    workers = [start_worker(worker) for worker in range(WORKERS)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    assert check() == WORKERS * UPDATES
+    print(f"{name:<36} {WORKERS * UPDATES / elapsed:>12,.0f} updates/s")
+
+
+def main():
+    print(f"{WORKERS} workers, {UPDATES:,} updates each, "
+          f"{os.cpu_count()} CPUs")
+
+    counts, lock = {}, threading.Lock()
+    run("threads, dict and threading.Lock",
+        lambda n: threading.Thread(target=locked_dict,
+                                   args=(counts, lock, n)),
+        lambda: sum(counts.values()))
+
+    counters = medusa.ShardedCounters(SLOTS, shards=WORKERS)
+    run("threads, ShardedCounters",
+        lambda n: threading.Thread(target=sharded, args=(counters, n)),
+        counters.total)
+
+    value = multiprocessing.Value("q", 0)
+    run("processes, multiprocessing.Value",
+        lambda n: multiprocessing.Process(target=locked_value,
+                                          args=(value, n)),
+        lambda: value.value)
+
+    shared = medusa.ShardedCounters(SLOTS, shards=WORKERS, shared=True)
+    run("processes, shared ShardedCounters",
+        lambda n: multiprocessing.Process(target=sharded, args=(shared, n)),
+        shared.total)
+
+
+if __name__ == '__main__':
+    main()
+
+##
+#
@@ -0,0 +1,87 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Deliveries per second fanning messages out to many subscriber tasks with
+# medusa.Broadcast, against a shared message list guarded by an
+# asyncio.Condition as in the conditions.py demo, where every publish wakes
+# every subscriber to take the one lock in turn.
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+MESSAGES = 200
+BURST = 8  # Messages published between letting subscribers run
+RUNS = ((100, medusa.BLOCK), (1000, medusa.BLOCK), (5000, medusa.BLOCK),
+        (5000, medusa.DROP_OLDEST))
+
+
+async def bench_broadcast(subscribers, overflow):
+    broadcast = medusa.Broadcast(maxsize=16, overflow=overflow)
+    received = [0]
+
+    async def subscriber(subscription):
+        with subscription:
+            async for message in subscription:
+                received[0] += 1
+
+    tasks = [asyncio.create_task(subscriber(broadcast.subscribe()))
+             for _ in range(subscribers)]
+    for message in range(MESSAGES):
+        await broadcast.publish(message)
+        if message % BURST == BURST - 1:
+            await asyncio.sleep(0)
+    broadcast.close()
+    await asyncio.gather(*tasks)
+    return received[0]
+
+
+async def bench_condition(subscribers):
+    condition = asyncio.Condition()
+    log = []
+    received = [0]
+
+    async def subscriber():
+        seen = 0
+        while True:
+            async with condition:
+                await condition.wait_for(lambda: len(log) > seen)
+                message = log[seen]
+            seen += 1
+            if message is None:
+                return
+            received[0] += 1
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    for message in list(range(MESSAGES)) + [None]:
+        async with condition:
+            log.append(message)
+            condition.notify_all()
+        if message is None or message % BURST == BURST - 1:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return received[0]
+
+
+async def main():
+    print(f"{MESSAGES} messages per run")
+    for subscribers, overflow in RUNS:
+        for name, bench in (
+                (f"Broadcast {overflow}",
+                 lambda: bench_broadcast(subscribers, overflow)),
+                ("asyncio.Condition", lambda: bench_condition(subscribers))):
+            start = time.perf_counter()
+            received = await bench()
+            elapsed = time.perf_counter() - start
+            print(f"{subscribers:>5} subscribers  {name:<22} "
+                  f"{received / elapsed:>12,.0f} deliveries/s  "
+                  f"{received:>9,} delivered")
+
+
+asyncio.run(main())
+
+##
+#
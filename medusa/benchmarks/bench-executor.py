@@ -0,0 +1,75 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Event loop latency and throughput of CPU-bound jobs run through
+# medusa.HybridExecutor, inline and in worker processes with and without
+# chunking. A heartbeat task measures how late the event loop gets to it
+# while the jobs run. See bench-workers.py for why benchmarks live here.
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+JOBS = 2000
+CARDS = 2000
+HEARTBEAT = 0.001
+
+
+def shuffle_checksum(seed, cards):
+    """A small CPU-bound job: shuffle a deck and checksum the result."""
+    deck = list(range(cards))
+    random.Random(seed).shuffle(deck)
+    return sum(i * card for i, card in enumerate(deck)) % 1000003
+
+
+async def heartbeat(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - start - HEARTBEAT)
+
+
+async def run(name, cost, **options):
+    async with medusa.HybridExecutor(**options) as executor:
+        lags = []
+        stop = asyncio.Event()
+        beat = asyncio.create_task(heartbeat(lags, stop))
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        futures = []
+        for i in range(JOBS):
+            futures.append(executor.submit(shuffle_checksum, i, CARDS,
+                                           cost=cost))
+            if i % 100 == 99:
+                await asyncio.sleep(0)  # A producer that lets others run
+        results = await asyncio.gather(*futures)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await beat
+    lags.sort()
+    p99 = lags[int(0.99 * (len(lags) - 1))] if lags else 0.0
+    worst = lags[-1] if lags else 0.0
+    print(f"{name:<28} {JOBS / elapsed:>9,.0f} jobs/s   loop lag p99 "
+          f"{p99 * 1000:7.2f} ms  max {worst * 1000:7.2f} ms   "
+          f"round trips {executor.round_trips}")
+    return results
+
+
+async def main():
+    print(f"{JOBS} jobs shuffling {CARDS} cards, "
+          f"{os.cpu_count()} CPUs")
+    expected = await run("inline", medusa.INLINE, warm=False)
+    for name, options in (("process, chunksize 1", {"chunksize": 1}),
+                          ("process, chunksize 32", {"chunksize": 32})):
+        assert await run(name, medusa.CPU, **options) == expected
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
+
+##
+#
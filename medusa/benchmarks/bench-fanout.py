@@ -0,0 +1,59 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Peak memory and run time of fanning out over many inputs with
+# medusa.map_concurrent, against creating every task up front with
+# ensure_future and gathering them as xmedusa.py and ymedusa.py used to.
+# The number of inputs may be given as the only argument.
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+INPUTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+LIMIT = 1000
+
+
+async def job(i):
+    await asyncio.sleep(0)
+    return i
+
+
+async def bench_gather():
+    tasks = [asyncio.ensure_future(job(i)) for i in range(INPUTS)]
+    return sum(await asyncio.gather(*tasks))
+
+
+async def bench_map(ordered):
+    total = 0
+    async for result in medusa.map_concurrent(job, range(INPUTS),
+                                              limit=LIMIT, ordered=ordered):
+        total += result
+    return total
+
+
+async def main():
+    print(f"{INPUTS:,} inputs, map_concurrent limit {LIMIT}")
+    expected = INPUTS * (INPUTS - 1) // 2
+    for name, bench in (
+            ("ensure_future + gather", bench_gather),
+            ("map_concurrent in order", lambda: bench_map(True)),
+            ("map_concurrent as done", lambda: bench_map(False))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        assert await bench() == expected
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<24} {INPUTS / elapsed:>10,.0f} inputs/s   "
+              f"peak memory {peak / 2**20:8.1f} MiB")
+
+
+asyncio.run(main())
+
+##
+#
@@ -0,0 +1,79 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Overhead of medusa.LoopMonitor on a busy event loop: WorkerPool throughput
+# without a monitor, with the heartbeat and job times and with every
+# callback timed as well. The jobs do next to nothing, so this is the worst
+# case. Then what a monitor reports about a loop blocked by a job that
+# sleeps instead of awaiting.
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+JOBS = 300000
+WORKERS = 8
+
+
+async def job(i):
+    await asyncio.sleep(0)
+    return i
+
+
+def blocking_job(seconds):
+    time.sleep(seconds)  # The mistake a monitor should point at
+
+
+async def run_pool(monitor):
+    async with medusa.WorkerPool(workers=WORKERS, maxsize=4096,
+                                 monitor=monitor) as pool:
+        for i in range(JOBS):
+            try:
+                pool.submit_nowait(job, i)
+            except asyncio.QueueFull:
+                await pool.submit(job, i)
+    assert pool.completed == JOBS
+
+
+async def bench(name, monitor):
+    if monitor is not None:
+        monitor.start()
+    start = time.perf_counter()
+    await run_pool(monitor)
+    elapsed = time.perf_counter() - start
+    if monitor is not None:
+        await monitor.stop()
+    print(f"{name:<28} {JOBS / elapsed:>10,.0f} jobs/s")
+
+
+async def blocked():
+    async with medusa.LoopMonitor(interval=0.01,
+                                  slow_callback=0.02) as monitor:
+        async with medusa.WorkerPool(workers=2, monitor=monitor,
+                                     name="blocking") as pool:
+            for i in range(5):
+                await pool.submit(blocking_job, 0.05)
+                await asyncio.sleep(0.05)
+        snapshot = monitor.snapshot()
+    for histogram in (snapshot["lag"], *snapshot["jobs"]["blocking"].values()):
+        del histogram["buckets"]
+    del snapshot["slow_callbacks"]["recent"][1:]
+    print(json.dumps(snapshot, indent=1))
+
+
+async def main():
+    await bench("no monitor", None)
+    await bench("heartbeat and job times",
+                medusa.LoopMonitor(slow_callback=None))
+    await bench("callbacks timed as well", medusa.LoopMonitor())
+    await blocked()
+
+
+asyncio.run(main())
+
+##
+#
@@ -0,0 +1,68 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Updates per second when many tasks update state kept per key, each update
+# awaiting something while it holds the lock, under one global asyncio.Lock
+# as in the lock.py demo, under medusa.KeyedLocks with a lock per key, and
+# striped. Then how many lock objects are left alive afterwards.
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+TASKS = 1000
+UPDATES = 5  # Per task
+KEYS = 100000
+STRIPES = 64
+
+
+class GlobalLock:
+    # The same interface over one lock for everything.
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    def __call__(self, key):
+        return self._lock
+
+    def __len__(self):
+        return 1
+
+
+async def bench(name, locks):
+    balances = {}
+    rng = random.Random(1)
+
+    async def worker():
+        for _ in range(UPDATES):
+            key = rng.randrange(KEYS)
+            async with locks(key):
+                balance = balances.get(key, 0)
+                await asyncio.sleep(0.001)  # Say, a write to a database
+                balances[key] = balance + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(TASKS)])
+    elapsed = time.perf_counter() - start
+    assert sum(balances.values()) == TASKS * UPDATES  # No lost updates
+    print(f"{name:<24} {TASKS * UPDATES / elapsed:>10,.0f} updates/s   "
+          f"{len(locks):>6} locks alive after")
+    return locks
+
+
+async def main():
+    await bench("one asyncio.Lock", GlobalLock())
+    await bench("KeyedLocks per key", medusa.KeyedLocks())
+    striped = await bench(f"KeyedLocks {STRIPES} stripes",
+                          medusa.KeyedLocks(stripes=STRIPES))
+    hottest = max(striped.stats(), key=lambda stripe: stripe["contended"])
+    print(f"hottest stripe: {hottest}")
+
+
+asyncio.run(main())
+
+##
+#
@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Requests per second through medusa.RpcServer and RpcClient over loopback
+# TCP and a Unix socket, one call at a time and pipelined by many concurrent
+# callers, for an echo handler and for xshuffle served as a handler. Server
+# and client share one event loop and so one CPU, as on a single core box.
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(HERE))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(HERE)),
+                             "xshuffle"))
+import medusa  # noqa: E402
+
+try:
+    import xshuffle  # noqa: E402
+except ImportError:
+    xshuffle = None
+
+REQUESTS = 20000
+CALLERS = 256  # Concurrent callers when pipelining
+CONNECTIONS = 4
+
+server = medusa.RpcServer()
+
+
+@server.handler()
+async def echo(value):
+    return value
+
+
+@server.handler()
+async def shuffle(cards, rounds):
+    return xshuffle.shuffle(list(range(cards)), rounds)
+
+
+async def bench(name, client, method, *args):
+    start = time.perf_counter()
+    for _ in range(REQUESTS // 10):
+        await client.call(method, *args)
+    sequential = REQUESTS // 10 / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    async for _ in medusa.map_concurrent(lambda i: client.call(method, *args),
+                                         range(REQUESTS), limit=CALLERS,
+                                         ordered=False):
+        pass
+    pipelined = REQUESTS / (time.perf_counter() - start)
+    print(f"{name:<24} {sequential:>10,.0f} requests/s one at a time  "
+          f"{pipelined:>10,.0f} requests/s pipelined")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "medusa.sock")
+        async with server:
+            host, port = await server.start_tcp()
+            await server.start_unix(path)
+            for transport, options in (("tcp", {"port": port}),
+                                       ("unix", {"path": path})):
+                async with medusa.RpcClient(connections=CONNECTIONS,
+                                            **options) as client:
+                    await bench(f"{transport} echo", client, "echo", "hello")
+                    if xshuffle is not None:
+                        await bench(f"{transport} xshuffle 52 x 3", client,
+                                    "shuffle", 52, 3)
+
+
+asyncio.run(main())
+
+##
+#
@@ -0,0 +1,133 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Context switches and messages per second with medusa.Scheduler against
+# asyncio tasks doing the same, and the memory each agent or task costs.
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+AGENTS = 10000
+SWITCHES = 100  # Per agent
+PAIRS = 1000
+MESSAGES = 200  # Per pair
+MEMORY_AGENTS = 100000
+
+
+def report(name, count, unit, elapsed):
+    print(f"{name:<34} {count / elapsed:>12,.0f} {unit}/s")
+
+
+def bench_switch_scheduler():
+    def agent():
+        for _ in range(SWITCHES):
+            yield
+
+    scheduler = medusa.Scheduler()
+    for _ in range(AGENTS):
+        scheduler.spawn(agent())
+    start = time.perf_counter()
+    scheduler.run()
+    report("Scheduler, yield", AGENTS * SWITCHES, "switches",
+           time.perf_counter() - start)
+
+
+async def bench_switch_asyncio():
+    async def agent():
+        for _ in range(SWITCHES):
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[agent() for _ in range(AGENTS)])
+    report("asyncio, sleep(0)", AGENTS * SWITCHES, "switches",
+           time.perf_counter() - start)
+
+
+def bench_messages_scheduler():
+    def ping(scheduler):
+        other = yield medusa.RECEIVE  # The pid of its pong, once spawned
+        for i in range(MESSAGES):
+            scheduler.send(other, i)
+            yield medusa.RECEIVE
+
+    def pong(scheduler, other):
+        for _ in range(MESSAGES):
+            scheduler.send(other, (yield medusa.RECEIVE))
+
+    scheduler = medusa.Scheduler()
+    for _ in range(PAIRS):
+        ping_pid = scheduler.spawn(ping(scheduler))
+        scheduler.send(ping_pid, scheduler.spawn(pong(scheduler, ping_pid)))
+    start = time.perf_counter()
+    scheduler.run()
+    report("Scheduler, send and RECEIVE", PAIRS * MESSAGES * 2, "messages",
+           time.perf_counter() - start)
+
+
+async def bench_messages_asyncio():
+    async def ping(inbox, outbox):
+        for i in range(MESSAGES):
+            outbox.put_nowait(i)
+            await inbox.get()
+
+    async def pong(inbox, outbox):
+        for _ in range(MESSAGES):
+            outbox.put_nowait(await inbox.get())
+
+    coroutines = []
+    for _ in range(PAIRS):
+        there, back = asyncio.Queue(), asyncio.Queue()
+        coroutines += [ping(back, there), pong(there, back)]
+    start = time.perf_counter()
+    await asyncio.gather(*coroutines)
+    report("asyncio, Queue", PAIRS * MESSAGES * 2, "messages",
+           time.perf_counter() - start)
+
+
+def bench_memory():
+    def agent():
+        yield 1.0
+
+    async def task():
+        await asyncio.sleep(1.0)
+
+    tracemalloc.start()
+    scheduler = medusa.Scheduler()
+    for _ in range(MEMORY_AGENTS):
+        scheduler.spawn(agent())
+    scheduler.run(until=0.5)  # Everyone is asleep in the timer heap now
+    scheduler_bytes = tracemalloc.get_traced_memory()[0]
+    del scheduler
+    tracemalloc.stop()
+
+    async def spawn():
+        tracemalloc.start()
+        tasks = [asyncio.create_task(task()) for _ in range(MEMORY_AGENTS)]
+        await asyncio.sleep(0)  # Everyone is asleep in call_later now
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return used
+
+    asyncio_bytes = asyncio.run(spawn())
+    for name, used in (("Scheduler", scheduler_bytes),
+                       ("asyncio", asyncio_bytes)):
+        print(f"{name + ', memory per sleeping agent':<34} "
+              f"{used / MEMORY_AGENTS:>12,.0f} bytes")
+
+
+bench_switch_scheduler()
+asyncio.run(bench_switch_asyncio())
+bench_messages_scheduler()
+asyncio.run(bench_messages_asyncio())
+bench_memory()
+
+##
+#
@@ -0,0 +1,86 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# medusa.TimerWheel against the event loop's own call_later(): arming and
+# cancelling many timeouts that almost never fire, as request timeouts do,
+# and firing many timers spread over a second, measuring how late they fire.
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+TIMEOUTS = 1000000
+TIMEOUT = 10.0
+FIRED = 200000
+START = 1.0  # Seconds before the first timer is due, to arm them all first
+SPREAD = 1.0
+
+
+def noop():
+    pass
+
+
+async def bench_cancel(name, call_later):
+    start = time.perf_counter()
+    for _ in range(TIMEOUTS):
+        call_later(TIMEOUT, noop).cancel()
+        # A real request would do its work here, then its timeout is
+        # cancelled because it answered in time.
+    elapsed = time.perf_counter() - start
+    # Again, fewer of them, for the memory cancelled timers leave behind,
+    # since tracing memory slows everything down.
+    tracemalloc.start()
+    for _ in range(TIMEOUTS // 10):
+        call_later(TIMEOUT, noop).cancel()
+    left = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name:<18} arm and cancel {TIMEOUTS / elapsed:>10,.0f} timers/s"
+          f"  {left / (TIMEOUTS // 10):5.0f} bytes per cancelled timer")
+
+
+async def bench_fire(name, call_later):
+    loop = asyncio.get_running_loop()
+    lateness = []
+    done = loop.create_future()
+
+    def fire(due):
+        lateness.append(loop.time() - due)
+        if len(lateness) == FIRED:
+            done.set_result(None)
+
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(FIRED):
+        delay = START + rng.random() * SPREAD
+        call_later(delay, fire, loop.time() + delay)
+    armed = time.perf_counter() - start
+    await done
+    lateness.sort()
+    print(f"{name:<18} arm {FIRED / armed:>10,.0f} timers/s   "
+          f"late p50 {lateness[FIRED // 2] * 1000:6.2f} ms  "
+          f"p99 {lateness[FIRED * 99 // 100] * 1000:6.2f} ms")
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    timers = (("loop.call_later", lambda: loop.call_later),
+              ("TimerWheel 10 ms", lambda: medusa.TimerWheel(
+                  resolution=0.01).call_later),
+              ("TimerWheel 1 ms", lambda: medusa.TimerWheel(
+                  resolution=0.001).call_later))
+    for name, make in timers:
+        await bench_cancel(name, make())
+        await asyncio.sleep(0)  # Let the loop drop its cancelled handles
+    for name, make in timers:
+        await bench_fire(name, make())
+
+
+asyncio.run(main())
+
+##
+#
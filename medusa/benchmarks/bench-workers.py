@@ -0,0 +1,88 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Throughput of medusa.WorkerPool against the hand-written asyncio.Queue
+# consumers of the queue.py demo and against one task per job.
+#
+# The pool does more per job than the bare consumers: it makes a future for
+# every result and keeps a failing job from taking its consumer down. On one
+# core that costs it about a fifth of their throughput, some 840k jobs/s
+# against 1.08M, while one task per job manages about 95k.
+#
+# The benchmarks live in their own directory because queue.py next to the
+# demos would otherwise be imported in place of the standard library queue
+# module. The medusa package is found through the parent directory, which is
+# appended to the path after the standard library.
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+JOBS = 500000
+WORKERS = 8
+
+
+def job(i):
+    return i + 1
+
+
+async def bench_pool():
+    async with medusa.WorkerPool(workers=WORKERS, maxsize=4096) as pool:
+        last = None
+        for i in range(JOBS):
+            try:
+                last = pool.submit_nowait(job, i)
+            except asyncio.QueueFull:
+                last = await pool.submit(job, i)
+    assert last.result() == JOBS
+    assert pool.completed == JOBS
+
+
+async def bench_queue():
+    q = asyncio.Queue(maxsize=4096)
+    results = []
+
+    async def consumer():
+        while True:
+            item = await q.get()
+            if item is None:
+                q.task_done()
+                break
+            results.append(job(item))
+            q.task_done()
+
+    consumers = [asyncio.create_task(consumer()) for _ in range(WORKERS)]
+    for i in range(JOBS):
+        await q.put(i)
+    for _ in range(WORKERS):
+        await q.put(None)
+    await asyncio.gather(*consumers)
+    assert len(results) == JOBS
+
+
+async def bench_tasks():
+    async def run(i):
+        return job(i)
+
+    tasks = [asyncio.create_task(run(i)) for i in range(JOBS)]
+    results = await asyncio.gather(*tasks)
+    assert len(results) == JOBS
+
+
+async def main():
+    for name, bench in (("medusa.WorkerPool", bench_pool),
+                        ("asyncio.Queue consumers", bench_queue),
+                        ("one task per job", bench_tasks)):
+        start = time.perf_counter()
+        await bench()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<24} {JOBS / elapsed:>12,.0f} jobs/s")
+
+
+asyncio.run(main())
+
+##
+#
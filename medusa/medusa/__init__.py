@@ -3,6 +3,18 @@
 import sys
 import math
 
+from .accumulators import ShardedCounters, ShardedSums, ShardedHistogram
+from .broadcast import Broadcast, Subscription, BLOCK, DROP_OLDEST, \
+    DROP_NEWEST
+from .executor import HybridExecutor, cost, INLINE, IO, CPU
+from .fanout import map_concurrent
+from .health import LoopMonitor, Histogram
+from .keyedlocks import KeyedLocks
+from .rpc import RpcServer, RpcClient, RpcError
+from .scheduler import Scheduler, RECEIVE
+from .timerwheel import TimerWheel, Timer
+from .workers import WorkerPool
+
 verbose = False
 
 
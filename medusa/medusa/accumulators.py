@@ -0,0 +1,196 @@
+#! /usr/bin/env python3
+
+import array
+import bisect
+import multiprocessing
+import sys
+
+
+class _Sharded:
+    # A flat, preallocated array of 'shards' rows of 'size' slots each, one
+    # row per worker. Each worker only ever writes its own row, so no lock
+    # is needed, and rows are only added up when read. In shared mode the
+    # array is in shared memory, for worker processes.
+
+    def __init__(self, typecode, size, shards, shared):
+        if size < 1 or shards < 1:
+            raise ValueError("size and shards must be at least 1")
+        self.size = size
+        self.shards = shards
+        self.shared = shared
+        self._typecode = typecode
+        if shared:
+            self._data = multiprocessing.RawArray(typecode, size * shards)
+        else:
+            self._data = array.array(typecode, bytes(
+                array.array(typecode).itemsize * size * shards))
+        self._view()
+
+    def _view(self):
+        self._memory = memoryview(self._data).cast("B").cast(self._typecode)
+
+    def __getstate__(self):
+        # Memoryviews do not pickle. A shared array pickles only when
+        # handed to a process as it starts, which then shares its memory.
+        state = self.__dict__.copy()
+        del state["_memory"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._view()
+
+    def shard(self, worker):
+        """Return the row of slots of one worker, to update in place:
+
+            hits = counters.shard(worker)
+            hits[PAGE_VIEWS] += 1
+
+        Args:
+            worker (int): the worker's shard, 0 to shards - 1. No two
+                threads or processes may update the same shard at once."""
+        if not 0 <= worker < self.shards:
+            raise IndexError(f"No shard {worker} of {self.shards}")
+        return self._memory[worker * self.size:(worker + 1) * self.size]
+
+    def value(self, index):
+        """Return one slot, 0 to size - 1, added up over every shard."""
+        if not 0 <= index < self.size:
+            raise IndexError(f"No slot {index} of {self.size}")
+        return sum(self._memory[index::self.size])
+
+    def values(self):
+        """Return every slot added up over every shard, as a list."""
+        memory = self._memory
+        size = self.size
+        return [sum(memory[index::size]) for index in range(size)]
+
+    def total(self):
+        """Return the sum of every slot of every shard."""
+        return sum(self._memory)
+
+    def reset(self):
+        """Set every slot of every shard to zero. Not safe while workers
+        are updating."""
+        self._memory[:] = array.array(self._typecode,
+                                      bytes(self._memory.nbytes))
+
+
+class ShardedCounters(_Sharded):
+    """Preallocated 64 bit integer counters, one row of them per worker,
+    added up across workers only when read. Updating is indexing a
+    memoryview, with no lock and no dict lookup, and works the same in
+    threads and, with shared=True, in worker processes.
+
+        counters = ShardedCounters(3, shards=WORKERS)
+
+        def worker(n):
+            mine = counters.shard(n)
+            for spider in range(3):
+                mine[spider] += drop()
+
+        print(counters.values())"""
+
+    def __init__(self, size, shards=1, shared=False):
+        """Args:
+            size (int): counters per shard
+            shards (int): shards, one per worker
+            shared (bool): keep the counters in shared memory, so worker
+                processes started after this, or given it when they start,
+                update the same counters"""
+        super().__init__("q", size, shards, shared)
+
+
+class ShardedSums(_Sharded):
+    """Like ShardedCounters, but floating point, for adding up amounts such
+    as durations or sizes."""
+
+    def __init__(self, size, shards=1, shared=False):
+        """Args: as for ShardedCounters"""
+        super().__init__("d", size, shards, shared)
+
+
+class _HistogramShard:
+    # The part of a ShardedHistogram one worker records into.
+
+    __slots__ = ("_bounds", "_counts", "_total")
+
+    def __init__(self, bounds, counts, total):
+        self._bounds = bounds
+        self._counts = counts
+        self._total = total
+
+    def record(self, value):
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self._total[0] += value
+
+
+class ShardedHistogram:
+    """Counts of values in buckets with given upper bounds, one set of
+    counts per worker, added up only when read.
+
+        latency = ShardedHistogram((0.001, 0.01, 0.1, 1.0), shards=WORKERS)
+        mine = latency.shard(n)
+        mine.record(elapsed)
+        print(latency.counts(), latency.percentile(99))"""
+
+    def __init__(self, bounds, shards=1, shared=False):
+        """Args:
+            bounds (list): upper bounds of the buckets, ascending. Values
+                above the last go in one more bucket.
+            shards (int): shards, one per worker
+            shared (bool): as for ShardedCounters"""
+        self.bounds = tuple(bounds)
+        if list(self.bounds) != sorted(self.bounds):
+            raise ValueError("bounds must be ascending")
+        self.shards = shards
+        self._counts = ShardedCounters(len(self.bounds) + 1, shards, shared)
+        self._totals = ShardedSums(1, shards, shared)
+
+    def shard(self, worker):
+        """Return the part of the histogram one worker records into, with
+        its record(value) method.
+
+        Args: as for ShardedCounters.shard()"""
+        return _HistogramShard(self.bounds, self._counts.shard(worker),
+                               self._totals.shard(worker))
+
+    def counts(self):
+        """Return the count of every bucket, added up over every shard."""
+        return self._counts.values()
+
+    def count(self):
+        return self._counts.total()
+
+    def total(self):
+        """Return the sum of every value recorded."""
+        return self._totals.total()
+
+    def percentile(self, point):
+        """Return the upper bound of the bucket holding the percentile
+        'point' (0 to 100), infinity if that is the last one, or None if
+        nothing was recorded."""
+        counts = self.counts()
+        recorded = sum(counts)
+        if not recorded:
+            return None
+        rank = point / 100 * recorded
+        seen = 0
+        for bound, count in zip(self.bounds, counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return float("inf")
+
+    def reset(self):
+        self._counts.reset()
+        self._totals.reset()
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
@@ -0,0 +1,261 @@
+#! /usr/bin/env python3
+
+import asyncio
+import collections
+import sys
+
+# Overflow policies: what publishing does when a subscriber's buffer is full.
+BLOCK = "block"  # Wait for the subscriber to make room
+DROP_OLDEST = "drop-oldest"  # Make room by dropping its oldest message
+DROP_NEWEST = "drop-newest"  # Drop the new message for that subscriber
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+def _wake_one(waiters):
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            return
+
+
+def _wake_all(waiters):
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+class Subscription:
+    """One subscriber's view of a Broadcast: the messages published since
+    it subscribed, in a buffer of its own. Made by Broadcast.subscribe().
+
+        with broadcast.subscribe() as subscription:
+            async for message in subscription:
+                ...
+
+    Iterating ends once the broadcast is closed and every message already
+    buffered has been read."""
+
+    def __init__(self, broadcast, maxsize, overflow):
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self._broadcast = broadcast
+        self._loop = broadcast._loop
+        maxlen = maxsize if overflow == DROP_OLDEST else None
+        self._buffer = collections.deque(maxlen=maxlen)
+        self._getters = collections.deque()  # Futures of waiting readers
+        self._putters = collections.deque()  # Futures of blocked publishers
+        self._closed = False
+
+    def __len__(self):
+        """Return the number of messages waiting to be read."""
+        return len(self._buffer)
+
+    def full(self):
+        return len(self._buffer) >= self.maxsize
+
+    def _deliver(self, message):
+        # Called by the broadcast, which has already made sure a BLOCK
+        # subscriber has room.
+        buffer = self._buffer
+        if len(buffer) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == DROP_NEWEST:
+                return False
+        buffer.append(message)  # Drops the oldest when full, by maxlen
+        if self._getters:
+            _wake_one(self._getters)
+        return True
+
+    def get_nowait(self):
+        """Return the oldest waiting message.
+
+        Raises asyncio.QueueEmpty if there is none, and RuntimeError if
+        there is none and the subscription is closed."""
+        if not self._buffer:
+            if self._closed:
+                raise RuntimeError("Subscription is closed")
+            raise asyncio.QueueEmpty
+        message = self._buffer.popleft()
+        if self._putters:
+            _wake_all(self._putters)
+        return message
+
+    async def get(self):
+        """Return the oldest waiting message, first waiting for one if need
+        be.
+
+        Raises RuntimeError if there is none and the subscription is
+        closed."""
+        while not self._buffer and not self._closed:
+            getter = self._loop.create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                # Pass the wake-up on, it may have been meant for this one.
+                if getter.done() and not getter.cancelled():
+                    _wake_one(self._getters)
+                raise
+        return self.get_nowait()
+
+    async def _room(self):
+        putter = self._loop.create_future()
+        self._putters.append(putter)
+        await putter
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get()
+        except RuntimeError:
+            raise StopAsyncIteration
+
+    def close(self):
+        """Unsubscribe. Messages already buffered can still be read."""
+        if self._closed:
+            return
+        self._closed = True
+        self._broadcast._unsubscribe(self)
+        _wake_all(self._getters)
+        _wake_all(self._putters)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Broadcast:
+    """Fans every published message out to every subscriber, each of which
+    reads at its own pace from its own bounded buffer, unlike
+    asyncio.Condition and asyncio.Event as in the conditions.py and
+    event.py demos, which carry no message and wake every waiter to
+    contend for one lock.
+
+    Publishing appends the message to each subscriber's buffer and wakes
+    only readers that are waiting for it, so it costs O(subscribers) with
+    no lock at all. A subscriber whose buffer is full is dealt with by its
+    overflow policy:
+
+    BLOCK        publish() waits until it has room, holding the message
+                 back from every subscriber until then
+    DROP_OLDEST  its oldest message is dropped to make room
+    DROP_NEWEST  it misses the new message
+
+    A subscriber only sees messages published after it subscribed.
+
+        broadcast = Broadcast(maxsize=16)
+        with broadcast.subscribe() as subscription:
+            await broadcast.publish("hello")
+            print(await subscription.get())"""
+
+    def __init__(self, maxsize=64, overflow=DROP_OLDEST):
+        """Args:
+            maxsize (int): default buffer size of each subscriber
+            overflow (string): default overflow policy of each subscriber,
+                BLOCK, DROP_OLDEST or DROP_NEWEST"""
+        _check(maxsize, overflow)
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.published = 0
+        self._loop = None
+        self._subscriptions = {}  # Used as an ordered set
+        self._blocking = {}  # The BLOCK subscriptions among them
+        self._closed = False
+
+    def __len__(self):
+        """Return the number of subscribers."""
+        return len(self._subscriptions)
+
+    def subscribe(self, maxsize=None, overflow=None):
+        """Add a subscriber.
+
+        Args:
+            maxsize (int): size of its buffer, default the broadcast's
+            overflow (string): its overflow policy, default the
+                broadcast's
+
+        Returns: A Subscription to read messages from.
+
+        Raises RuntimeError once the broadcast is closed."""
+        if self._closed:
+            raise RuntimeError("Broadcast is closed")
+        maxsize = self.maxsize if maxsize is None else maxsize
+        overflow = self.overflow if overflow is None else overflow
+        _check(maxsize, overflow)
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, maxsize, overflow)
+        self._subscriptions[subscription] = None
+        if overflow == BLOCK:
+            self._blocking[subscription] = None
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        self._subscriptions.pop(subscription, None)
+        self._blocking.pop(subscription, None)
+
+    def publish_nowait(self, message):
+        """Publish a message without waiting.
+
+        Returns: The number of subscribers the message was delivered to.
+
+        Raises asyncio.QueueFull, delivering to no one, if a BLOCK
+        subscriber is full, and RuntimeError once the broadcast is
+        closed."""
+        if self._closed:
+            raise RuntimeError("Broadcast is closed")
+        for subscription in self._blocking:
+            if subscription.full():
+                raise asyncio.QueueFull
+        self.published += 1
+        delivered = 0
+        for subscription in self._subscriptions:
+            if subscription._deliver(message):
+                delivered += 1
+        return delivered
+
+    async def publish(self, message):
+        """Publish a message, first waiting until every BLOCK subscriber
+        has room for it.
+
+        Returns: The number of subscribers the message was delivered to.
+
+        Raises RuntimeError once the broadcast is closed."""
+        while not self._closed:
+            full = next((subscription for subscription in self._blocking
+                         if subscription.full()), None)
+            if full is None:
+                break
+            await full._room()
+        return self.publish_nowait(message)
+
+    def close(self):
+        """Stop publishing. Subscribers can still read what they have
+        buffered, then their iteration ends."""
+        self._closed = True
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+
+def _check(maxsize, overflow):
+    if maxsize < 1:
+        raise ValueError("maxsize must be at least 1")
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unknown overflow policy {overflow!r}, expected "
+                         f"one of {', '.join(OVERFLOW_POLICIES)}")
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
@@ -0,0 +1,283 @@
+#! /usr/bin/env python3
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import pickle
+import sys
+import time
+
+# Cost classes. A job's cost class decides where it runs.
+INLINE = "inline"  # Trivial work, called right in the event loop
+IO = "io"  # Blocking I/O or C code that releases the GIL, run in a thread
+CPU = "cpu"  # Pure Python number crunching, run in a worker process
+COST_CLASSES = (INLINE, IO, CPU)
+
+
+def cost(cost_class):
+    """Decorator declaring the cost class of a function, so that
+    HybridExecutor.submit() knows where to run it without being told.
+
+        @medusa.cost(medusa.CPU)
+        def analyse_maze(level):
+            ...
+
+    Args: single argument, one of INLINE, IO or CPU"""
+    if cost_class not in COST_CLASSES:
+        raise ValueError(f"Unknown cost class {cost_class!r}, expected one "
+                         f"of {', '.join(COST_CLASSES)}")
+
+    def declare(fn):
+        fn.medusa_cost = cost_class
+        return fn
+    return declare
+
+
+def _run_batch(batch):
+    # Runs in a worker process. Each job's outcome is returned on its own,
+    # so one failing job never costs the rest of the batch their results.
+    # Outcomes are pickled one by one, here and not with the batch, so one
+    # that does not pickle, or would not unpickle, fails only its own job
+    # rather than the whole batch and the pool with it.
+    outcomes = []
+    for fn, args, kwargs in batch:
+        try:
+            ok, value = True, fn(*args, **kwargs)
+        except Exception as e:
+            ok, value = False, e
+        try:
+            data = pickle.dumps(value)
+            if not ok:
+                pickle.loads(data)  # Exceptions often do not unpickle
+        except Exception as e:
+            ok = False
+            data = pickle.dumps(RuntimeError(
+                f"Could not pickle {value!r} back from the worker: {e!r}"))
+        outcomes.append((ok, data))
+    return outcomes
+
+
+def _warm(delay):
+    # Holds a worker long enough that the next warm-up job has to start or
+    # use another one.
+    time.sleep(delay)
+    return os.getpid()
+
+
+class HybridExecutor:
+    """Runs blocking jobs for asyncio code without blocking the event loop,
+    each where its cost class says it belongs:
+
+    INLINE   called directly in the event loop, no hand-off cost at all
+    IO       run in a thread pool
+    CPU      run in a pool of worker processes, which are started and
+             warmed up front rather than on the first job
+
+    CPU jobs submitted in the same pass of the event loop are sent to the
+    worker processes in chunks of up to 'chunksize' jobs, one round trip
+    per chunk, so many small jobs do not each pay for pickling and IPC.
+
+    Every job gets an asyncio future for its result. A job that raises
+    fails only its own future, chunked or not, even if what it raised or
+    returned cannot be pickled back, which fails it with RuntimeError. CPU
+    jobs and their arguments must be picklable, so jobs should be module
+    level functions. If a worker process dies, the jobs of its chunk fail
+    with BrokenProcessPool and a new process pool takes over for later
+    jobs.
+
+        async with HybridExecutor() as executor:
+            total = await executor.submit(checksum, data, cost=medusa.CPU)"""
+
+    def __init__(self, processes=None, threads=None, chunksize=32,
+                 warm=True, default_cost=IO):
+        """Args:
+            processes (int): worker processes, default one per CPU
+            threads (int): worker threads, default as the thread pool does
+            chunksize (int): the most CPU jobs sent to a process at once
+            warm (bool): start every worker process in start() instead of
+                when the first jobs arrive
+            default_cost (string): cost class of jobs that neither declare
+                one with @cost nor are given one"""
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        if default_cost not in COST_CLASSES:
+            raise ValueError(f"Unknown cost class {default_cost!r}")
+        self.processes = processes or os.cpu_count() or 1
+        self.threads = threads
+        self.chunksize = chunksize
+        self.warm = warm
+        self.default_cost = default_cost
+        self.round_trips = 0
+        self.pools_replaced = 0  # Process pools replaced after breaking
+        self._loop = None
+        self._process_pool = None
+        self._thread_pool = None
+        self._pending = []
+        self._flush_scheduled = False
+
+    def _create_pools(self):
+        self._loop = asyncio.get_running_loop()
+        self._thread_pool = concurrent.futures.ThreadPoolExecutor(
+            self.threads, thread_name_prefix="medusa")
+        self._process_pool = concurrent.futures.ProcessPoolExecutor(
+            self.processes)
+
+    async def start(self):
+        """Create the pools and, if warm, start every worker process. Called
+        by submit() if need be, but then without warming."""
+        if self._loop is not None:
+            return
+        self._create_pools()
+        if self.warm:
+            # Process pools may start workers only as jobs arrive, so keep
+            # handing out jobs that hold a worker until all are running.
+            pids = set()
+            for _ in range(4):
+                pids.update(await asyncio.gather(*[
+                    self._loop.run_in_executor(self._process_pool, _warm,
+                                               0.05)
+                    for _ in range(self.processes)]))
+                if len(pids) >= self.processes:
+                    break
+
+    def submit(self, fn, *args, cost=None, **kwargs):
+        """Run a job where its cost class says.
+
+        Args:
+            fn (callable): the job. A coroutine function only makes sense
+                as INLINE, where it is run as a task.
+            cost (string): INLINE, IO or CPU. Default the class fn was
+                declared with by @cost, or else default_cost.
+
+        Returns: An asyncio future for the result of fn(*args, **kwargs)."""
+        if self._loop is None:
+            self._create_pools()
+        if cost is None:
+            cost = getattr(fn, "medusa_cost", self.default_cost)
+
+        if cost == INLINE:
+            future = self._loop.create_future()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                return future
+            if asyncio.iscoroutine(result):
+                return asyncio.ensure_future(result)
+            future.set_result(result)
+            return future
+
+        if cost == IO:
+            return self._loop.run_in_executor(
+                self._thread_pool, functools.partial(fn, *args, **kwargs))
+
+        if cost == CPU:
+            future = self._loop.create_future()
+            self._pending.append((future, (fn, args, kwargs)))
+            if len(self._pending) >= self.chunksize:
+                self._flush()
+            elif not self._flush_scheduled:
+                self._flush_scheduled = True
+                self._loop.call_soon(self._flush)
+            return future
+
+        raise ValueError(f"Unknown cost class {cost!r}")
+
+    def _flush(self):
+        self._flush_scheduled = False
+        while self._pending:
+            chunk = self._pending[:self.chunksize]
+            del self._pending[:self.chunksize]
+            # Jobs cancelled before they were sent are simply not sent.
+            chunk = [job for job in chunk if not job[0].done()]
+            if not chunk:
+                continue
+            futures = [job[0] for job in chunk]
+            jobs = [job[1] for job in chunk]
+            pool = self._process_pool
+            try:
+                submitted = pool.submit(_run_batch, jobs)
+            except concurrent.futures.BrokenExecutor:
+                pool = self._replace_process_pool(pool)
+                submitted = pool.submit(_run_batch, jobs)
+            batch = asyncio.wrap_future(submitted, loop=self._loop)
+            batch.add_done_callback(functools.partial(self._settle, pool,
+                                                      futures))
+            self.round_trips += 1
+
+    def _replace_process_pool(self, broken):
+        # A worker process died, say killed or out of memory, and a broken
+        # pool fails every job from then on. Start a new one in its place,
+        # unless that has been done already or the executor is shut down.
+        if self._process_pool is broken and self._loop is not None:
+            broken.shutdown(wait=False)
+            self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                self.processes)
+            self.pools_replaced += 1
+        return self._process_pool
+
+    def _settle(self, pool, futures, batch):
+        if batch.cancelled():
+            for future in futures:
+                future.cancel()
+            return
+        error = batch.exception()
+        if error is not None:  # The worker died or the chunk did not pickle
+            if isinstance(error, concurrent.futures.BrokenExecutor):
+                self._replace_process_pool(pool)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, (ok, data) in zip(futures, batch.result()):
+            if future.done():
+                continue
+            try:
+                value = pickle.loads(data)
+            except Exception as e:
+                ok = False
+                value = RuntimeError(f"Could not unpickle the outcome of a "
+                                     f"job: {e!r}")
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    async def shutdown(self, wait=True):
+        """Shut the pools down.
+
+        Args:
+            wait (bool): if True, wait for running and queued jobs to
+                finish first, without blocking the event loop. If False,
+                cancel what has not started yet."""
+        if self._loop is None:
+            return
+        self._flush()
+        process_pool = self._process_pool
+        thread_pool = self._thread_pool
+        self._loop = None
+        if wait:
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(process_pool.shutdown, wait=True))
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(thread_pool.shutdown, wait=True))
+        else:
+            process_pool.shutdown(wait=False, cancel_futures=True)
+            thread_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.shutdown(wait=exc_type is None)
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
@@ -0,0 +1,116 @@
+#! /usr/bin/env python3
+
+import asyncio
+import collections
+import inspect
+import sys
+
+_DONE = object()  # Marks the end of the inputs
+
+
+async def _call(fn, item):
+    result = fn(item)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _pull(source, is_async):
+    if not is_async:
+        return next(source, _DONE)
+    try:
+        return await source.__anext__()
+    except StopAsyncIteration:
+        return _DONE
+
+
+def _outcome(task, return_exceptions):
+    if return_exceptions and (task.cancelled() or task.exception()):
+        return (asyncio.CancelledError() if task.cancelled()
+                else task.exception())
+    return task.result()
+
+
+async def map_concurrent(fn, iterable, limit=16, ordered=True,
+                         return_exceptions=False):
+    """Call fn on every input with at most 'limit' calls in flight at once,
+    yielding the results. The bounded replacement for creating a task per
+    input up front and gathering them, as xmedusa.py and ymedusa.py did:
+
+        async for result in map_concurrent(fetch, urls, limit=100):
+            ...
+
+    Inputs are pulled from the iterable only as calls finish, so the inputs
+    may be a generator of any length and memory use grows with limit, not
+    with the number of inputs. In order, a finished call waits to be
+    yielded until every call before it has been, and it still counts
+    against the limit until then, so one slow call can hold up the rest.
+
+    If a call raises, the exception is raised where its result would have
+    been yielded, unless return_exceptions is True, and the calls still in
+    flight are cancelled. The same happens when the caller stops iterating
+    early, once the generator is closed.
+
+    Args:
+        fn (callable): called with each input. A coroutine function or a
+            plain function, whose result is then used as it is.
+        iterable: the inputs, a plain or an async iterable
+        limit (int): the most calls in flight at once
+        ordered (bool): yield results in the order of the inputs if True,
+            else in the order the calls finish
+        return_exceptions (bool): yield the exception of a failed call as
+            its result instead of raising it, as asyncio.gather() does
+
+    Returns: An async generator of the results."""
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    loop = asyncio.get_running_loop()
+    is_async = hasattr(iterable, "__aiter__")
+    source = iterable.__aiter__() if is_async else iter(iterable)
+    in_order = collections.deque()  # Calls in input order, when ordered
+    in_flight = set()  # Calls not yet finished, when not ordered
+    done = set()  # Finished calls not yet yielded, when not ordered
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(in_order) + len(in_flight) < limit:
+                item = await _pull(source, is_async)
+                if item is _DONE:
+                    exhausted = True
+                    break
+                task = loop.create_task(_call(fn, item))
+                if ordered:
+                    in_order.append(task)
+                else:
+                    in_flight.add(task)
+
+            if ordered:
+                if not in_order:
+                    return
+                if not in_order[0].done():
+                    await asyncio.wait((in_order[0],))
+                yield _outcome(in_order.popleft(), return_exceptions)
+            else:
+                if not in_flight:
+                    return
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED)
+                while done:
+                    yield _outcome(done.pop(), return_exceptions)
+    finally:
+        left = list(in_order) + list(in_flight) + list(done)
+        for task in left:
+            task.cancel()
+        if left:
+            await asyncio.gather(*left, return_exceptions=True)
+        if is_async and not exhausted and hasattr(source, "aclose"):
+            await source.aclose()
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
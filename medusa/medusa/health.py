@@ -0,0 +1,324 @@
+#! /usr/bin/env python3
+
+import asyncio
+import bisect
+import collections
+import json
+import sys
+import threading
+import time
+
+# Histogram buckets, upper bounds in seconds: 10 microseconds doubling up to
+# about 84 seconds, plus one for anything longer. Recording a value costs a
+# bisect and an increment, whatever the number of values.
+BUCKETS = tuple(0.00001 * 2 ** i for i in range(24))
+PERCENTILES = (50, 90, 99)
+SLOW_CALLBACKS_KEPT = 100
+
+# Timing callbacks wraps asyncio.events.Handle._run, which is private and
+# shared by every pure Python event loop in the process, in every thread.
+# One wrapper serves all monitors: it is put in place when the first starts
+# timing and taken out when the last stops, and times only callbacks of the
+# loops that have a monitor, by a dict lookup per callback.
+_timed_loops = {}  # Loop to the monitor timing its callbacks
+_timed_lock = threading.Lock()
+_handle_run = None  # The original Handle._run while the wrapper is in
+
+
+def _timed_run(handle):
+    monitor = _timed_loops.get(handle._loop)
+    if monitor is None:
+        return _handle_run(handle)
+    start = time.perf_counter()
+    _handle_run(handle)
+    elapsed = time.perf_counter() - start
+    if elapsed >= monitor.slow_callback:
+        monitor._record_slow(handle, elapsed)
+
+
+def _time_callbacks(loop, monitor):
+    global _handle_run
+    with _timed_lock:
+        if loop in _timed_loops:
+            raise RuntimeError("Another LoopMonitor is already timing "
+                               "callbacks on this loop")
+        if _handle_run is None:
+            _handle_run = asyncio.events.Handle._run
+            asyncio.events.Handle._run = _timed_run
+        _timed_loops[loop] = monitor
+
+
+def _untime_callbacks(loop):
+    global _handle_run
+    with _timed_lock:
+        _timed_loops.pop(loop, None)
+        # Put the original back only if nothing else has wrapped it since.
+        # Otherwise leave the wrapper in, where it only passes calls on.
+        if (not _timed_loops and _handle_run is not None and
+                asyncio.events.Handle._run is _timed_run):
+            asyncio.events.Handle._run = _handle_run
+            _handle_run = None
+
+
+class Histogram:
+    """Counts of durations in exponential buckets, so percentiles are known
+    to within a factor of two in constant memory."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, point):
+        """Return the upper bound in seconds of the bucket holding the
+        percentile 'point' (0 to 100), at most the largest value seen.
+        Zero if nothing was recorded."""
+        if not self.count:
+            return 0.0
+        rank = point / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """Return the histogram in milliseconds, with only the buckets that
+        hold something, as [upper bound, count] pairs."""
+        ms = {"count": self.count,
+              "mean": round(self.total / self.count * 1000, 3)
+              if self.count else 0.0,
+              "max": round(self.max * 1000, 3)}
+        for point in PERCENTILES:
+            ms[f"p{point}"] = round(self.percentile(point) * 1000, 3)
+        ms["buckets"] = [
+            [round(BUCKETS[i] * 1000, 3) if i < len(BUCKETS) else None, count]
+            for i, count in enumerate(self.counts) if count]
+        return ms
+
+
+def _source(callback):
+    # Where a slow callback came from: the coroutine of a task, with the
+    # line it went on to wait at, or else the function called.
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Future) and hasattr(task, "get_coro"):
+        coro = task.get_coro()
+        frame = getattr(coro, "cr_frame", None)
+        code = getattr(coro, "cr_code", None)
+        name = getattr(coro, "__qualname__", repr(coro))
+        if frame is not None:
+            return f"{name} ({frame.f_code.co_filename}:{frame.f_lineno})"
+        if code is not None:
+            return f"{name} ({code.co_filename}:{code.co_firstlineno})"
+        return f"{task.get_name()} {name}"
+    function = getattr(callback, "__func__", callback)
+    function = getattr(function, "func", function)  # functools.partial
+    name = getattr(function, "__qualname__", repr(function))
+    code = getattr(function, "__code__", None)
+    if code is not None:
+        return f"{name} ({code.co_filename}:{code.co_firstlineno})"
+    return name
+
+
+class LoopMonitor:
+    """Health of a running event loop, cheap enough to leave on:
+
+    lag             how late a heartbeat task wakes up, which is how long
+                    anything ready to run may wait for a blocked loop
+    slow callbacks  callbacks and task steps that held the loop for longer
+                    than a threshold, with where they came from
+    tasks           tasks alive on the loop
+    queues          depth of watched queues, now and at most
+    jobs            per kind of job, how long jobs waited to start and how
+                    long they ran, recorded by record_job() or by a
+                    WorkerPool given the monitor
+
+    Timing slow callbacks wraps every callback the loop runs, which costs
+    two clock reads each. It is left out if slow_callback is None. It
+    relies on the private asyncio.events.Handle._run of the pure Python
+    event loops, so it is skipped on other loops, such as uvloop, where
+    only the lag tells of a blocked loop. The wrapper is process wide, but
+    callbacks of loops without a monitor only pay a dict lookup. Only one
+    monitor at a time can time callbacks of any one loop.
+
+        monitor = LoopMonitor(trace="health.jsonl")
+        monitor.start()
+        monitor.watch_queue("requests", requests)
+        ...
+        print(monitor.snapshot())"""
+
+    def __init__(self, interval=0.1, slow_callback=0.05, trace=None,
+                 trace_every=10.0):
+        """Args:
+            interval (float): seconds between heartbeats
+            slow_callback (float): seconds a callback must hold the loop to
+                be recorded as slow, or None not to time callbacks
+            trace (string): optional path of a JSON lines file to append a
+                snapshot to every trace_every seconds
+            trace_every (float): seconds between snapshots in the trace"""
+        if interval <= 0:
+            raise ValueError("interval must be more than 0")
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self.trace = trace
+        self.trace_every = trace_every
+        self.lag = Histogram()
+        self.slow_callbacks = collections.deque(maxlen=SLOW_CALLBACKS_KEPT)
+        self.slow_count = 0
+        self.jobs = {}  # Name to (wait Histogram, run Histogram)
+        self._queues = {}  # Name to queue
+        self._depth_max = {}
+        self._loop = None
+        self._heartbeat = None
+        self.timing_callbacks = False
+        self._trace_file = None
+        self._started = None
+
+    def start(self):
+        """Start monitoring the running loop."""
+        if self._loop is not None:
+            return
+        loop = asyncio.get_running_loop()
+        if (self.slow_callback is not None and
+                isinstance(loop, asyncio.BaseEventLoop)):
+            _time_callbacks(loop, self)
+            self.timing_callbacks = True
+        self._loop = loop
+        self._started = time.time()
+        if self.trace is not None:
+            self._trace_file = open(self.trace, "a")
+        self._heartbeat = self._loop.create_task(self._beat())
+
+    def _record_slow(self, handle, elapsed):
+        self.slow_count += 1
+        callback = handle._callback
+        self.slow_callbacks.append({
+            "time": round(time.time(), 3),
+            "ms": round(elapsed * 1000, 3),
+            "source": _source(callback) if callback is not None
+            else repr(handle)})
+
+    async def _beat(self):
+        loop = self._loop
+        interval = self.interval
+        next_trace = loop.time() + self.trace_every
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            now = loop.time()
+            self.lag.record(max(0.0, now - start - interval))
+            for name, queue in self._queues.items():
+                depth = _depth(queue)
+                if depth > self._depth_max[name]:
+                    self._depth_max[name] = depth
+            if self._trace_file is not None and now >= next_trace:
+                next_trace = now + self.trace_every
+                self.write(self._trace_file)
+
+    def watch_queue(self, name, queue):
+        """Report the depth of a queue, anything with qsize() or len()."""
+        self._queues[name] = queue
+        self._depth_max[name] = _depth(queue)
+
+    def unwatch_queue(self, name):
+        self._queues.pop(name, None)
+        self._depth_max.pop(name, None)
+
+    def record_job(self, name, wait, run):
+        """Record that a job of kind 'name' waited 'wait' seconds to start
+        and then ran for 'run' seconds."""
+        histograms = self.jobs.get(name)
+        if histograms is None:
+            histograms = self.jobs[name] = (Histogram(), Histogram())
+        histograms[0].record(wait)
+        histograms[1].record(run)
+
+    def snapshot(self, reset=False):
+        """Return the health of the loop as a dict that converts to JSON.
+        All times are in milliseconds.
+
+        Args:
+            reset (bool): start the lag, slow callback, queue maximum and
+                job figures afresh afterwards, so every snapshot covers
+                only the time since the one before"""
+        snapshot = {
+            "time": round(time.time(), 3),
+            "since": self._started,
+            "lag": self.lag.to_dict(),
+            "slow_callbacks": {"timed": self.timing_callbacks,
+                               "count": self.slow_count,
+                               "recent": list(self.slow_callbacks)},
+            "tasks": len(asyncio.all_tasks(self._loop))
+            if self._loop is not None else 0,
+            "queues": {name: {"depth": _depth(queue),
+                              "max": max(self._depth_max[name],
+                                         _depth(queue))}
+                       for name, queue in self._queues.items()},
+            "jobs": {name: {"wait": wait.to_dict(), "run": run.to_dict()}
+                     for name, (wait, run) in self.jobs.items()}}
+        if reset:
+            self.lag = Histogram()
+            self.slow_callbacks.clear()
+            self.slow_count = 0
+            self.jobs = {}
+            self._depth_max = {name: _depth(queue)
+                               for name, queue in self._queues.items()}
+            self._started = snapshot["time"]
+        return snapshot
+
+    def write(self, file, reset=True):
+        """Append a snapshot to an open file as one line of JSON.
+
+        Args:
+            file: an open text file
+            reset (bool): as for snapshot()"""
+        file.write(json.dumps(self.snapshot(reset=reset)) + "\n")
+        file.flush()
+
+    async def stop(self):
+        """Stop monitoring, writing a last snapshot to the trace if any."""
+        if self._loop is None:
+            return
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        if self.timing_callbacks:
+            _untime_callbacks(self._loop)
+            self.timing_callbacks = False
+        if self._trace_file is not None:
+            self.write(self._trace_file)
+            self._trace_file.close()
+            self._trace_file = None
+        self._loop = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+
+def _depth(queue):
+    qsize = getattr(queue, "qsize", None)
+    return qsize() if qsize is not None else len(queue)
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
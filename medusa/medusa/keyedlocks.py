@@ -0,0 +1,144 @@
+#! /usr/bin/env python3
+
+import asyncio
+import sys
+import weakref
+
+
+class _Lock(asyncio.Lock):
+    # An asyncio.Lock counting the tasks waiting for it, which asyncio keeps
+    # to itself.
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = 0
+
+
+class _KeyLock:
+    # The async context manager for one use of one key's lock. Holding it
+    # holds the lock object alive, which is what keeps a lock in use from
+    # being evicted in per-key mode.
+
+    __slots__ = ("_locks", "_lock", "_stripe")
+
+    def __init__(self, locks, lock, stripe):
+        self._locks = locks
+        self._lock = lock
+        self._stripe = stripe
+
+    async def __aenter__(self):
+        lock = self._lock
+        locks = self._locks
+        stripe = self._stripe
+        # Just after a release the lock is free, but handed on to the next
+        # waiter, so one coming in then waits too.
+        if not lock.locked() and not lock.waiting:
+            await lock.acquire()
+            locks._acquired[stripe] += 1
+            return
+        clock = asyncio.get_running_loop().time
+        start = clock()
+        lock.waiting += 1
+        try:
+            await lock.acquire()
+        finally:
+            lock.waiting -= 1
+        # Only waits that got the lock are counted, not cancelled ones.
+        waited = clock() - start
+        locks._acquired[stripe] += 1
+        locks._contended[stripe] += 1
+        locks._waited[stripe] += waited
+        if waited > locks._max_wait[stripe]:
+            locks._max_wait[stripe] = waited
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._lock.release()
+
+
+class KeyedLocks:
+    """An asyncio lock per key, such as per deck, per player or per room,
+    so work on different keys goes ahead at once where a single lock, as
+    in the lock.py demo, would make everything take turns:
+
+        locks = KeyedLocks()
+        async with locks(room_id):
+            ...
+
+    By default each key gets a lock of its own, made when the key is first
+    locked and dropped, through a weak reference, as soon as nobody holds
+    or waits for it. Memory then grows with the keys in use at once, not
+    with every key ever locked.
+
+    In striped mode there is a fixed array of locks instead and each key
+    uses the one its hash picks, so memory is bounded whatever the keys,
+    at the price of unrelated keys sometimes waiting for each other. The
+    statistics per stripe show whether some stripes are hot. Locking two
+    keys that share a stripe at once deadlocks, as would locking one key
+    twice."""
+
+    def __init__(self, stripes=None):
+        """Args:
+            stripes (int): number of locks in striped mode, or None for a
+                lock per key"""
+        if stripes is not None and stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self.stripes = stripes
+        count = stripes or 1  # Per key mode keeps one set of statistics
+        self._acquired = [0] * count
+        self._contended = [0] * count
+        self._waited = [0.0] * count
+        self._max_wait = [0.0] * count
+        if stripes is None:
+            self._locks = weakref.WeakValueDictionary()
+        else:
+            self._stripes = [_Lock() for _ in range(stripes)]
+
+    def __len__(self):
+        """Return the number of lock objects alive."""
+        if self.stripes is None:
+            return len(self._locks)
+        return self.stripes
+
+    def __call__(self, key):
+        """Return an async context manager holding the lock for 'key'."""
+        if self.stripes is not None:
+            stripe = hash(key) % self.stripes
+            return _KeyLock(self, self._stripes[stripe], stripe)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = _Lock()
+        return _KeyLock(self, lock, 0)
+
+    def locked(self, key):
+        """Return True if the lock for 'key' is held."""
+        if self.stripes is not None:
+            return self._stripes[hash(key) % self.stripes].locked()
+        lock = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    def stats(self):
+        """Return contention statistics, one dict per stripe, or a single
+        one in per-key mode. Times are in milliseconds.
+
+        acquired     times the lock was taken
+        contended    times of those it was held or waited for already
+        wait_ms      total time spent waiting for it
+        max_wait_ms  longest single wait
+
+        Waits cancelled before getting the lock are left out of all of
+        them."""
+        return [{"stripe": stripe,
+                 "acquired": self._acquired[stripe],
+                 "contended": self._contended[stripe],
+                 "wait_ms": round(self._waited[stripe] * 1000, 3),
+                 "max_wait_ms": round(self._max_wait[stripe] * 1000, 3)}
+                for stripe in range(len(self._acquired))]
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
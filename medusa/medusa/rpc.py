@@ -0,0 +1,389 @@
+#! /usr/bin/env python3
+
+import asyncio
+import itertools
+import json
+import struct
+import sys
+
+# Every frame starts with this header: the length of the rest of the frame,
+# the request id and a kind byte. A request goes on with the length of the
+# method name, the name and its arguments, a response with its result or
+# error, both JSON encoded.
+#
+#   request   length | id | REQUEST | name length | name | [args...]
+#   response  length | id | OK or ERROR | result or error message
+HEADER = struct.Struct("!IIB")
+NAME_LENGTH = struct.Struct("!B")
+REQUEST, OK, ERROR = 0, 1, 2
+MAX_FRAME = 16 * 2 ** 20  # Larger frames mean a broken or hostile peer
+MAX_PIPELINE = 256  # Requests a connection may have in flight at once
+IDS = 2 ** 32
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+_decode = json.loads
+
+
+class RpcError(Exception):
+    """A request failed on the server, or could not be sent or answered."""
+
+
+def _frames(buffer):
+    # Split complete frames off the front of a bytearray, leaving any
+    # partial frame in it. Yields (id, kind, body) with body a copy.
+    offset = 0
+    size = len(buffer)
+    try:
+        while size - offset >= HEADER.size:
+            length, request_id, kind = HEADER.unpack_from(buffer, offset)
+            if length > MAX_FRAME:
+                raise RpcError(f"Frame of {length} bytes is too large")
+            if length < HEADER.size - 4:
+                raise RpcError(f"Frame of {length} bytes is too short")
+            end = offset + 4 + length
+            if end > size:
+                break
+            yield request_id, kind, buffer[offset + HEADER.size:end]
+            offset = end
+    finally:
+        del buffer[:offset]
+
+
+def _frame(request_id, kind, body):
+    return HEADER.pack(len(body) + HEADER.size - 4, request_id, kind) + body
+
+
+class _Corked:
+    # Frames written in one pass of the event loop go out together in one
+    # send, instead of one system call each, once the loop gets to _flush.
+
+    def _write(self, frame):
+        if not self._out:
+            self._loop.call_soon(self._flush)
+        self._out.append(frame)
+
+    def _flush(self):
+        out, self._out = self._out, []
+        if not self._transport.is_closing():
+            self._transport.write(b"".join(out))
+
+
+class _ServerProtocol(_Corked, asyncio.Protocol):
+    def __init__(self, server):
+        self._server = server
+        self._loop = server._loop
+        self._buffer = bytearray()
+        self._out = []
+        self._transport = None
+        self._tasks = set()
+        self._reading = True
+        self._writable = True
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._server._connections.add(self)
+
+    def connection_lost(self, exc):
+        self._server._connections.discard(self)
+        for task in self._tasks:
+            task.cancel()
+
+    def data_received(self, data):
+        self._buffer += data
+        try:
+            for request_id, kind, body in _frames(self._buffer):
+                if kind == REQUEST:
+                    self._dispatch(request_id, body)
+        except RpcError:
+            self._transport.abort()
+            return
+        self._throttle()
+
+    def _dispatch(self, request_id, body):
+        try:
+            size = body[0]
+            name = str(body[1:1 + size], "utf-8")
+            args = _decode(body[1 + size:])
+            handler = self._server._handlers[name]
+        except KeyError:
+            self._respond(request_id, ERROR, f"No method {name!r}")
+            return
+        except (ValueError, IndexError) as e:
+            self._respond(request_id, ERROR, f"Bad request: {e}")
+            return
+        task = self._loop.create_task(self._call(request_id, handler, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    async def _call(self, request_id, handler, args):
+        try:
+            result = await handler(*args)
+        except Exception as e:
+            self._respond(request_id, ERROR, f"{type(e).__name__}: {e}")
+        else:
+            self._respond(request_id, OK, result)
+
+    def _respond(self, request_id, kind, value):
+        if self._transport.is_closing():
+            return
+        try:
+            body = _encode(value).encode()
+        except (TypeError, ValueError) as e:
+            kind, body = ERROR, _encode(f"Bad result: {e}").encode()
+        self._write(_frame(request_id, kind, body))
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        self._throttle()
+
+    def _throttle(self):
+        # Stop reading requests while too many are in flight or the client
+        # is not reading its responses.
+        reading = (len(self._tasks) < self._server.max_pipeline
+                   and self._writable)
+        if reading != self._reading and not self._transport.is_closing():
+            self._reading = reading
+            if reading:
+                self._transport.resume_reading()
+            else:
+                self._transport.pause_reading()
+
+    def pause_writing(self):
+        self._writable = False
+        self._throttle()
+
+    def resume_writing(self):
+        self._writable = True
+        self._throttle()
+
+
+class RpcServer:
+    """Serves coroutine handlers to RpcClients over TCP or a Unix socket.
+
+    Requests and responses are length-prefixed binary frames carrying JSON,
+    so arguments and results are what JSON can encode. A client may send
+    requests without waiting for the answers to earlier ones. Each request
+    runs as a task of its own and is answered as soon as it is done, in
+    whatever order that is, up to max_pipeline requests per connection,
+    after which the server stops reading from that connection.
+
+        server = RpcServer()
+
+        @server.handler("add")
+        async def add(a, b):
+            return a + b
+
+        async with server:
+            await server.start_unix("/tmp/medusa.sock")
+            await server.serve_forever()"""
+
+    def __init__(self, max_pipeline=MAX_PIPELINE):
+        """Args:
+            max_pipeline (int): requests in flight per connection at most"""
+        if max_pipeline < 1:
+            raise ValueError("max_pipeline must be at least 1")
+        self.max_pipeline = max_pipeline
+        self._handlers = {}
+        self._servers = []
+        self._connections = set()
+        self._loop = None
+
+    def register(self, name, handler):
+        """Serve a coroutine function under a method name."""
+        if len(name.encode()) > 255:
+            raise ValueError("Method names are 255 bytes at most")
+        self._handlers[name] = handler
+
+    def handler(self, name=None):
+        """Decorator to register() a coroutine function, under its own name
+        unless given one."""
+        def register(handler):
+            self.register(name or handler.__name__, handler)
+            return handler
+        return register
+
+    def _protocol(self):
+        return _ServerProtocol(self)
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        """Listen on a TCP port, by default any free one on loopback.
+
+        Returns: The (host, port) listened on."""
+        self._loop = asyncio.get_running_loop()
+        server = await self._loop.create_server(self._protocol, host, port)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path):
+        """Listen on a Unix socket."""
+        self._loop = asyncio.get_running_loop()
+        server = await self._loop.create_unix_server(self._protocol, path)
+        self._servers.append(server)
+
+    async def serve_forever(self):
+        await asyncio.gather(*[server.serve_forever()
+                               for server in self._servers])
+
+    async def close(self):
+        """Stop listening and close every connection."""
+        for server in self._servers:
+            server.close()
+        for connection in list(self._connections):
+            connection._transport.close()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class _ClientProtocol(_Corked, asyncio.Protocol):
+    def __init__(self, loop):
+        self._loop = loop
+        self._buffer = bytearray()
+        self._out = []
+        self._transport = None
+        self._pending = {}  # Request id to future
+        self._ids = itertools.count()
+        self._writable = None  # A future while the server is not reading
+        self.closed = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def connection_lost(self, exc):
+        self.closed = True
+        error = RpcError(f"Connection lost: {exc or 'closed'}")
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        if self._writable is not None and not self._writable.done():
+            self._writable.set_result(None)
+
+    def data_received(self, data):
+        self._buffer += data
+        pending = self._pending
+        try:
+            for request_id, kind, body in _frames(self._buffer):
+                future = pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue  # Its caller gave up on it
+                value = _decode(body)
+                if kind == OK:
+                    future.set_result(value)
+                else:
+                    future.set_exception(RpcError(value))
+        except (RpcError, ValueError):
+            self._transport.abort()
+
+    def pause_writing(self):
+        self._writable = self._loop.create_future()
+
+    def resume_writing(self):
+        if self._writable is not None and not self._writable.done():
+            self._writable.set_result(None)
+        self._writable = None
+
+    def request(self, name, args):
+        request_id = next(self._ids) % IDS
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        name = name.encode()
+        self._write(_frame(request_id, REQUEST,
+                           NAME_LENGTH.pack(len(name)) + name +
+                           _encode(args).encode()))
+        return future
+
+
+class RpcClient:
+    """A pool of connections to an RpcServer, each of them pipelining
+    requests. A call goes out on the connection with the fewest answers
+    outstanding, without waiting for earlier calls to be answered, so many
+    concurrent callers share a few connections.
+
+        async with RpcClient(path="/tmp/medusa.sock") as client:
+            print(await client.call("add", 1, 2))"""
+
+    def __init__(self, host="127.0.0.1", port=None, path=None,
+                 connections=4):
+        """Args:
+            host (string): host of a TCP server
+            port (int): port of a TCP server
+            path (string): path of a Unix socket server, instead of TCP
+            connections (int): connections in the pool"""
+        if port is None and path is None:
+            raise ValueError("Either a port or a path is needed")
+        if connections < 1:
+            raise ValueError("connections must be at least 1")
+        self.host = host
+        self.port = port
+        self.path = path
+        self.connections = connections
+        self._pool = []
+        self._loop = None
+
+    async def _connect(self):
+        if self.path is not None:
+            _, protocol = await self._loop.create_unix_connection(
+                lambda: _ClientProtocol(self._loop), self.path)
+        else:
+            _, protocol = await self._loop.create_connection(
+                lambda: _ClientProtocol(self._loop), self.host, self.port)
+        return protocol
+
+    async def connect(self):
+        """Open the pool's connections. Called by call() if need be."""
+        self._loop = asyncio.get_running_loop()
+        self._pool = list(await asyncio.gather(*[
+            self._connect() for _ in range(self.connections)]))
+
+    async def call(self, name, *args):
+        """Call a method on the server.
+
+        Returns: What the handler returned.
+
+        Raises RpcError if the handler raised, or if the connection was
+        lost before the answer came."""
+        if not self._pool:
+            await self.connect()
+        connection = min(self._pool, key=len)
+        if connection.closed:
+            connection = await self._replace(connection)
+        if connection._writable is not None:
+            await connection._writable  # The server is not keeping up
+        return await connection.request(name, args)
+
+    async def _replace(self, connection):
+        fresh = await self._connect()
+        if connection in self._pool:
+            self._pool[self._pool.index(connection)] = fresh
+        return fresh
+
+    async def close(self):
+        for connection in self._pool:
+            connection._transport.close()
+        self._pool = []
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
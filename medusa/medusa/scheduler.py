@@ -0,0 +1,199 @@
+#! /usr/bin/env python3
+
+import collections
+import heapq
+import itertools
+import sys
+import time
+
+
+class _Receive:
+    def __repr__(self):
+        return "RECEIVE"
+
+
+RECEIVE = _Receive()  # Yielded by an agent to wait for its next message
+
+
+class Scheduler:
+    """Round-robin scheduler for generators, the duet.py demo grown into
+    something that runs millions of cheap agents, each costing a generator
+    and a few bytes of bookkeeping rather than an asyncio task.
+
+    An agent is a generator, and what it yields says what it waits for:
+
+    yield               let the others run, then carry on
+    yield 0.5           sleep for that many seconds
+    msg = yield RECEIVE wait for the next message sent to it
+
+    Messages are sent with send(pid, message) and reach the agent through
+    generator.send(). They queue up in a mailbox while the agent is busy.
+
+    Ready agents wait in a deque, so switching between them is O(1), and
+    sleeping agents in a heap ordered by wake-up time. By default time is
+    simulated: when every agent is asleep the clock jumps to the next
+    wake-up, so simulations run as fast as they can be computed.
+
+        def echo(scheduler):
+            while True:
+                sender, message = yield RECEIVE
+                scheduler.send(sender, message)
+
+        scheduler = Scheduler()
+        echo_pid = scheduler.spawn(echo(scheduler))
+        scheduler.run()"""
+
+    def __init__(self, realtime=False):
+        """Args:
+            realtime (bool): sleep for real instead of simulating time"""
+        self.realtime = realtime
+        self.now = 0.0  # Seconds since the start, simulated or not
+        self.switches = 0  # Times an agent was resumed
+        self._ready = collections.deque()  # (pid, generator, value)
+        self._timers = []  # Heap of (wake-up time, sequence, pid, generator)
+        self._agents = {}  # Live agents, pid to generator
+        self._receiving = {}  # Agents waiting for a message
+        self._mailboxes = {}  # Messages waiting for busy agents
+        self._pids = itertools.count(1)
+        self._sequence = itertools.count()  # Keeps equal times in order
+        self._started = None
+
+    def __len__(self):
+        """Return the number of live agents."""
+        return len(self._agents)
+
+    def spawn(self, generator):
+        """Add an agent, to start on the next turn of the run queue.
+
+        Returns: The agent's pid, to send messages to."""
+        pid = next(self._pids)
+        self._agents[pid] = generator
+        self._ready.append((pid, generator, None))
+        return pid
+
+    def send(self, pid, message):
+        """Send a message to an agent. Messages to agents that have
+        finished are dropped.
+
+        Returns: True if the agent is still alive."""
+        generator = self._receiving.pop(pid, None)
+        if generator is not None:
+            self._ready.append((pid, generator, message))
+            return True
+        if pid not in self._agents:
+            return False
+        mailbox = self._mailboxes.get(pid)
+        if mailbox is None:
+            mailbox = self._mailboxes[pid] = collections.deque()
+        mailbox.append(message)
+        return True
+
+    def kill(self, pid):
+        """Stop an agent, closing its generator. Does nothing if it has
+        already finished. Must not be called by the agent itself."""
+        generator = self._agents.pop(pid, None)
+        if generator is None:
+            return
+        self._receiving.pop(pid, None)
+        self._mailboxes.pop(pid, None)
+        generator.close()
+        # It may still be in the run queue or the timers, where it is
+        # skipped when its turn comes since it is no longer live.
+
+    def _exit(self, pid):
+        del self._agents[pid]
+        self._mailboxes.pop(pid, None)
+
+    def run(self, until=None):
+        """Run agents until none are left, or all of them wait for messages
+        that nobody is left to send, or the next wake-up is after 'until'.
+        Agents that never sleep keep the clock where it is.
+
+        An exception raised by an agent ends that agent and is raised from
+        run(), which can be called again to carry on with the others. So
+        does yielding anything it should not, which raises TypeError, or a
+        negative sleep, which raises ValueError rather than turn the clock
+        back.
+
+        Args:
+            until (float): the time to stop at, in seconds since the start
+
+        Returns: The number of live agents left."""
+        ready = self._ready
+        popleft = ready.popleft
+        append = ready.append
+        timers = self._timers
+        agents = self._agents
+        mailboxes = self._mailboxes
+        receiving = self._receiving
+        push = heapq.heappush
+        sequence = self._sequence
+        if self.realtime and self._started is None:
+            self._started = time.monotonic() - self.now
+        switches = 0
+        try:
+            while True:
+                while ready:
+                    pid, generator, value = popleft()
+                    if agents.get(pid) is not generator:
+                        continue  # Killed while it waited
+                    switches += 1
+                    try:
+                        request = generator.send(value)
+                    except StopIteration:
+                        self._exit(pid)
+                        continue
+                    except BaseException:
+                        self._exit(pid)
+                        raise
+                    if request is None:
+                        append((pid, generator, None))
+                    elif request is RECEIVE:
+                        mailbox = mailboxes.get(pid)
+                        if mailbox:
+                            append((pid, generator, mailbox.popleft()))
+                        else:
+                            receiving[pid] = generator
+                    else:
+                        try:
+                            wake = self.now + request
+                        except TypeError:
+                            self._exit(pid)
+                            generator.close()
+                            raise TypeError(
+                                f"Agent {pid} yielded {request!r}, not None, "
+                                f"a number of seconds or RECEIVE") from None
+                        if not request >= 0:  # Also catches NaN
+                            self._exit(pid)
+                            generator.close()
+                            raise ValueError(
+                                f"Agent {pid} yielded {request!r}, a sleep "
+                                f"cannot be negative")
+                        push(timers, (wake, next(sequence), pid, generator))
+
+                if not timers:
+                    break
+                wake = timers[0][0]
+                if until is not None and wake > until:
+                    self.now = max(self.now, until)
+                    break
+                if self.realtime:
+                    delay = self._started + wake - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.now = wake
+                while timers and timers[0][0] <= wake:
+                    _, _, pid, generator = heapq.heappop(timers)
+                    append((pid, generator, None))
+        finally:
+            self.switches += switches
+        return len(agents)
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
@@ -0,0 +1,238 @@
+#! /usr/bin/env python3
+
+import asyncio
+import math
+import sys
+
+
+class Timer:
+    """A callback scheduled on a TimerWheel. Made by TimerWheel.call_later()
+    and call_at()."""
+
+    __slots__ = ("tick", "callback", "args", "_slot", "_wheel")
+
+    def __init__(self, wheel, tick, callback, args):
+        self.tick = tick  # The wheel tick it is due at
+        self.callback = callback
+        self.args = args
+        self._slot = None  # The slot it is in, None once fired or cancelled
+        self._wheel = wheel
+
+    def when(self):
+        """Return the loop time the timer is due at, to the wheel's
+        resolution."""
+        return self._wheel._origin + self.tick * self._wheel.resolution
+
+    def cancel(self):
+        """Cancel the timer, if it has not fired yet. O(1)."""
+        slot = self._slot
+        if slot is not None:
+            del slot[self]
+            self._slot = None
+            self._wheel._count -= 1
+
+    def cancelled(self):
+        return self._slot is None
+
+
+class TimerWheel:
+    """Many timers for the price of one: a hierarchical timing wheel that
+    runs its timers from a single event loop callback per tick, instead of
+    pushing each one on the event loop's heap as call_later() does.
+
+    Time is cut into ticks of 'resolution' seconds. Timers due within the
+    next 'slots' ticks sit in the slot of the first wheel for their tick.
+    Later timers sit in coarser wheels, each of whose slots covers a whole
+    turn of the wheel below, and move down a wheel whenever the wheel below
+    comes round to them. Scheduling and cancelling are O(1), and cancelled
+    timers take no room at all once cancelled.
+
+    A timer fires on the first tick at or after its time, so up to one
+    resolution late, and never early. The wheel only wakes the loop for
+    ticks that have timers due, or to move timers down a wheel.
+
+        wheel = TimerWheel(resolution=0.01)
+        timeout = wheel.call_later(5.0, connection.close)
+        ...
+        timeout.cancel()  # It answered in time"""
+
+    def __init__(self, resolution=0.01, slots=256, levels=4):
+        """Args:
+            resolution (float): seconds per tick
+            slots (int): slots per wheel
+            levels (int): number of wheels. Together they cover
+                slots ** levels ticks, and timers further out than that are
+                moved up as they come closer."""
+        if resolution <= 0:
+            raise ValueError("resolution must be more than 0")
+        if slots < 2 or levels < 1:
+            raise ValueError("slots must be at least 2 and levels at least 1")
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._count = 0
+        self._tick = 0  # The last tick run
+        self._loop = None
+        self._origin = None  # Loop time of tick 0
+        self._handle = None  # The loop callback for the next tick
+        self._wake_tick = None
+        self._running = False  # In _run(), catching up tick by tick
+
+    def __len__(self):
+        """Return the number of timers waiting to fire."""
+        return self._count
+
+    def _now_tick(self):
+        return int((self._loop.time() - self._origin) / self.resolution)
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        self._origin = self._loop.time()
+
+    def call_later(self, delay, callback, *args):
+        """Call callback(*args) after 'delay' seconds.
+
+        Returns: A Timer, to cancel() with."""
+        if self._loop is None:
+            self._start()
+        return self._add(self._loop.time() + delay, callback, args)
+
+    def call_at(self, when, callback, *args):
+        """Call callback(*args) at loop time 'when'.
+
+        Returns: A Timer, to cancel() with."""
+        if self._loop is None:
+            self._start()
+        return self._add(when, callback, args)
+
+    def _add(self, when, callback, args):
+        if not self._count and not self._running:
+            # Idle until now, so there are no ticks to catch up with. While
+            # _run() catches up, ticks up to now may still have timers to
+            # move down a wheel, so the tick must not jump ahead then.
+            self._tick = max(self._tick, self._now_tick())
+        tick = math.ceil((when - self._origin) / self.resolution)
+        if tick <= self._tick:
+            tick = self._tick + 1
+        timer = Timer(self, tick, callback, args)
+        if tick - self._tick < self.slots:  # The usual case, due soon
+            slot = self._wheels[0][tick % self.slots]
+            slot[timer] = None
+            timer._slot = slot
+        else:
+            self._place(timer)
+        self._count += 1
+        if self._wake_tick is None or tick < self._wake_tick:
+            self._schedule()
+        return timer
+
+    def _place(self, timer):
+        delta = timer.tick - self._tick
+        spans = self._spans
+        for level in range(self.levels):
+            if delta < spans[level + 1]:
+                tick = timer.tick
+                break
+        else:
+            # Beyond every wheel: park it in the furthest slot for now, it
+            # is placed again when that slot comes round.
+            tick = self._tick + spans[self.levels] - 1
+        slot = self._wheels[level][tick // spans[level] % self.slots]
+        slot[timer] = None
+        timer._slot = slot
+
+    def _next_tick(self):
+        # The next tick with timers due, or at which timers move down from
+        # the wheels above, whichever comes first.
+        slots = self.slots
+        wheel = self._wheels[0]
+        boundary = (self._tick // slots + 1) * slots
+        for tick in range(self._tick + 1, boundary):
+            if wheel[tick % slots]:
+                return tick
+        return boundary
+
+    def _schedule(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._count:
+            self._wake_tick = None
+            return
+        self._wake_tick = self._next_tick()
+        self._handle = self._loop.call_at(
+            self._origin + self._wake_tick * self.resolution, self._run)
+
+    def _run(self):
+        self._handle = None
+        now = self._now_tick()
+        self._running = True
+        try:
+            while self._count and self._tick < now:
+                tick = self._next_tick()
+                if tick > now:
+                    self._tick = now  # Nothing due up to now
+                    break
+                self._tick = tick
+                self._cascade(tick)
+                self._fire(self._wheels[0][tick % self.slots])
+        finally:
+            self._running = False
+        self._schedule()
+
+    def _cascade(self, tick):
+        # Move timers down from every wheel that has come round to a new
+        # slot on this tick, the highest first so they can keep falling.
+        spans = self._spans
+        for level in range(self.levels - 1, 0, -1):
+            if tick % spans[level] == 0:
+                wheel = self._wheels[level]
+                index = tick // spans[level] % self.slots
+                slot = wheel[index]
+                if slot:
+                    wheel[index] = {}
+                    for timer in slot:
+                        self._place(timer)
+
+    def _fire(self, slot):
+        if not slot:
+            return
+        self._wheels[0][self._tick % self.slots] = {}
+        for timer in list(slot):  # Callbacks may cancel timers in it
+            if timer._slot is not slot:
+                continue  # Cancelled by an earlier callback
+            if timer.tick > self._tick:
+                self._place(timer)  # Parked here from beyond every wheel
+                continue
+            timer._slot = None
+            self._count -= 1
+            try:
+                timer.callback(*timer.args)
+            except (SystemExit, KeyboardInterrupt):
+                raise
+            except BaseException as e:
+                self._loop.call_exception_handler({
+                    "message": f"Exception in TimerWheel callback "
+                               f"{timer.callback!r}",
+                    "exception": e})
+
+    def close(self):
+        """Cancel every timer."""
+        for wheel in self._wheels:
+            for index, slot in enumerate(wheel):
+                for timer in slot:
+                    timer._slot = None
+                wheel[index] = {}
+        self._count = 0
+        self._schedule()
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
@@ -0,0 +1,246 @@
+#! /usr/bin/env python3
+
+import asyncio
+import collections
+import inspect
+import sys
+import time
+import types
+
+
+class WorkerPool:
+    """A fixed number of consumer tasks working through a bounded queue of
+    jobs, as in the queue.py demo, packaged for reuse.
+
+    A job is any callable with its arguments. Plain functions are called
+    directly by a consumer and coroutine functions are awaited by it, so no
+    task is ever created per job and small jobs cost little more than a
+    deque append and pop. Each job gets a future for its result. A job that
+    raises only fails its own future, never the consumer running it.
+
+    Producers that submit faster than the consumers keep up are held back
+    by submit() once maxsize jobs are waiting.
+
+        async with WorkerPool(workers=8) as pool:
+            futures = [await pool.submit(work, i) for i in range(1000)]
+            results = await asyncio.gather(*futures)
+
+    Leaving the async with block drains the pool, or cancels whatever is
+    left if the block raised."""
+
+    def __init__(self, workers=4, maxsize=1024, batch=64, monitor=None,
+                 name="jobs"):
+        """Args:
+            workers (int): number of consumer tasks
+            maxsize (int): the most jobs waiting in the queue at once
+            batch (int): the most jobs a consumer runs back to back before
+                letting other tasks run. Only plain function jobs run back
+                to back, coroutine jobs let others run whenever they wait.
+            monitor (LoopMonitor): optional monitor to report the queue
+                depth and how long each job waited and ran to
+            name (string): the name jobs and the queue are reported under"""
+        if workers < 1 or maxsize < 1 or batch < 1:
+            raise ValueError("workers, maxsize and batch must be at least 1")
+        self.workers = workers
+        self.maxsize = maxsize
+        self.batch = batch
+        self.monitor = monitor
+        self.name = name
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._loop = None
+        self._jobs = collections.deque()
+        self._unfinished = 0
+        self._getters = collections.deque()  # Futures of idle consumers
+        self._putters = collections.deque()  # Futures of blocked producers
+        self._drainers = []
+        self._tasks = []
+        self._closing = False
+        self._cancelling = False
+        if monitor is not None:
+            monitor.watch_queue(name, self)
+
+    def __len__(self):
+        """Return the number of jobs waiting to be run."""
+        return len(self._jobs)
+
+    def _start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._tasks = [self._loop.create_task(self._consume())
+                           for _ in range(self.workers)]
+
+    @staticmethod
+    def _wake(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _enqueue(self, fn, args, kwargs):
+        future = self._loop.create_future()
+        queued = time.perf_counter() if self.monitor is not None else 0.0
+        self._jobs.append((future, fn, args, kwargs, queued))
+        self._unfinished += 1
+        self.submitted += 1
+        if self._getters:
+            self._wake(self._getters)
+        return future
+
+    def submit_nowait(self, fn, *args, **kwargs):
+        """Queue a job without waiting.
+
+        Returns: A future for the result of fn(*args, **kwargs).
+
+        Raises asyncio.QueueFull if maxsize jobs are already waiting, and
+        RuntimeError once the pool is closing."""
+        if self._closing:
+            raise RuntimeError("WorkerPool is closed")
+        if self._loop is None:
+            self._start()
+        if len(self._jobs) >= self.maxsize:
+            raise asyncio.QueueFull
+        return self._enqueue(fn, args, kwargs)
+
+    async def submit(self, fn, *args, **kwargs):
+        """Queue a job, first waiting for room if maxsize jobs are already
+        waiting.
+
+        Returns: A future for the result of fn(*args, **kwargs).
+
+        Raises RuntimeError once the pool is closing."""
+        self._start()
+        while len(self._jobs) >= self.maxsize and not self._closing:
+            waiter = self._loop.create_future()
+            self._putters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass the wake-up on, it may have been meant for this one.
+                if waiter.done() and not waiter.cancelled():
+                    self._wake(self._putters)
+                raise
+        if self._closing:
+            raise RuntimeError("WorkerPool is closed")
+        return self._enqueue(fn, args, kwargs)
+
+    def _finish(self):
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            for drainer in self._drainers:
+                if not drainer.done():
+                    drainer.set_result(None)
+            self._drainers = []
+
+    async def _consume(self):
+        # The loop every job goes through, kept lean: no call that is not
+        # needed, such as waking producers when none wait, and cheap tests
+        # first.
+        jobs = self._jobs
+        putters = self._putters
+        monitor = self.monitor
+        batch = self.batch
+        clock = time.perf_counter
+        while True:
+            if not jobs:
+                if self._closing:
+                    return
+                waiter = self._loop.create_future()
+                self._getters.append(waiter)
+                await waiter
+                continue
+
+            ran = 0
+            while jobs and ran < batch:
+                future, fn, args, kwargs, queued = jobs.popleft()
+                if putters:
+                    self._wake(putters)
+                ran += 1
+                if future.done():  # Cancelled while it waited
+                    self._finish()
+                    continue
+                if monitor is not None:
+                    started = clock()
+                try:
+                    result = fn(*args, **kwargs)
+                    # inspect.isawaitable() alone costs as much as a small
+                    # job, so only results that might be awaitable get it.
+                    if hasattr(result, "__await__") or (
+                            type(result) is types.GeneratorType and
+                            inspect.isawaitable(result)):
+                        result = await result
+                except asyncio.CancelledError:
+                    if not future.done():
+                        future.cancel()
+                    self._finish()
+                    if self._cancelling:
+                        raise
+                    continue  # The job cancelled itself, not the consumer
+                except Exception as e:
+                    self.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.completed += 1
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    if monitor is not None:
+                        monitor.record_job(self.name, started - queued,
+                                           clock() - started)
+                if self._unfinished > 1:
+                    self._unfinished -= 1
+                else:
+                    self._finish()
+            await asyncio.sleep(0)
+
+    async def drain(self):
+        """Wait until every job submitted so far has finished."""
+        if self._unfinished:
+            drainer = self._loop.create_future()
+            self._drainers.append(drainer)
+            await drainer
+
+    async def close(self, cancel=False):
+        """Stop taking jobs and stop the consumers.
+
+        Args:
+            cancel (bool): if False, finish every queued job first. If
+                True, cancel the futures of queued jobs and the consumers,
+                including any jobs they are running."""
+        self._closing = True
+        while self._putters:
+            self._wake(self._putters)  # They raise RuntimeError
+        if self._loop is None:
+            return
+        if cancel:
+            while self._jobs:
+                future = self._jobs.popleft()[0]
+                future.cancel()
+                self._finish()
+            self._cancelling = True
+            for task in self._tasks:
+                task.cancel()
+        else:
+            await self.drain()
+        while self._getters:
+            self._wake(self._getters)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        self._start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close(cancel=exc_type is not None)
+
+
+if __name__ == '__main__':
+    sys.exit(f"This file [{__file__}] is meant to be imported, "
+             "not executed directly.")
+
+
+##
+#
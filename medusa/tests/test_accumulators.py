@@ -0,0 +1,127 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.ShardedCounters, ShardedSums and ShardedHistogram, in
+# threads and in worker processes started by fork and by spawn. The medusa
+# package is found through the parent directory, as in test_rpc.py.
+import multiprocessing
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+UPDATES = 1000  # Per worker
+
+
+def work(counters, sums, histogram, worker):
+    # Module level, so spawned processes can find it.
+    mine = counters.shard(worker)
+    added = sums.shard(worker)
+    recorded = histogram.shard(worker)
+    for i in range(UPDATES):
+        mine[i % counters.size] += 1
+        added[0] += 0.5
+        recorded.record(i / UPDATES)
+
+
+class TestSharded(unittest.TestCase):
+    def check(self, counters, sums, histogram, workers):
+        self.assertEqual(counters.total(), workers * UPDATES)
+        self.assertEqual(counters.values(),
+                         [workers * UPDATES // counters.size] *
+                         counters.size)
+        self.assertEqual(sums.value(0), workers * UPDATES * 0.5)
+        self.assertEqual(histogram.count(), workers * UPDATES)
+        # Bounds are inclusive: 0.0 to 0.1 is 101 values of i / UPDATES.
+        self.assertEqual(histogram.counts(),
+                         [workers * 101, workers * 400, workers * 400,
+                          workers * 99])
+
+    def make(self, workers, shared):
+        return (medusa.ShardedCounters(4, shards=workers, shared=shared),
+                medusa.ShardedSums(1, shards=workers, shared=shared),
+                medusa.ShardedHistogram((0.1, 0.5, 0.9), shards=workers,
+                                        shared=shared))
+
+    def test_threads(self):
+        counters, sums, histogram = self.make(4, False)
+        threads = [threading.Thread(target=work,
+                                    args=(counters, sums, histogram, n))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.check(counters, sums, histogram, 4)
+
+    def processes(self, method):
+        if method not in multiprocessing.get_all_start_methods():
+            self.skipTest(f"No {method} start method here")
+        context = multiprocessing.get_context(method)
+        counters, sums, histogram = self.make(2, True)
+        processes = [context.Process(target=work,
+                                     args=(counters, sums, histogram, n))
+                     for n in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        self.check(counters, sums, histogram, 2)
+
+    def test_fork(self):
+        self.processes("fork")
+
+    def test_spawn(self):
+        self.processes("spawn")
+
+    def test_shards_are_separate(self):
+        counters = medusa.ShardedCounters(2, shards=3)
+        counters.shard(0)[1] += 1
+        counters.shard(2)[1] += 2
+        self.assertEqual(list(counters.shard(1)), [0, 0])
+        self.assertEqual(counters.value(1), 3)
+        self.assertEqual(counters.values(), [0, 3])
+
+    def test_bounds(self):
+        counters = medusa.ShardedCounters(2, shards=2)
+        for index in (2, 5, -1):
+            with self.assertRaises(IndexError):
+                counters.value(index)
+        for worker in (2, -1):
+            with self.assertRaises(IndexError):
+                counters.shard(worker)
+        with self.assertRaises(ValueError):
+            medusa.ShardedCounters(0)
+
+    def test_reset(self):
+        counters, sums, histogram = self.make(1, False)
+        work(counters, sums, histogram, 0)
+        counters.reset()
+        sums.reset()
+        histogram.reset()
+        self.assertEqual(counters.total(), 0)
+        self.assertEqual(sums.total(), 0.0)
+        self.assertEqual(histogram.count(), 0)
+        self.assertIsNone(histogram.percentile(50))
+
+    def test_percentile(self):
+        histogram = medusa.ShardedHistogram((1, 2, 3))
+        recorded = histogram.shard(0)
+        for value in (0.5, 1.5, 1.5, 2.5, 10):
+            recorded.record(value)
+        self.assertEqual(histogram.percentile(50), 2)
+        self.assertEqual(histogram.percentile(100), float("inf"))
+        self.assertEqual(histogram.total(), 16.0)
+        with self.assertRaises(ValueError):
+            medusa.ShardedHistogram((2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
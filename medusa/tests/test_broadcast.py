@@ -0,0 +1,120 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.Broadcast and its overflow policies. The medusa package is
+# found through the parent directory, as in test_rpc.py.
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+from medusa.broadcast import BLOCK, DROP_NEWEST, DROP_OLDEST  # noqa: E402
+
+
+def drain(subscription):
+    messages = []
+    while len(subscription):
+        messages.append(subscription.get_nowait())
+    return messages
+
+
+class TestBroadcast(unittest.TestCase):
+    def test_every_subscriber_gets_every_message(self):
+        async def main():
+            broadcast = medusa.Broadcast()
+            early = broadcast.subscribe()
+            await broadcast.publish(1)
+            late = broadcast.subscribe()  # Only sees what comes after
+            delivered = await broadcast.publish(2)
+            return delivered, drain(early), drain(late)
+
+        self.assertEqual(asyncio.run(main()), (2, [1, 2], [2]))
+
+    def test_drop_oldest(self):
+        async def main():
+            broadcast = medusa.Broadcast(maxsize=3, overflow=DROP_OLDEST)
+            subscription = broadcast.subscribe()
+            for i in range(5):
+                broadcast.publish_nowait(i)
+            return drain(subscription), subscription.dropped
+
+        self.assertEqual(asyncio.run(main()), ([2, 3, 4], 2))
+
+    def test_drop_newest(self):
+        async def main():
+            broadcast = medusa.Broadcast(maxsize=3, overflow=DROP_NEWEST)
+            subscription = broadcast.subscribe()
+            delivered = [broadcast.publish_nowait(i) for i in range(5)]
+            return delivered, drain(subscription), subscription.dropped
+
+        self.assertEqual(asyncio.run(main()),
+                         ([1, 1, 1, 0, 0], [0, 1, 2], 2))
+
+    def test_block(self):
+        async def main():
+            broadcast = medusa.Broadcast(maxsize=2)
+            slow = broadcast.subscribe(overflow=BLOCK)
+            fast = broadcast.subscribe(maxsize=10)
+            await broadcast.publish(0)
+            await broadcast.publish(1)
+            with self.assertRaises(asyncio.QueueFull):
+                broadcast.publish_nowait(2)  # Delivered to no one
+            publishing = asyncio.create_task(broadcast.publish(2))
+            await asyncio.sleep(0.01)
+            held_back = not publishing.done() and len(fast) == 2
+            first = await slow.get()  # Makes room
+            await asyncio.wait_for(publishing, 1)
+            return held_back, first, drain(slow), drain(fast), slow.dropped
+
+        self.assertEqual(asyncio.run(main()),
+                         (True, 0, [1, 2], [0, 1, 2], 0))
+
+    def test_close_ends_iteration_after_buffered(self):
+        async def main():
+            broadcast = medusa.Broadcast()
+            subscription = broadcast.subscribe()
+            received = []
+
+            async def read():
+                async for message in subscription:
+                    received.append(message)
+
+            reader = asyncio.create_task(read())
+            await broadcast.publish("a")
+            await broadcast.publish("b")
+            broadcast.close()
+            await asyncio.wait_for(reader, 1)
+            with self.assertRaises(RuntimeError):
+                broadcast.subscribe()
+            with self.assertRaises(RuntimeError):
+                broadcast.publish_nowait("c")
+            return received, len(broadcast)
+
+        self.assertEqual(asyncio.run(main()), (["a", "b"], 0))
+
+    def test_closed_block_subscriber_unblocks_publisher(self):
+        async def main():
+            broadcast = medusa.Broadcast(maxsize=1, overflow=BLOCK)
+            subscription = broadcast.subscribe()
+            await broadcast.publish(0)
+            publishing = asyncio.create_task(broadcast.publish(1))
+            await asyncio.sleep(0)
+            subscription.close()
+            return await asyncio.wait_for(publishing, 1)
+
+        self.assertEqual(asyncio.run(main()), 0)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            medusa.Broadcast(maxsize=0)
+        with self.assertRaises(ValueError):
+            medusa.Broadcast(overflow="sometimes")
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.HybridExecutor. The medusa package is found through the
+# parent directory, as in test_rpc.py. Jobs are module level functions so
+# worker processes can unpickle them.
+#
+# Process pools import the standard library queue module, so these must not
+# run with the demos' directory first on the path, as "python -m pytest"
+# run from there would put it. Run them from the repository root instead.
+import asyncio
+import concurrent.futures
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+
+class TwoArgumentError(Exception):
+    # Pickles, but does not unpickle: unpickling calls it with one argument.
+    def __init__(self, a, b):
+        super().__init__(f"{a} {b}")
+
+
+def square(i):
+    return i * i
+
+
+def fail(i):
+    if i == 3:
+        raise ValueError(i)
+    if i == 4:
+        raise TwoArgumentError(i, "no")
+    if i == 5:
+        return threading.Lock()  # Does not pickle
+    return i * i
+
+
+def die():
+    os._exit(1)
+
+
+class TestHybridExecutor(unittest.TestCase):
+    def test_cost_classes(self):
+        async def main():
+            async with medusa.HybridExecutor(processes=1, warm=False) as ex:
+                inline = await ex.submit(square, 2, cost=medusa.INLINE)
+                io = await ex.submit(threading.get_ident, cost=medusa.IO)
+                cpu = await ex.submit(os.getpid, cost=medusa.CPU)
+            return inline, io, cpu
+
+        inline, io, cpu = asyncio.run(main())
+        self.assertEqual(inline, 4)
+        self.assertNotEqual(io, threading.get_ident())
+        self.assertNotEqual(cpu, os.getpid())
+
+    def test_failures_stay_in_their_own_future(self):
+        async def main():
+            async with medusa.HybridExecutor(processes=1, chunksize=8,
+                                             warm=False) as executor:
+                futures = [executor.submit(fail, i, cost=medusa.CPU)
+                           for i in range(8)]
+                outcomes = await asyncio.gather(*futures,
+                                                return_exceptions=True)
+                after = await executor.submit(square, 9, cost=medusa.CPU)
+            return outcomes, after, executor
+
+        outcomes, after, executor = asyncio.run(main())
+        self.assertEqual(executor.round_trips, 2)  # One chunk, then one more
+        self.assertEqual([outcomes[i] for i in (0, 1, 2, 6, 7)],
+                         [0, 1, 4, 36, 49])
+        self.assertIsInstance(outcomes[3], ValueError)
+        self.assertIsInstance(outcomes[4], RuntimeError)
+        self.assertIn("TwoArgumentError", str(outcomes[4]))
+        self.assertIsInstance(outcomes[5], RuntimeError)
+        self.assertEqual(after, 81)
+        self.assertEqual(executor.pools_replaced, 0)
+
+    def test_dead_worker_replaces_pool(self):
+        async def main():
+            async with medusa.HybridExecutor(processes=1,
+                                             warm=False) as executor:
+                with self.assertRaises(concurrent.futures.BrokenExecutor):
+                    await executor.submit(die, cost=medusa.CPU)
+                after = await asyncio.wait_for(
+                    executor.submit(square, 7, cost=medusa.CPU), 30)
+            return after, executor.pools_replaced
+
+        self.assertEqual(asyncio.run(main()), (49, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
@@ -0,0 +1,113 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.LoopMonitor. The medusa package is found through the
+# parent directory, as in test_rpc.py.
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+ORIGINAL_RUN = asyncio.events.Handle._run
+
+
+def block(seconds):
+    time.sleep(seconds)
+
+
+async def watched(**kwargs):
+    # Block the loop once for 50 ms under a monitor, then return it.
+    async with medusa.LoopMonitor(interval=0.01, **kwargs) as monitor:
+        await asyncio.sleep(0.02)
+        asyncio.get_running_loop().call_soon(block, 0.05)
+        await asyncio.sleep(0.05)
+        timed = monitor.snapshot()["slow_callbacks"]["timed"]
+    return monitor, timed
+
+
+class TestLoopMonitor(unittest.TestCase):
+    def tearDown(self):
+        self.assertIs(asyncio.events.Handle._run, ORIGINAL_RUN)
+
+    def test_slow_callback_and_lag(self):
+        monitor, timed = asyncio.run(watched(slow_callback=0.03))
+        self.assertTrue(timed)
+        self.assertEqual(monitor.slow_count, 1)
+        self.assertIn("block", monitor.slow_callbacks[0]["source"])
+        self.assertGreaterEqual(monitor.lag.max, 0.03)
+
+    def test_not_timing_callbacks(self):
+        monitor, timed = asyncio.run(watched(slow_callback=None))
+        self.assertFalse(timed)
+        self.assertEqual(monitor.slow_count, 0)
+        self.assertGreaterEqual(monitor.lag.max, 0.03)  # Lag still shows it
+
+    def test_one_monitor_per_loop(self):
+        async def main():
+            async with medusa.LoopMonitor():
+                with self.assertRaises(RuntimeError):
+                    medusa.LoopMonitor().start()
+                # Not timing callbacks, it does not get in the way.
+                other = medusa.LoopMonitor(slow_callback=None)
+                other.start()
+                await other.stop()
+
+        asyncio.run(main())
+
+    def test_loops_in_threads_are_timed_apart(self):
+        # Monitors on two loops at once, stopped in the other order than
+        # they started, each only see their own loop's slow callbacks.
+        monitors = {}
+        started = threading.Barrier(2)
+
+        def run(name, hold, seconds):
+            async def main():
+                monitor = medusa.LoopMonitor(slow_callback=0.03)
+                monitor.start()
+                started.wait()
+                asyncio.get_running_loop().call_soon(block, seconds)
+                await asyncio.sleep(hold)
+                await monitor.stop()
+                monitors[name] = monitor
+
+            asyncio.run(main())
+
+        threads = [threading.Thread(target=run, args=("first", 0.3, 0.05)),
+                   threading.Thread(target=run, args=("second", 0.1, 0))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(monitors["first"].slow_count, 1)
+        self.assertEqual(monitors["second"].slow_count, 0)
+
+    def test_queues_and_jobs(self):
+        async def main():
+            queue = collections.deque([1, 2, 3])
+            async with medusa.LoopMonitor(interval=0.01,
+                                          slow_callback=None) as monitor:
+                monitor.watch_queue("q", queue)
+                queue.extend([4, 5])
+                await asyncio.sleep(0.03)
+                queue.clear()
+                monitor.record_job("work", 0.001, 0.002)
+                return monitor.snapshot(reset=True), monitor.snapshot()
+
+        first, second = asyncio.run(main())
+        self.assertEqual(first["queues"]["q"], {"depth": 0, "max": 5})
+        self.assertEqual(first["jobs"]["work"]["run"]["count"], 1)
+        self.assertEqual(second["queues"]["q"], {"depth": 0, "max": 0})
+        self.assertEqual(second["jobs"], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
@@ -0,0 +1,96 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.KeyedLocks. The medusa package is found through the parent
+# directory, as in test_rpc.py.
+import asyncio
+import gc
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+
+async def hold(locks, key, seconds, log):
+    async with locks(key):
+        log.append(("in", key))
+        await asyncio.sleep(seconds)
+        log.append(("out", key))
+
+
+class TestKeyedLocks(unittest.TestCase):
+    def test_same_key_takes_turns_other_keys_do_not(self):
+        async def main():
+            log = []
+            locks = medusa.KeyedLocks()
+            await asyncio.gather(hold(locks, "a", 0.02, log),
+                                 hold(locks, "a", 0.02, log),
+                                 hold(locks, "b", 0.01, log))
+            return log, locks.stats()
+
+        log, stats = asyncio.run(main())
+        self.assertEqual(log, [("in", "a"), ("in", "b"), ("out", "b"),
+                               ("out", "a"), ("in", "a"), ("out", "a")])
+        self.assertEqual(len(stats), 1)
+        self.assertEqual((stats[0]["acquired"], stats[0]["contended"]),
+                         (3, 1))
+        self.assertGreaterEqual(stats[0]["max_wait_ms"], 10)
+        self.assertEqual(stats[0]["wait_ms"], stats[0]["max_wait_ms"])
+
+    def test_per_key_locks_are_dropped_when_unused(self):
+        async def main():
+            locks = medusa.KeyedLocks()
+            async with locks("a"):
+                held = (len(locks), locks.locked("a"), locks.locked("b"))
+            gc.collect()
+            return held, len(locks), locks.locked("a")
+
+        self.assertEqual(asyncio.run(main()), ((1, True, False), 0, False))
+
+    def test_striped(self):
+        async def main():
+            log = []
+            locks = medusa.KeyedLocks(stripes=2)
+            # Small ints hash to themselves: 0 and 2 share stripe 0.
+            await asyncio.gather(hold(locks, 0, 0.01, log),
+                                 hold(locks, 2, 0.01, log),
+                                 hold(locks, 1, 0.01, log))
+            return log, len(locks), locks.stats()
+
+        log, size, stats = asyncio.run(main())
+        self.assertEqual(log[:2], [("in", 0), ("in", 1)])
+        self.assertGreater(log.index(("in", 2)), log.index(("out", 0)))
+        self.assertEqual(size, 2)
+        self.assertEqual([(s["stripe"], s["acquired"], s["contended"])
+                          for s in stats], [(0, 2, 1), (1, 1, 0)])
+
+    def test_cancelled_wait_is_not_counted(self):
+        async def main():
+            locks = medusa.KeyedLocks()
+            async with locks("a"):
+                waiter = asyncio.create_task(hold(locks, "a", 0, []))
+                await asyncio.sleep(0.01)
+                waiter.cancel()
+                await asyncio.gather(waiter, return_exceptions=True)
+            # Free with nobody waiting any more, so not contended.
+            async with locks("a"):
+                pass
+            return waiter.cancelled(), locks.stats()[0]
+
+        cancelled, stats = asyncio.run(main())
+        self.assertTrue(cancelled)
+        self.assertEqual((stats["acquired"], stats["contended"],
+                          stats["wait_ms"]), (2, 0, 0))
+
+    def test_bad_stripes(self):
+        with self.assertRaises(ValueError):
+            medusa.KeyedLocks(stripes=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
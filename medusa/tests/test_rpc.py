@@ -0,0 +1,51 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.RpcServer and RpcClient. The medusa package is found
+# through the parent directory, appended to the path after the standard
+# library for the same reason as in the benchmarks: queue.py next to the
+# demos would otherwise be imported in place of the standard library queue.
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+from medusa.rpc import HEADER, REQUEST  # noqa: E402
+
+
+class TestFrames(unittest.TestCase):
+    def test_short_frame_drops_connection(self):
+        # A length too short to hold the rest of the header, here 0, used
+        # to be taken as a frame, and to throw the framing out of step.
+        async def main():
+            async with medusa.RpcServer() as server:
+                host, port = await server.start_tcp()
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(HEADER.pack(0, 1, REQUEST))
+                data = await asyncio.wait_for(reader.read(), 5)
+                writer.close()
+                return data
+
+        self.assertEqual(asyncio.run(main()), b"")
+
+    def test_call(self):
+        async def main():
+            async with medusa.RpcServer() as server:
+                @server.handler()
+                async def add(a, b):
+                    return a + b
+
+                host, port = await server.start_tcp()
+                async with medusa.RpcClient(host, port) as client:
+                    return await client.call("add", 2, 3)
+
+        self.assertEqual(asyncio.run(main()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
@@ -0,0 +1,113 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.Scheduler. The medusa package is found through the parent
+# directory, as in test_rpc.py.
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+from medusa import RECEIVE  # noqa: E402
+
+
+def sleeper(log, name, delays):
+    for delay in delays:
+        yield delay
+    log.append(name)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_sleeps_wake_in_order(self):
+        log = []
+        scheduler = medusa.Scheduler()
+        scheduler.spawn(sleeper(log, "late", [3]))
+        scheduler.spawn(sleeper(log, "twice", [1, 1]))
+        scheduler.spawn(sleeper(log, "tie", [2]))
+        self.assertEqual(scheduler.run(), 0)
+        # Both wake at 2, "tie" first, having gone to sleep first.
+        self.assertEqual(log, ["tie", "twice", "late"])
+        self.assertEqual(scheduler.now, 3)
+
+    def test_run_until(self):
+        log = []
+        scheduler = medusa.Scheduler()
+        scheduler.spawn(sleeper(log, "a", [5]))
+        self.assertEqual(scheduler.run(until=2), 1)
+        self.assertEqual(scheduler.now, 2)
+        self.assertEqual(scheduler.run(), 0)
+        self.assertEqual((log, scheduler.now), (["a"], 5))
+
+    def test_messages(self):
+        received = []
+
+        def echo(scheduler):
+            while True:
+                sender, message = yield RECEIVE
+                scheduler.send(sender, message.upper())
+
+        def client(scheduler, server):
+            for word in ("a", "b"):
+                scheduler.send(server, (pid, word))
+                received.append((yield RECEIVE))
+
+        scheduler = medusa.Scheduler()
+        server = scheduler.spawn(echo(scheduler))
+        pid = scheduler.spawn(client(scheduler, server))
+        self.assertEqual(scheduler.run(), 1)  # The echo waits forever
+        self.assertEqual(received, ["A", "B"])
+        scheduler.kill(server)
+        self.assertEqual(len(scheduler), 0)
+        self.assertFalse(scheduler.send(server, "late"))
+
+    def test_mailbox_keeps_messages_for_busy_agent(self):
+        received = []
+
+        def agent():
+            yield 1
+            received.append((yield RECEIVE))
+            received.append((yield RECEIVE))
+
+        scheduler = medusa.Scheduler()
+        pid = scheduler.spawn(agent())
+        self.assertTrue(scheduler.send(pid, 1))
+        self.assertTrue(scheduler.send(pid, 2))
+        scheduler.run()
+        self.assertEqual(received, [1, 2])
+
+    def test_bad_yields_end_only_that_agent(self):
+        log = []
+        scheduler = medusa.Scheduler()
+        scheduler.spawn(sleeper(log, "good", [1, 1]))
+        bad = scheduler.spawn(sleeper(log, "bad", ["soon"]))
+        backwards = scheduler.spawn(sleeper(log, "backwards", [1, -5]))
+        with self.assertRaises(TypeError):
+            scheduler.run()
+        self.assertFalse(scheduler.send(bad, "gone"))
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        self.assertFalse(scheduler.send(backwards, "gone"))
+        self.assertEqual(scheduler.now, 1)  # Not turned back
+        self.assertEqual(scheduler.run(), 0)
+        self.assertEqual((log, scheduler.now), (["good"], 2))
+
+    def test_nan_sleep(self):
+        scheduler = medusa.Scheduler()
+        scheduler.spawn(sleeper([], "nan", [float("nan")]))
+        with self.assertRaises(ValueError):
+            scheduler.run()
+        self.assertEqual(len(scheduler), 0)
+
+    def test_switches(self):
+        scheduler = medusa.Scheduler()
+        scheduler.spawn(sleeper([], "a", [None, None]))
+        scheduler.run()
+        self.assertEqual(scheduler.switches, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
@@ -0,0 +1,56 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.TimerWheel. The medusa package is found through the parent
+# directory, as in test_rpc.py.
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+
+class TestTimerWheel(unittest.TestCase):
+    def test_rearm_after_blocked_past_cascade(self):
+        # With 16 slots of 10 ms, a timer 300 ms out starts in the second
+        # wheel and moves down to the first at 160 ms. The loop is blocked
+        # until 200 ms, so the timer due at 100 ms fires late, while the
+        # wheel catches up, and arms another timer. That must not skip the
+        # move down at 160 ms, or the 300 ms timer waits for seconds.
+        async def main():
+            loop = asyncio.get_running_loop()
+            wheel = medusa.TimerWheel(resolution=0.01, slots=16)
+            fired = loop.create_future()
+            start = loop.time()
+            wheel.call_later(0.3, lambda: fired.set_result(loop.time()))
+            wheel.call_later(0.1, wheel.call_later, 60, lambda: None)
+            time.sleep(0.2)
+            fired_at = await asyncio.wait_for(fired, 2)
+            wheel.close()
+            return fired_at - start
+
+        elapsed = asyncio.run(main())
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertLess(elapsed, 0.4)
+
+    def test_fires_in_order_and_cancels(self):
+        async def main():
+            wheel = medusa.TimerWheel(resolution=0.001)
+            fired = []
+            for delay in (0.03, 0.01, 0.02):
+                wheel.call_later(delay, fired.append, delay)
+            wheel.call_later(0.015, fired.append, "cancelled").cancel()
+            await asyncio.sleep(0.05)
+            return fired, len(wheel)
+
+        self.assertEqual(asyncio.run(main()), ([0.01, 0.02, 0.03], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
@@ -0,0 +1,164 @@
+#! /usr/bin/env python3
+
+###############################################################################
+# Tests for medusa.WorkerPool. The medusa package is found through the parent
+# directory, as in test_rpc.py.
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import medusa  # noqa: E402
+
+
+def double(i):
+    return 2 * i
+
+
+async def slow_double(i):
+    await asyncio.sleep(0.001)
+    return 2 * i
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_results_plain_and_coroutine(self):
+        async def main():
+            async with medusa.WorkerPool(workers=3) as pool:
+                futures = [await pool.submit(double, i) for i in range(50)]
+                futures += [await pool.submit(slow_double, i)
+                            for i in range(50)]
+            return [future.result() for future in futures], pool
+
+        results, pool = asyncio.run(main())
+        self.assertEqual(results, [2 * i for i in range(50)] * 2)
+        self.assertEqual((pool.submitted, pool.completed, pool.failed),
+                         (100, 100, 0))
+
+    def test_failing_job_fails_only_its_future(self):
+        def fail():
+            raise ValueError("no")
+
+        async def main():
+            async with medusa.WorkerPool(workers=1) as pool:
+                bad = await pool.submit(fail)
+                good = await pool.submit(double, 4)
+            return bad, good, pool
+
+        bad, good, pool = asyncio.run(main())
+        self.assertIsInstance(bad.exception(), ValueError)
+        self.assertEqual(good.result(), 8)
+        self.assertEqual(pool.failed, 1)
+
+    def test_batch_lets_other_tasks_run(self):
+        # A consumer runs at most 'batch' plain jobs before yielding.
+        async def main():
+            ticks = []
+
+            async def ticker():
+                while True:
+                    ticks.append(len(pool))
+                    await asyncio.sleep(0)
+
+            pool = medusa.WorkerPool(workers=1, maxsize=100, batch=10)
+            for i in range(100):
+                pool.submit_nowait(double, i)
+            task = asyncio.create_task(ticker())
+            await pool.close()
+            task.cancel()
+            return ticks
+
+        ticks = asyncio.run(main())
+        self.assertGreaterEqual(len(ticks), 9)
+        self.assertGreaterEqual(ticks[0], 90)
+        for before, after in zip(ticks, ticks[1:]):
+            self.assertLessEqual(before - after, 10)
+
+    def test_backpressure(self):
+        async def main():
+            pool = medusa.WorkerPool(workers=1, maxsize=2)
+            pool.submit_nowait(slow_double, 1)
+            pool.submit_nowait(slow_double, 2)
+            with self.assertRaises(asyncio.QueueFull):
+                pool.submit_nowait(slow_double, 3)
+            # submit() waits for a consumer to take a job, then queues.
+            future = await asyncio.wait_for(pool.submit(slow_double, 3), 1)
+            self.assertLessEqual(len(pool), 2)
+            await pool.close()
+            return future.result()
+
+        self.assertEqual(asyncio.run(main()), 6)
+
+    def test_blocked_producers_all_get_in(self):
+        async def main():
+            pool = medusa.WorkerPool(workers=2, maxsize=1)
+
+            async def produce(n):
+                return [await pool.submit(slow_double, i) for i in range(n)]
+
+            batches = await asyncio.gather(*[produce(10) for _ in range(5)])
+            await pool.drain()
+            await pool.close()
+            return [future.result() for batch in batches for future in batch]
+
+        self.assertEqual(sorted(asyncio.run(main())),
+                         sorted(2 * i for i in range(10) for _ in range(5)))
+
+    def test_drain(self):
+        async def main():
+            pool = medusa.WorkerPool(workers=2)
+            futures = [pool.submit_nowait(slow_double, i) for i in range(20)]
+            await pool.drain()
+            done = all(future.done() for future in futures)
+            await pool.drain()  # Nothing left, returns at once
+            await pool.close()
+            return done
+
+        self.assertTrue(asyncio.run(main()))
+
+    def test_close_cancels(self):
+        async def main():
+            pool = medusa.WorkerPool(workers=1)
+            futures = [pool.submit_nowait(slow_double, i) for i in range(20)]
+            await asyncio.sleep(0)
+            await pool.close(cancel=True)
+            with self.assertRaises(RuntimeError):
+                await pool.submit(double, 1)
+            with self.assertRaises(RuntimeError):
+                pool.submit_nowait(double, 1)
+            return futures, pool
+
+        futures, pool = asyncio.run(main())
+        self.assertTrue(all(future.cancelled() for future in futures))
+        self.assertTrue(all(task.done() for task in pool._tasks))
+
+    def test_exception_in_block_cancels(self):
+        async def main():
+            future = None
+            with self.assertRaises(KeyError):
+                async with medusa.WorkerPool() as pool:
+                    future = await pool.submit(slow_double, 1)
+                    raise KeyError
+            return future
+
+        self.assertTrue(asyncio.run(main()).cancelled())
+
+    def test_cancelled_future_is_skipped(self):
+        calls = []
+
+        async def main():
+            async with medusa.WorkerPool(workers=1) as pool:
+                future = pool.submit_nowait(calls.append, 1)
+                future.cancel()
+                other = pool.submit_nowait(calls.append, 2)
+            return other
+
+        asyncio.run(main())
+        self.assertEqual(calls, [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+##
+#
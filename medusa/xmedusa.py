@@ -4,6 +4,11 @@
 import asyncio
 import random
 
+import medusa
+
+COROUTINES = 10
+LIMIT = 4  # Coroutines running at once
+
 
 async def mainCoroutineSimple():
     print('Simple coroutine')
@@ -20,11 +25,10 @@ async def mainCoroutineMarvelous():
 
 
 async def main():
-    tasks = []
-    for i in range(10):
-        tasks.append(asyncio.ensure_future(mainCoroutineFancy(i)))
-
-    await asyncio.gather(*tasks)
+    # Only LIMIT coroutines exist at any time, however many there are to run.
+    async for _ in medusa.map_concurrent(mainCoroutineFancy, range(COROUTINES),
+                                         limit=LIMIT, ordered=False):
+        pass
 
 loop = asyncio.get_event_loop()
 loop.run_until_complete(main())
@@ -4,14 +4,19 @@
 import asyncio
 import random
 
+import medusa
+
+SPIDERS = 10
+LIMIT = 4  # Spiders dropping at once
+
 
 async def mainCoroutineSimple():
     print('Simple coroutine')
 
 
 async def spiderDrop(id, spiders):
-    #print(f"spiders var type: {type(spiders)}")  # it is a list. ok good.
-    print(f"id: {id}  spiders: {spiders}")
+    # spiders is this event loop's shard of the drop counters, a memoryview.
+    print(f"id: {id}  spiders: {spiders.tolist()}")
     spiders[id] = 0
     drop_step  = random.randint(1,5)
     spiders[id] = spiders[id] + drop_step
@@ -23,18 +28,17 @@ async def mainCoroutineMarvelous():
 
 
 async def main(spiders):
-    tasks = []
-    for i in range(10):
-        tasks.append(asyncio.ensure_future(spiderDrop(i, spiders)))
-
-    await asyncio.gather(*tasks)
+    async for _ in medusa.map_concurrent(lambda i: spiderDrop(i, spiders),
+                                         range(SPIDERS), limit=LIMIT):
+        pass
 
-spiders = []
+drops = medusa.ShardedCounters(SPIDERS)  # One shard, for the one loop
+spiders = drops.shard(0)
 loop = asyncio.get_event_loop()
 loop.run_until_complete(main(spiders))
 loop.close()
 
-print(spiders)
+print(drops.values())
 
 
 ##